@@ -0,0 +1,95 @@
+"""Add document tags and filter indexes
+
+Revision ID: b7e2c4a91f03
+Revises: 60cfca267eb6
+Create Date: 2026-10-18 09:12:41.508213
+
+"""
+import uuid
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c4a91f03'
+down_revision: Union[str, Sequence[str], None] = '60cfca267eb6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+documents = sa.table(
+    'documents',
+    sa.column('id', sa.UUID()),
+    sa.column('user_id', sa.UUID()),
+    sa.column('tags', sa.JSON()),
+    sa.column('document_metadata', sa.JSON()),
+    sa.column('ocr_confidence', sa.Float()),
+)
+document_tags = sa.table(
+    'document_tags',
+    sa.column('id', sa.UUID()),
+    sa.column('document_id', sa.UUID()),
+    sa.column('user_id', sa.UUID()),
+    sa.column('tag', sa.String()),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('document_tags',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('document_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('tag', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('document_id', 'tag', name='uq_document_tags_document_tag')
+    )
+    op.create_index(op.f('ix_document_tags_id'), 'document_tags', ['id'], unique=False)
+    op.create_index('ix_document_tags_user_tag_document', 'document_tags', ['user_id', 'tag', 'document_id'], unique=False)
+    op.create_index('ix_document_tags_tag_document', 'document_tags', ['tag', 'document_id'], unique=False)
+
+    op.add_column('documents', sa.Column('ocr_confidence', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_documents_ocr_confidence'), 'documents', ['ocr_confidence'], unique=False)
+    op.create_index('ix_documents_user_created', 'documents', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_documents_user_status', 'documents', ['user_id', 'status'], unique=False)
+    op.create_index('ix_documents_user_type', 'documents', ['user_id', 'document_type'], unique=False)
+
+    # Backfill from the JSON columns, row by row in Python so it runs on any dialect
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    rows = bind.execute(sa.select(
+        documents.c.id, documents.c.user_id, documents.c.tags, documents.c.document_metadata
+    )).all()
+    for row in rows:
+        tags = row.tags if isinstance(row.tags, list) else []
+        entries = [
+            {'id': uuid.uuid4(), 'document_id': row.id, 'user_id': row.user_id, 'tag': tag, 'created_at': now}
+            for tag in dict.fromkeys(str(tag) for tag in tags if tag is not None)
+        ]
+        if entries:
+            bind.execute(document_tags.insert(), entries)
+
+        metadata = row.document_metadata if isinstance(row.document_metadata, dict) else {}
+        if metadata.get('ocr_confidence') is not None:
+            bind.execute(
+                documents.update().where(documents.c.id == row.id).values(ocr_confidence=float(metadata['ocr_confidence']))
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_user_type', table_name='documents')
+    op.drop_index('ix_documents_user_status', table_name='documents')
+    op.drop_index('ix_documents_user_created', table_name='documents')
+    op.drop_index(op.f('ix_documents_ocr_confidence'), table_name='documents')
+    op.drop_column('documents', 'ocr_confidence')
+    op.drop_index('ix_document_tags_tag_document', table_name='document_tags')
+    op.drop_index('ix_document_tags_user_tag_document', table_name='document_tags')
+    op.drop_index(op.f('ix_document_tags_id'), table_name='document_tags')
+    op.drop_table('document_tags')
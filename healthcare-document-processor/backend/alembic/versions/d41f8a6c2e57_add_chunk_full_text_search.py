@@ -0,0 +1,66 @@
+"""Add chunk full text search
+
+Revision ID: d41f8a6c2e57
+Revises: b7e2c4a91f03
+Create Date: 2026-10-18 10:03:17.219846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f8a6c2e57'
+down_revision: Union[str, Sequence[str], None] = 'b7e2c4a91f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Postgres keeps a generated tsvector column; SQLite mirrors content into an FTS5 table through triggers
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts "
+    "USING fts5(content, content='document_chunks', content_rowid='rowid')",
+    "CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ai AFTER INSERT ON document_chunks BEGIN "
+    "INSERT INTO document_chunks_fts(rowid, content) VALUES (new.rowid, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ad AFTER DELETE ON document_chunks BEGIN "
+    "INSERT INTO document_chunks_fts(document_chunks_fts, rowid, content) VALUES ('delete', old.rowid, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS document_chunks_fts_au AFTER UPDATE OF content ON document_chunks BEGIN "
+    "INSERT INTO document_chunks_fts(document_chunks_fts, rowid, content) VALUES ('delete', old.rowid, old.content); "
+    "INSERT INTO document_chunks_fts(rowid, content) VALUES (new.rowid, new.content); END",
+    # Index the chunks that already exist
+    "INSERT INTO document_chunks_fts(document_chunks_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        return
+
+    op.execute(
+        "ALTER TABLE document_chunks ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', content)) STORED"
+    )
+    op.create_index(
+        'ix_document_chunks_search_vector',
+        'document_chunks',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('document_chunks_fts_ai', 'document_chunks_fts_ad', 'document_chunks_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS document_chunks_fts")
+        return
+
+    op.drop_index('ix_document_chunks_search_vector', table_name='document_chunks')
+    op.drop_column('document_chunks', 'search_vector')
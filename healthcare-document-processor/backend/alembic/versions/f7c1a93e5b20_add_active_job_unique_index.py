@@ -0,0 +1,44 @@
+"""Add active job unique index
+
+Revision ID: f7c1a93e5b20
+Revises: c6e3f28d9a41
+Create Date: 2026-10-20 09:41:06.517382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c1a93e5b20'
+down_revision: Union[str, Sequence[str], None] = 'c6e3f28d9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status IN ('QUEUED', 'RUNNING')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates left by earlier racing requests: keep each document's oldest active job
+    op.execute(
+        "UPDATE processing_jobs SET status = 'FAILED', error_message = 'Duplicate of another active job' "
+        f"WHERE {ACTIVE} AND id IN ("
+        "SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY document_id ORDER BY created_at, id) AS n "
+        f"FROM processing_jobs WHERE {ACTIVE}) AS ranked WHERE n > 1)"
+    )
+    op.create_index(
+        'uq_processing_jobs_active_document',
+        'processing_jobs',
+        ['document_id'],
+        unique=True,
+        postgresql_where=sa.text(ACTIVE),
+        sqlite_where=sa.text(ACTIVE)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_processing_jobs_active_document', table_name='processing_jobs')
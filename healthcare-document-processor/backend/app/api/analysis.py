@@ -0,0 +1,23 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import Principal, get_read_db, require_admin
+from app.models import DocumentType
+from app.services.pipeline_timing_service import PipelineTimingService
+
+router = APIRouter(prefix="/analysis", tags=["analysis"])
+
+def get_timing_service(db: Session = Depends(get_read_db)) -> PipelineTimingService:
+    return PipelineTimingService(db=db)
+
+@router.get("/timings")
+def get_pipeline_timings(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    document_type: Optional[DocumentType] = None,
+    current_user: Principal = Depends(require_admin),
+    service: PipelineTimingService = Depends(get_timing_service),
+):
+    # Seconds per pipeline stage, from OCR analyses completed in the last `hours`
+    return {"hours": hours, "groups": service.stage_percentiles(hours, document_type)}
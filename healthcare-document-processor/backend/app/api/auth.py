@@ -1,27 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.schemas.auth import UserCreate, UserLogin, TokenRefresh, PasswordChange, UserResponse, TokenResponse
 from app.services.auth_services import get_auth_service, AuthService
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import Principal, get_current_active_principal, get_current_active_user, get_token_payload, require_admin
+from app.core.principal_cache import principal_cache
+from app.core.rate_limit import login_throttle
+from app.core.revocation import revocation_store
+from app.core.security import create_token_pair, verify_token
 from app.models import User
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/register", response_model=dict)
 async def register(user_data: UserCreate, auth_service: AuthService = Depends(get_auth_service)):
-    return auth_service.register_user(user_data)
+    return await auth_service.register_user(user_data)
 
 @router.post("/login", response_model=dict)
-async def login(login_data: UserLogin, auth_service: AuthService = Depends(get_auth_service)):
-    return auth_service.login_user(login_data)
+async def login(request: Request, login_data: UserLogin, auth_service: AuthService = Depends(get_auth_service)):
+    await login_throttle.check(login_data.email, request.client.host if request.client else None)
+    return await auth_service.login_user(login_data)
+
+@router.get("/login/throttle/stats")
+async def get_login_throttle_stats(current_user: Principal = Depends(require_admin)):
+    return login_throttle.stats()
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_token(refresh_data: TokenRefresh, auth_service: AuthService = Depends(get_auth_service)):
     return auth_service.refresh_token(refresh_data.refresh_token)
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_active_user)):
+async def logout(
+    refresh_data: Optional[TokenRefresh] = None,
+    payload: dict = Depends(get_token_payload),
+    current_user: Principal = Depends(get_current_active_principal),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    revocation_store.revoke_token(auth_service.db, payload, reason="logout")
+
+    if refresh_data is not None:
+        refresh_payload = verify_token(refresh_data.refresh_token, "refresh")
+        if refresh_payload.get("sub") == payload.get("sub"):
+            revocation_store.revoke_token(auth_service.db, refresh_payload, reason="logout")
+
     return {"message": "Successfully logged out"}
 
 @router.get("/me", response_model=UserResponse)
@@ -30,9 +52,9 @@ async def get_current_user_info(current_user: User = Depends(get_current_active_
 
 @router.post("/change-password")
 async def change_password(password_data: PasswordChange, current_user: User = Depends(get_current_active_user), auth_service: AuthService = Depends(get_auth_service)):
-    from app.core.security import verify_password, get_password_hash
+    from app.core.security import verify_password_async, get_password_hash_async
 
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    if not await verify_password_async(password_data.current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrent"
@@ -44,7 +66,17 @@ async def change_password(password_data: PasswordChange, current_user: User = De
             detail="New password must be at least 8 characters long"
         )
 
-    current_user.password_hash = get_password_hash(password_data.new_password)
+    current_user.password_hash = await get_password_hash_async(password_data.new_password)
     auth_service.db.commit()
+    principal_cache.invalidate(current_user.id)
+    # Sign out every other session; the caller continues with the fresh pair below
+    revocation_store.revoke_user(auth_service.db, current_user.id, reason="password_changed")
 
-    return {"message": "Password changed successfully"}
+    return {
+        "message": "Password changed successfully",
+        "tokens": create_token_pair(
+            user_id=str(current_user.id),
+            email=current_user.email,
+            role=current_user.role.value
+        )
+    }
@@ -1,65 +1,154 @@
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_active_user, require_staff
-from app.models import Document, DocumentType, User
-from app.schemas.document import DocumentMetadataUpdate, DocumentUploadResponse
+from app.core.dependencies import Principal, get_current_active_principal, get_read_db, require_staff
+from app.models import Document, DocumentStatus, DocumentType, User
+from app.schemas.document import (
+    BulkUploadResponse,
+    DocumentMetadataUpdate,
+    DocumentUploadResponse,
+    DownloadUrlBatchRequest,
+    DownloadUrlResponse,
+)
+from app.services.admission import AdmissionController, get_admission_controller
 from app.services.document_serivce import DocumentService
-from app.utils.file_validation import validate_upl, validate_upload
+from app.services.local_storage_service import LocalStorageService
+from app.services.presigned_url_cache import PresignedUrlCache
+from app.services.registry import get_download_url_cache, get_storage_service
+from app.services.storage_service import StorageBackend
+from app.utils.archives import iter_upload_entries
+from app.utils.file_validation import validate_upload
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
-def get_document_service(db: Session = Depends(get_db)) -> DocumentService:
-    return DocumentService(db=db)
+def get_document_service(
+    db: Session = Depends(get_db),
+    storage_service: StorageBackend = Depends(get_storage_service),
+    url_cache: PresignedUrlCache = Depends(get_download_url_cache)
+) -> DocumentService:
+    return DocumentService(db=db, storage_service=storage_service, url_cache=url_cache)
 
-@router.post("/upload", response_model=DocumentUploadResponse, status=status.HTTP_201_CREATED)
+def get_read_document_service(
+    db: Session = Depends(get_read_db),
+    storage_service: StorageBackend = Depends(get_storage_service),
+    url_cache: PresignedUrlCache = Depends(get_download_url_cache)
+) -> DocumentService:
+    return DocumentService(db=db, storage_service=storage_service, url_cache=url_cache)
+
+@router.post("/upload", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     document_type: DocumentType,
     description: Optional[str] =  None,
     tags: Optional[List[str]] = None,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
     service: DocumentService = Depends(get_document_service),
+    admission: AdmissionController = Depends(get_admission_controller),
 ):
-    await validate_upload(file)
-    contents = await file.read()
-    await file.seek(0)
-
-    document = service.upload_document(
-        file_obj=file.file,
-        filename=file.filename,
-        content_type=file.content_type,
-        user=current_user,
-        document_type=document_type,
-        description=description,
-        tags=tags
-    )
+    stream = validate_upload(file)
+
+    with admission.upload_slot():
+        document = await run_in_threadpool(
+            service.upload_document,
+            stream=stream,
+            filename=file.filename,
+            content_type=file.content_type,
+            user=current_user,
+            document_type=document_type,
+            description=description,
+            tags=tags
+        )
 
     return document
 
+@router.post("/upload/bulk", response_model=BulkUploadResponse)
+async def upload_documents_bulk(
+    document_type: DocumentType,
+    description: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    files: List[UploadFile] = File(...),
+    current_user: Principal = Depends(get_current_active_principal),
+    service: DocumentService = Depends(get_document_service),
+    admission: AdmissionController = Depends(get_admission_controller),
+):
+    # Any mix of plain files and zip/tar archives; archive members are uploaded as individual documents
+    with admission.upload_slot():
+        results = await run_in_threadpool(
+            service.upload_documents,
+            entries=iter_upload_entries(files),
+            user=current_user,
+            document_type=document_type,
+            description=description,
+            tags=tags
+        )
+
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
 @router.get("/", response_model=List[DocumentUploadResponse])
 def list_documents(
     skip: int = 0,
     limit: int = 50,
-    current_user: User = Depends(get_current_active_user),
-    service: DocumentService = Depends(get_document_service),
+    tags: Optional[List[str]] = Query(None),
+    document_type: Optional[DocumentType] = None,
+    document_status: Optional[DocumentStatus] = Query(None, alias="status"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    min_ocr_confidence: Optional[float] = Query(None, ge=0, le=100),
+    current_user: Principal = Depends(get_current_active_principal),
+    service: DocumentService = Depends(get_read_document_service),
 ):
-    documents = service.list_documents(current_user, skip, limit)
+    documents = service.list_documents(
+        current_user,
+        skip,
+        limit,
+        tags=tags,
+        document_type=document_type,
+        status=document_status,
+        created_after=created_after,
+        created_before=created_before,
+        min_ocr_confidence=min_ocr_confidence,
+    )
     return documents
 
+@router.post("/download-urls", response_model=List[DownloadUrlResponse])
+def generate_download_links(
+    payload: DownloadUrlBatchRequest,
+    current_user: Principal = Depends(get_current_active_principal),
+    service: DocumentService = Depends(get_read_document_service),
+):
+    return service.generate_download_urls(payload.document_ids, current_user)
+
+@router.get("/files/{object_key:path}", response_class=FileResponse)
+def download_local_file(
+    object_key: str,
+    expires: int,
+    signature: str,
+    storage_service: StorageBackend = Depends(get_storage_service),
+):
+    # Signed links stand in for S3 presigned URLs when documents live on local disk
+    if not isinstance(storage_service, LocalStorageService):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    path = storage_service.resolve_signed(object_key, expires, signature)
+    return FileResponse(path)
+
 @router.get("/{document_id}", response_model=DocumentUploadResponse)
-def get_document(document_id:UUID, current_user:User = Depends(get_current_active_user), service:DocumentService = Depends(get_document_service)):
+def get_document(document_id:UUID, current_user: Principal = Depends(get_current_active_principal), service:DocumentService = Depends(get_document_service)):
     document = service.get_document(document_id, current_user)
     return document
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_document(
     document_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
     service: DocumentService = Depends(get_document_service),
 ):
     document  = service.get_document(document_id, current_user)
@@ -69,7 +158,7 @@ def delete_document(
 def update_metadata(
     document_id: UUID,
     payload: DocumentMetadataUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
     service: DocumentService = Depends(get_document_service),
 ):
     document = service.get_document(document_id, current_user)
@@ -79,9 +168,9 @@ def update_metadata(
 @router.get("/{document_id}/download", response_model=dict)
 def generate_download_link(
     document_id: UUID,
-    current_usesr: User = Depends(get_current_active_user),
-    service: DocumentService = Depends(get_document_service),
+    current_usesr: Principal = Depends(get_current_active_principal),
+    service: DocumentService = Depends(get_read_document_service),
 ):
     document = service.get_document(document_id, current_usesr)
-    download_url = service.generate_download_url(document)
-    return {'url': download_url, "expires_in": 600}
\ No newline at end of file
+    download_url, expires_in = service.generate_download_url(document)
+    return {'url': download_url, "expires_in": expires_in}
\ No newline at end of file
@@ -1,44 +1,184 @@
+import asyncio
+from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.core.dependencies import get_current_active_user
-from app.models import User, Document
+from app.core.database import SessionLocal, db_router, get_db
+from app.core.dependencies import Principal, get_current_active_principal, get_read_db, get_stream_principal, require_admin
+from app.models import User, Document, JobPriority
+from app.schemas.document import ProcessingBatchCreate, ProcessingBatchResponse, ProcessingJobResponse
+from app.services.batch_processing_service import BatchProcessingService
 from app.services.document_processing_service import DocumentProcessingService
+from app.services.job_queue import JobQueue, get_job_queue
 from app.services.ocr_service import OCRService
-from app.services.storage_service import S3StorageService
+from app.services.processing_job_service import ProcessingJobService
+from app.services.progress_events import ProgressBroker, get_progress_broker
+from app.services.registry import get_ocr_service, get_storage_service
+from app.services.storage_service import StorageBackend
 
 
 router = APIRouter(prefix="/processing", tags=["document-processing"])
 
-def get_processing_service(db: Session = Depends(get_db)) -> DocumentProcessingService:
-    ocr_service = OCRService()
-    storage_service = S3StorageService()
+def get_read_processing_service(
+    db: Session = Depends(get_read_db),
+    ocr_service: OCRService = Depends(get_ocr_service),
+    storage_service: StorageBackend = Depends(get_storage_service)
+) -> DocumentProcessingService:
     return DocumentProcessingService(
         db=db,
         ocr_service=ocr_service,
         storage_service=storage_service
     )
 
+def get_job_service(
+    db: Session = Depends(get_db),
+    job_queue: JobQueue = Depends(get_job_queue)
+) -> ProcessingJobService:
+    return ProcessingJobService(db=db, job_queue=job_queue)
+
+def get_batch_service(
+    db: Session = Depends(get_db),
+    job_queue: JobQueue = Depends(get_job_queue)
+) -> BatchProcessingService:
+    return BatchProcessingService(db=db, job_queue=job_queue)
+
 @router.post("/{document_id}/process", status_code=status.HTTP_202_ACCEPTED)
-async def process_document(
+def process_document(
     document_id: UUID,
-    current_user: User = Depends(get_current_active_user),
-    service: DocumentProcessingService = Depends(get_processing_service)
+    priority: JobPriority = JobPriority.ROUTINE,
+    current_user: Principal = Depends(get_current_active_principal),
+    service: ProcessingJobService = Depends(get_job_service)
 ):
-    document = service.process_document(document_id, current_user)
+    # Only enqueues; a worker runs the OCR pipeline and updates the job row
+    job = service.enqueue(document_id, current_user, priority)
     return {
-        "message": "Document processing started",
+        "message": "Document processing queued",
         "document_id": str(document_id),
-        "status": document.status.value
+        "job_id": str(job.id),
+        "status": job.status.value,
+        "priority": job.priority.value,
+        "queue_position": service.queue_position(job)
     }
 
+@router.get("/queue/metrics")
+def get_queue_metrics(
+    current_user: Principal = Depends(require_admin),
+    service: ProcessingJobService = Depends(get_job_service)
+):
+    return service.queue_metrics()
+
+@router.get("/admission/stats")
+def get_admission_stats(
+    current_user: Principal = Depends(require_admin),
+    service: ProcessingJobService = Depends(get_job_service)
+):
+    return service.admission_stats()
+
+@router.post("/batches", response_model=ProcessingBatchResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_batch(
+    request: ProcessingBatchCreate,
+    current_user: Principal = Depends(require_admin),
+    service: BatchProcessingService = Depends(get_batch_service)
+):
+    # Reprocesses every matching document across all users, e.g. after an OCR upgrade
+    batch = service.create_batch(request.filters, request.priority, request.concurrency, current_user)
+    return service.summary(batch)
+
+@router.get("/batches/{batch_id}", response_model=ProcessingBatchResponse)
+def get_batch(
+    batch_id: UUID,
+    current_user: Principal = Depends(require_admin),
+    service: BatchProcessingService = Depends(get_batch_service)
+):
+    return service.summary(service.get_batch(batch_id))
+
+@router.post("/batches/{batch_id}/resume", response_model=ProcessingBatchResponse)
+def resume_batch(
+    batch_id: UUID,
+    requeue_running: bool = False,
+    current_user: Principal = Depends(require_admin),
+    service: BatchProcessingService = Depends(get_batch_service)
+):
+    return service.summary(service.resume(batch_id, requeue_running))
+
+@router.post("/batches/{batch_id}/cancel", response_model=ProcessingBatchResponse)
+def cancel_batch(
+    batch_id: UUID,
+    current_user: Principal = Depends(require_admin),
+    service: BatchProcessingService = Depends(get_batch_service)
+):
+    return service.summary(service.cancel(batch_id))
+
+# The streams stay open for as long as the client listens, so they must not
+# hold a pooled connection: auth and ownership use sessions closed before
+# the response starts
+@router.get("/events")
+async def stream_my_progress(
+    current_user: Principal = Depends(get_stream_principal),
+    broker: ProgressBroker = Depends(get_progress_broker)
+):
+    return _event_response(broker, current_user.id)
+
+@router.get("/{document_id}/events")
+async def stream_document_progress(
+    document_id: UUID,
+    current_user: Principal = Depends(get_stream_principal),
+    broker: ProgressBroker = Depends(get_progress_broker)
+):
+    if not await asyncio.to_thread(_owns_document, current_user.id, document_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+
+    return _event_response(broker, current_user.id, document_id)
+
+def _owns_document(user_id: UUID, document_id: UUID) -> bool:
+    db = db_router.read_session(user_id)
+    try:
+        return db.query(Document.id).filter(
+            Document.id == document_id,
+            Document.user_id == user_id
+        ).first() is not None
+    finally:
+        db.close()
+
+def _event_response(broker: ProgressBroker, user_id: UUID, document_id: Optional[UUID] = None) -> StreamingResponse:
+    async def snapshot() -> List[dict]:
+        return await asyncio.to_thread(_read_snapshot, user_id, document_id)
+
+    return StreamingResponse(
+        broker.stream(str(user_id), str(document_id) if document_id else None, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _read_snapshot(user_id: UUID, document_id: Optional[UUID]) -> List[dict]:
+    # Read from the primary: a lagging replica could miss a job that already finished
+    db = SessionLocal()
+    try:
+        return ProcessingJobService(db).progress_snapshot(user_id, document_id)
+    finally:
+        db.close()
+
+@router.get("/jobs/{job_id}", response_model=ProcessingJobResponse)
+def get_job_status(
+    job_id: UUID,
+    current_user: Principal = Depends(get_current_active_principal),
+    service: ProcessingJobService = Depends(get_job_service)
+):
+    job = service.get_job(job_id, current_user)
+    response = ProcessingJobResponse.model_validate(job)
+    response.queue_position = service.queue_position(job)
+    return response
+
 @router.get("/{document_id}/text")
 async def get_document_text(
     document_id: UUID,
-    current_user: User = Depends(get_current_active_user),
-    service: DocumentProcessingService = Depends(get_processing_service)
+    current_user: Principal = Depends(get_current_active_principal),
+    service: DocumentProcessingService = Depends(get_read_processing_service)
 ):
     result = service.get_document_text(document_id, current_user)
     return result
@@ -46,8 +186,8 @@ async def get_document_text(
 @router.get("/{document_id}/chunks")
 async def get_document_chunks(
     document_id: UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_principal),
+    db: Session = Depends(get_read_db)
 ):
     document = db.query(Document).filter(
         Document.id == document_id,
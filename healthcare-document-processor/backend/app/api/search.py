@@ -0,0 +1,48 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import Principal, get_current_active_principal, get_read_db
+from app.models import User
+from app.schemas.document import ChunkSearchResponse
+from app.services.embedding_service import EmbeddingBackend
+from app.services.registry import get_embedding_backend
+from app.services.search_service import SearchService
+from app.services.vector_index import VectorIndex, get_vector_index
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+def get_search_service(db: Session = Depends(get_read_db)) -> SearchService:
+    return SearchService(db=db)
+
+def get_semantic_search_service(
+    db: Session = Depends(get_read_db),
+    embedding_backend: EmbeddingBackend = Depends(get_embedding_backend),
+    vector_index: VectorIndex = Depends(get_vector_index)
+) -> SearchService:
+    return SearchService(db=db, embedding_backend=embedding_backend, vector_index=vector_index)
+
+@router.get("/chunks", response_model=ChunkSearchResponse)
+def search_chunks(
+    q: str = Query(..., min_length=1, max_length=500),
+    document_id: Optional[UUID] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_active_principal),
+    service: SearchService = Depends(get_search_service),
+):
+    hits, total = service.search_chunks(q, current_user, skip=skip, limit=limit, document_id=document_id)
+    return {"query": q, "total_hits": total, "hits": hits}
+
+@router.get("/semantic", response_model=ChunkSearchResponse)
+def semantic_search(
+    q: str = Query(..., min_length=1, max_length=500),
+    document_id: Optional[UUID] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_active_principal),
+    service: SearchService = Depends(get_semantic_search_service),
+):
+    hits = service.semantic_search(q, current_user, limit=limit, document_id=document_id)
+    return {"query": q, "hits": hits}
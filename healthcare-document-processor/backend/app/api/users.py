@@ -2,7 +2,9 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.dependencies import require_admin, require_staff, get_current_active_user
+from app.core.dependencies import Principal, require_admin, require_staff
+from app.core.principal_cache import principal_cache
+from app.core.revocation import revocation_store
 from app.models import User, UserRole
 from app.schemas.auth import UserResponse
 from app.services.auth_services import get_auth_service, AuthService
@@ -10,12 +12,20 @@ from app.services.auth_services import get_auth_service, AuthService
 router = APIRouter(prefix='/users', tags=["users"])
 
 @router.get("/", response_model=List[UserResponse])
-async def list_users(skip: int=0, limit:int=100, current_user: User = Depends(require_staff), db: Session = Depends(get_db)):
+async def list_users(skip: int=0, limit:int=100, current_user: Principal = Depends(require_staff), db: Session = Depends(get_db)):
     users = db.query(User).offset(skip).limit(limit).all()
     return users
 
+@router.get("/principal-cache/stats")
+async def get_principal_cache_stats(current_user: Principal = Depends(require_admin)):
+    return principal_cache.stats()
+
+@router.get("/revocations/stats")
+async def get_revocation_stats(current_user: Principal = Depends(require_admin)):
+    return revocation_store.stats()
+
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str, current_user: User = Depends(require_staff), db: Session = Depends(get_db)):
+async def get_user(user_id: str, current_user: Principal = Depends(require_staff), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -25,7 +35,7 @@ async def get_user(user_id: str, current_user: User = Depends(require_staff), db
     return user
 
 @router.put("/{user_id}/activate")
-async def activate_user(user_id: str, current_user: User = Depends(require_admin), db: Session = Depends(get_db)):
+async def activate_user(user_id: str, current_user: Principal = Depends(require_admin), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -35,10 +45,12 @@ async def activate_user(user_id: str, current_user: User = Depends(require_admin
 
     user.is_active = False
     db.commit()
+    principal_cache.invalidate(user.id)
+    revocation_store.revoke_user(db, user.id, reason="deactivated")
     return {"message": "User deactivate successfully"}
 
 @router.put("/{user_id}/role")
-async def update_user_role(user_id:str, new_role: UserRole, current_user: User = Depends(require_admin), db: Session = Depends(get_db)):
+async def update_user_role(user_id:str, new_role: UserRole, current_user: Principal = Depends(require_admin), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -48,4 +60,7 @@ async def update_user_role(user_id:str, new_role: UserRole, current_user: User =
 
     user.role = new_role
     db.commit()
+    principal_cache.invalidate(user.id)
+    # Outstanding tokens still carry the old role claim
+    revocation_store.revoke_user(db, user.id, reason="role_changed")
     return {"message": f"User role updated to {new_role.value}"}
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Load and throughput measurements to rerun after changing the code they cover.
+
+    python -m app.bench hashing --concurrency 40
+    python -m app.bench storage --sizes 1 10 50 --repeat 3
+    python -m app.bench sniffing --sizes-kb 1 1024 51200
+    python -m app.bench login --base-url http://localhost:8000 --seconds 20 --attackers 50
+
+``hashing`` verifies passwords next to a 1 ms asyncio ticker, once on the
+event loop and once on the password hashing pool, and reports throughput
+and the worst stall the ticker saw.
+
+``storage`` uploads random objects of each size to the configured S3 bucket
+(``S3_ENDPOINT_URL`` can point at a local MinIO) and reports download
+throughput with one plain GET against parallel ranged GETs, then deletes
+them.
+
+``sniffing`` times upload validation (extension check and signature
+detection) on files of growing size; it reads only the header, so the time
+should not grow with the file.
+
+``login`` measures latency of ordinary requests against a running server,
+first on their own and then while other clients hammer ``/auth/login`` with
+wrong passwords; throttled attempts should keep the second p99 close to
+the first.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from typing import List
+from uuid import uuid4
+
+from app.utils.helpers import percentile
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description="Load and throughput benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    hashing = commands.add_parser("hashing", help="Event loop stalls while passwords are verified")
+    hashing.add_argument("--concurrency", type=int, default=40, help="Verifications started at once")
+
+    storage = commands.add_parser("storage", help="S3 download throughput, single GET against ranged parts")
+    storage.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="Object sizes in MB")
+    storage.add_argument("--repeat", type=int, default=3, help="Downloads per size and mode; the best is reported")
+
+    sniffing = commands.add_parser("sniffing", help="Upload type detection time against file size")
+    sniffing.add_argument("--sizes-kb", type=int, nargs="+", default=[1, 1024, 51200], help="File sizes in KB")
+    sniffing.add_argument("--repeat", type=int, default=2000)
+
+    login = commands.add_parser("login", help="Latency of other endpoints during a password guessing attack")
+    login.add_argument("--base-url", default="http://localhost:8000")
+    login.add_argument("--seconds", type=float, default=20.0, help="Length of each phase")
+    login.add_argument("--attackers", type=int, default=50, help="Concurrent clients sending bad logins")
+    login.add_argument("--probes", type=int, default=4, help="Concurrent clients sending ordinary requests")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "hashing":
+        asyncio.run(bench_hashing(args.concurrency))
+        return 0
+    if args.command == "storage":
+        bench_storage(args.sizes, args.repeat)
+        return 0
+    if args.command == "sniffing":
+        bench_sniffing(args.sizes_kb, args.repeat)
+        return 0
+    if args.command == "login":
+        return asyncio.run(bench_login(args.base_url, args.seconds, args.attackers, args.probes))
+    return 1
+
+
+async def bench_hashing(concurrency: int) -> None:
+    from app.core.security import get_password_hash, shutdown_password_executor, verify_password, verify_password_async
+
+    hashed = get_password_hash("bench-password-1")
+
+    async def on_loop() -> None:
+        for _ in range(concurrency):
+            verify_password("bench-password-1", hashed)
+            await asyncio.sleep(0)
+
+    async def on_pool() -> None:
+        await asyncio.gather(*(verify_password_async("bench-password-1", hashed) for _ in range(concurrency)))
+
+    for name, work in (("event loop", on_loop), ("hash pool", on_pool)):
+        stall, done = 0.0, asyncio.Event()
+
+        async def ticker() -> None:
+            nonlocal stall
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.001)
+                stall = max(stall, time.perf_counter() - started - 0.001)
+
+        tick = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await work()
+        elapsed = time.perf_counter() - started
+        done.set()
+        await tick
+        print(
+            f"{name:10}  {concurrency} verifications in {elapsed * 1000:.0f}ms  "
+            f"({concurrency / elapsed:.0f}/s)  worst stall={stall * 1000:.1f}ms",
+            flush=True
+        )
+    shutdown_password_executor()
+
+
+def bench_storage(sizes: List[int], repeat: int) -> None:
+    import io
+    import os
+
+    from app.services.storage_service import MB, S3StorageService
+
+    storage = S3StorageService()
+    ranged_concurrency = storage.download_concurrency
+    try:
+        for size in sizes:
+            key = storage.upload_file(io.BytesIO(os.urandom(size * MB)), "bench.bin", "bench")
+            try:
+                for mode, concurrency in (("single GET", 1), ("ranged", ranged_concurrency)):
+                    storage.download_concurrency = concurrency
+                    best = float("inf")
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        storage.download_file(key).close()
+                        best = min(best, time.perf_counter() - started)
+                    print(f"{size:4} MB  {mode:10}  {best * 1000:7.0f}ms  {size / best:7.1f} MB/s", flush=True)
+            finally:
+                storage.delete_file(key)
+    finally:
+        storage.close()
+
+
+def bench_sniffing(sizes_kb: List[int], repeat: int) -> None:
+    import tempfile
+
+    from app.utils.file_validation import open_upload_stream
+
+    for size_kb in sizes_kb:
+        with tempfile.TemporaryFile() as file_obj:
+            # Sparse past the header, so large sizes cost no disk
+            file_obj.write(b"%PDF-1.7\n")
+            file_obj.truncate(size_kb * 1024)
+            latencies = []
+            for _ in range(repeat):
+                file_obj.seek(0)
+                started = time.perf_counter()
+                open_upload_stream(file_obj, "bench.pdf").detected_mimetype
+                latencies.append(time.perf_counter() - started)
+
+        latencies.sort()
+        print(
+            f"{size_kb:8} KB  p50={percentile(latencies, 0.5) * 1e6:.1f}us  p99={percentile(latencies, 0.99) * 1e6:.1f}us",
+            flush=True
+        )
+
+
+async def bench_login(base_url: str, seconds: float, attackers: int, probes: int) -> int:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        email, password = f"bench-{uuid4().hex[:8]}@example.com", "bench-password-1"
+        registered = await client.post("/auth/register", json={
+            "email": email, "password": password, "confirm_password": password, "full_name": "Bench", "role": "doctor"
+        })
+        if registered.status_code not in (200, 201):
+            print(f"Could not register a probe user: {registered.status_code} {registered.text}", file=sys.stderr)
+            return 1
+        logged_in = await client.post("/auth/login", json={"email": email, "password": password})
+        headers = {"Authorization": f"Bearer {logged_in.json()['tokens']['access_token']}"}
+
+        async def probe(deadline: float, latencies: List[float]) -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/documents/", headers=headers)
+                latencies.append(time.perf_counter() - started)
+
+        async def attack(deadline: float, outcomes: Counter) -> None:
+            while time.perf_counter() < deadline:
+                response = await client.post("/auth/login", json={"email": email, "password": "wrong-password"})
+                outcomes[response.status_code] += 1
+
+        for phase in ("idle", "under attack"):
+            latencies: List[float] = []
+            outcomes: Counter = Counter()
+            deadline = time.perf_counter() + seconds
+            tasks = [probe(deadline, latencies) for _ in range(probes)]
+            if phase == "under attack":
+                tasks += [attack(deadline, outcomes) for _ in range(attackers)]
+            await asyncio.gather(*tasks)
+
+            latencies.sort()
+            print(
+                f"{phase:12}  requests={len(latencies)}  p50={percentile(latencies, 0.5) * 1000:.1f}ms  "
+                f"p99={percentile(latencies, 0.99) * 1000:.1f}ms"
+                + (f"  login responses={dict(outcomes)}" if outcomes else ""),
+                flush=True
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
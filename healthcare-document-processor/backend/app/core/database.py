@@ -1,6 +1,10 @@
-from sqlalchemy import create_engine, text
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
 
 engine = create_engine(
@@ -10,16 +14,122 @@ engine = create_engine(
     echo=False
 )
 
+replica_engine = create_engine(
+    settings.DATABASE_REPLICA_URL,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    echo=False
+) if settings.DATABASE_REPLICA_URL else None
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=replica_engine
+) if replica_engine is not None else None
+
 Base = declarative_base()
 
+
+class DatabaseRouter:
+    """Routes read-only sessions to the replica and everything else to the primary.
+
+    A user whose own commit landed on the primary within the last
+    ``sticky_seconds`` keeps reading from the primary so they see their writes.
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replica: Optional[sessionmaker] = None,
+        sticky_seconds: float = settings.REPLICA_STICKY_SECONDS,
+        health_check_interval: float = settings.REPLICA_HEALTH_CHECK_INTERVAL,
+    ) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.sticky_seconds = sticky_seconds
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Lock()
+        self._recent_writes: Dict[str, float] = {}
+        self._replica_healthy = replica is not None
+        self._last_health_check = 0.0
+
+        event.listen(self.primary, "after_commit", self._on_primary_commit)
+
+    def _on_primary_commit(self, session: Session) -> None:
+        user_id = session.info.get("user_id")
+        if user_id is not None:
+            self.mark_write(user_id)
+
+    def mark_write(self, user_id: str) -> None:
+        with self._lock:
+            self._recent_writes[str(user_id)] = time.monotonic() + self.sticky_seconds
+
+    def is_sticky(self, user_id: Optional[str]) -> bool:
+        if user_id is None:
+            return False
+
+        with self._lock:
+            sticky_until = self._recent_writes.get(str(user_id))
+            if sticky_until is None:
+                return False
+            if time.monotonic() >= sticky_until:
+                del self._recent_writes[str(user_id)]
+                return False
+            return True
+
+    def replica_available(self) -> bool:
+        if self.replica is None:
+            return False
+
+        now = time.monotonic()
+        if now - self._last_health_check < self.health_check_interval:
+            return self._replica_healthy
+
+        with self._lock:
+            if now - self._last_health_check < self.health_check_interval:
+                return self._replica_healthy
+            self._replica_healthy = _ping(self.replica.kw["bind"])
+            self._last_health_check = now
+
+        return self._replica_healthy
+
+    def mark_replica_unhealthy(self) -> None:
+        with self._lock:
+            self._replica_healthy = False
+            self._last_health_check = time.monotonic()
+
+    def write_session(self, user_id: Optional[str] = None) -> Session:
+        session = self.primary()
+        if user_id is not None:
+            session.info["user_id"] = str(user_id)
+        return session
+
+    def read_session(self, user_id: Optional[str] = None) -> Session:
+        if self.is_sticky(user_id) or not self.replica_available():
+            return self.write_session(user_id)
+        return self.replica()
+
+
+def _ping(bind: Engine) -> bool:
+    try:
+        with bind.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+db_router = DatabaseRouter(SessionLocal, ReplicaSessionLocal)
+
 def get_db():
-    db = SessionLocal()
+    db = db_router.write_session()
     try:
         yield db
     finally:
@@ -33,4 +143,9 @@ def test_db_connection():
             return True
     except Exception as e:
         print(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def test_replica_connection():
+    if replica_engine is None:
+        return None
+    return db_router.replica_available()
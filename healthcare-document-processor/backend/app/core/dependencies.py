@@ -1,20 +1,41 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from fastapi import Depends, HTTPException, status
 from fastapi import security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import ValidationError
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, db_router
+from app.core.revocation import revocation_store
 from app.core.security import verify_token
 from app.models import User, UserRole
+from app.schemas.auth import TokenPrincipal
 from app.services.auth_services import get_auth_service, AuthService
 
 security = HTTPBearer()
 
+# Database-backed user, or claims-only principal when AUTH_STATELESS is on
+Principal = Union[User, TokenPrincipal]
+
+def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    payload = verify_token(credentials.credentials, "access")
+    if revocation_store.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return payload
+
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    payload: dict = Depends(get_token_payload),
     auth_serivce: AuthService = Depends(get_auth_service)
 ) -> User:
-    return auth_serivce.get_current_user(credentials.credentials)
+    user = auth_serivce.get_user_by_claims(payload)
+    # Commits on this request's primary session start the user's read-your-writes window
+    auth_serivce.db.info["user_id"] = str(user.id)
+    return user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
@@ -24,9 +45,61 @@ def get_current_active_user(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+def get_current_principal(
+    payload: dict = Depends(get_token_payload),
+    auth_serivce: AuthService = Depends(get_auth_service)
+) -> Principal:
+    if not settings.AUTH_STATELESS:
+        principal = auth_serivce.get_user_by_claims(payload)
+    else:
+        # Deactivation and role changes revoke outstanding tokens, so the claims can be trusted as-is
+        try:
+            principal = TokenPrincipal(id=payload.get("sub"), email=payload.get("email"), role=payload.get("role"))
+        except ValidationError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token claims",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+
+    auth_serivce.db.info["user_id"] = str(principal.id)
+    return principal
+
+def get_current_active_principal(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    if not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return current_user
+
+def get_stream_principal(payload: dict = Depends(get_token_payload)) -> Principal:
+    """Active principal for long-lived responses such as event streams.
+
+    Sessions from yield dependencies stay checked out until the response
+    ends, so the user is loaded on a session that is closed straight away.
+    """
+    db = db_router.write_session()
+    try:
+        principal = get_current_principal(payload, AuthService(db))
+    finally:
+        db.close()
+    return get_current_active_principal(principal)
+
+def get_read_db(current_user: Principal = Depends(get_current_active_principal)):
+    db = db_router.read_session(current_user.id)
+    try:
+        yield db
+    except OperationalError:
+        if db.get_bind() is not db_router.primary.kw["bind"]:
+            db_router.mark_replica_unhealthy()
+        raise
+    finally:
+        db.close()
+
 def require_roles(allowed_roles: List[UserRole]):
     
-    def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
+    def role_checker(current_user: Principal = Depends(get_current_active_principal)) -> Principal:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,70 @@
+import threading
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.models import User
+
+
+# What authorization and /auth/me read; anything else, the password hash above all, stays out of process memory
+PRINCIPAL_COLUMNS = ("id", "email", "full_name", "role", "is_active", "is_verified", "created_at", "last_login")
+
+
+class PrincipalCache:
+    """TTL-bounded cache of authenticated users keyed by user id.
+
+    Entries are snapshots of ``PRINCIPAL_COLUMNS`` rather than ORM instances,
+    so they can be attached to any request's session without issuing a
+    SELECT. Other columns are left unloaded and fetched on first access.
+    """
+
+    def __init__(self, maxsize: int = settings.PRINCIPAL_CACHE_MAX_SIZE, ttl: float = settings.PRINCIPAL_CACHE_TTL_SECONDS) -> None:
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, db: Session, user_id: str) -> Optional[User]:
+        with self._lock:
+            snapshot = self._cache.get(str(user_id))
+            if snapshot is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def put(self, user: User) -> None:
+        snapshot = {column: getattr(user, column) for column in PRINCIPAL_COLUMNS}
+        with self._lock:
+            self._cache[str(user.id)] = snapshot
+
+    def invalidate(self, user_id: Any) -> None:
+        with self._lock:
+            if self._cache.pop(str(user_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,181 @@
+import logging
+import math
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from cachetools import TTLCache
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Takes one token from every bucket in KEYS or from none of them, so workers
+# sharing Redis can't pass a check together and all be charged after it.
+# ARGV is the time, then a capacity and refill rate per key. Returns the
+# 1-based index of the first empty bucket (0 when all were charged) and the
+# seconds until it refills.
+REDIS_TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        return {i, tostring((1 - tokens) / rate)}
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {0, '0'}
+"""
+
+# One lock for every in-process bucket, so a multi-bucket take is atomic
+_buckets_lock = threading.Lock()
+
+
+class TokenBucketLimiter:
+    """In-process token buckets; idle buckets expire once they would be full again."""
+
+    def __init__(self, capacity: int, refill_per_second: float, max_keys: int = 100000) -> None:
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._buckets: TTLCache = TTLCache(maxsize=max_keys, ttl=capacity / refill_per_second)
+
+    def take(self, key: str) -> Tuple[bool, float]:
+        empty, retry_after = take_all([(self, key)])
+        return empty is None, retry_after
+
+    def _level(self, key: str, now: float) -> float:
+        tokens, last = self._buckets.get(key, (float(self.capacity), now))
+        return min(self.capacity, tokens + (now - last) * self.refill_per_second)
+
+
+def take_all(buckets: Sequence[Tuple[TokenBucketLimiter, str]]) -> Tuple[Optional[int], float]:
+    """Take a token from every ``(limiter, key)`` bucket, or from none of them.
+
+    Returns the position of the first empty bucket and the seconds until it
+    refills, or ``None`` when every bucket was charged.
+    """
+    now = time.monotonic()
+    with _buckets_lock:
+        levels = [limiter._level(key, now) for limiter, key in buckets]
+        for i, ((limiter, _), tokens) in enumerate(zip(buckets, levels)):
+            if tokens < 1:
+                return i, (1 - tokens) / limiter.refill_per_second
+        for (limiter, key), tokens in zip(buckets, levels):
+            limiter._buckets[key] = (tokens - 1, now)
+    return None, 0.0
+
+
+class RedisTokenBuckets:
+    """The same all-or-nothing take over buckets kept in Redis and shared by every API worker."""
+
+    def __init__(self, redis_client, prefix: str) -> None:
+        self.prefix = prefix
+        self._script = redis_client.register_script(REDIS_TOKEN_BUCKET_SCRIPT)
+
+    async def take_all(self, buckets: Sequence[Tuple[str, TokenBucketLimiter, str]]) -> Tuple[Optional[int], float]:
+        """Like ``take_all``, with each bucket also named to keep the Redis keys of different limits apart."""
+        args = [time.time()]
+        for _, limiter, _ in buckets:
+            args += [limiter.capacity, limiter.refill_per_second]
+        empty, retry_after = await self._script(
+            keys=[f"{self.prefix}:{name}:{key}" for name, _, key in buckets],
+            args=args
+        )
+        empty = int(empty)
+        return (empty - 1 if empty else None), float(retry_after)
+
+
+class LoginThrottle:
+    """Per-client-IP, per-account and per-(account, IP) limits checked before any password hashing.
+
+    The account-wide bucket caps guessing spread over many addresses; it is
+    larger than the (account, IP) bucket, so one address runs out long before
+    it can lock the owner out from everywhere else. An attempt takes a token
+    from all three buckets or, if any is empty, from none.
+    """
+
+    def __init__(self) -> None:
+        self.limiters: Dict[str, TokenBucketLimiter] = {
+            "ip": TokenBucketLimiter(settings.LOGIN_IP_BURST, settings.LOGIN_IP_PER_MINUTE / 60),
+            "account": TokenBucketLimiter(settings.LOGIN_ACCOUNT_BURST, settings.LOGIN_ACCOUNT_PER_MINUTE / 60),
+            "account_ip": TokenBucketLimiter(settings.LOGIN_ACCOUNT_IP_BURST, settings.LOGIN_ACCOUNT_IP_PER_MINUTE / 60),
+        }
+        self.shared: Optional[RedisTokenBuckets] = None
+
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "allowed": 0,
+            **{f"rejected_{name}": 0 for name in self.limiters},
+            "shared_backend_errors": 0,
+        }
+
+        if settings.LOGIN_RATE_LIMIT_BACKEND == "redis":
+            self._init_shared_backend()
+
+    def _init_shared_backend(self) -> None:
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            logger.warning("redis is not installed; login throttling stays in-process")
+            return
+
+        self.shared = RedisTokenBuckets(redis_asyncio.from_url(settings.REDIS_URL), "login")
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    async def check(self, email: str, client_ip: Optional[str]) -> None:
+        account = email.strip().lower()
+        buckets = [("account", account), ("account_ip", f"{account}|{client_ip or ''}")]
+        if client_ip:
+            buckets.insert(0, ("ip", client_ip))
+        named = [(name, self.limiters[name], key) for name, key in buckets]
+
+        empty, retry_after = None, 0.0
+        shared_failed = self.shared is None
+        if self.shared is not None:
+            try:
+                empty, retry_after = await self.shared.take_all(named)
+            except Exception as e:
+                # Fall back to this worker's buckets rather than letting every attempt through
+                logger.warning(f"Shared login throttle unavailable: {e}")
+                self._count("shared_backend_errors")
+                shared_failed = True
+        if shared_failed:
+            empty, retry_after = take_all([(limiter, key) for _, limiter, key in named])
+
+        if empty is not None:
+            self._count(f"rejected_{named[empty][0]}")
+            _reject(retry_after)
+        self._count("allowed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["backend"] = "redis" if self.shared is not None else "memory"
+        return counters
+
+
+def _reject(retry_after: float) -> None:
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts, try again later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+login_throttle = LoginThrottle()
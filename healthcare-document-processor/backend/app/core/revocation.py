@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import TokenRevocation
+
+logger = logging.getLogger(__name__)
+
+# Rows committed by a slow transaction can carry a created_at older than the
+# watermark, so every incremental refresh re-reads this much history.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    def __init__(self, num_bits: int, num_hashes: int) -> None:
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._bits = bytearray((num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    """In-memory view of the token_revocations table.
+
+    Revoked token ids go into a Bloom filter backed by an exact set, so the
+    common case (token not revoked) is answered by a few bit probes. User-wide
+    revocations reject every token issued before the recorded instant.
+    """
+
+    def __init__(
+        self,
+        num_bits: int = settings.REVOCATION_BLOOM_BITS,
+        num_hashes: int = settings.REVOCATION_BLOOM_HASHES,
+    ) -> None:
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(num_bits, num_hashes)
+        self._revoked_jtis: Dict[str, float] = {}  # jti -> expiry timestamp
+        self._revoked_users: Dict[str, datetime] = {}  # user id -> revoked-before instant, aware UTC
+        self._watermark: Optional[datetime] = None
+
+    def is_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        if jti and jti in self._bloom and jti in self._revoked_jtis:
+            return True
+
+        revoked_before = self._revoked_users.get(str(payload.get("sub")))
+        if revoked_before is not None:
+            issued_at = datetime.fromtimestamp(float(payload.get("iat", 0)), timezone.utc)
+            if issued_at < revoked_before:
+                return True
+
+        return False
+
+    def _apply(self, row: TokenRevocation) -> None:
+        if row.jti:
+            self._revoked_jtis[row.jti] = _to_timestamp(row.expires_at)
+            self._bloom.add(row.jti)
+        if row.user_id and row.revoked_before:
+            key = str(row.user_id)
+            before = _aware_utc(row.revoked_before)
+            if key not in self._revoked_users or before > self._revoked_users[key]:
+                self._revoked_users[key] = before
+
+    def refresh(self, db: Session) -> int:
+        now = datetime.now(timezone.utc)
+        query = db.query(TokenRevocation).filter(TokenRevocation.expires_at > now)
+        if self._watermark is not None:
+            query = query.filter(TokenRevocation.created_at >= self._watermark - REFRESH_OVERLAP)
+
+        rows = query.all()
+        with self._lock:
+            for row in rows:
+                self._apply(row)
+                created_at = _aware_utc(row.created_at)
+                if self._watermark is None or created_at > self._watermark:
+                    self._watermark = created_at
+            if self._watermark is None:
+                self._watermark = now
+            self._prune(now)
+
+        return len(rows)
+
+    def _prune(self, now: datetime) -> None:
+        expired = [jti for jti, expires in self._revoked_jtis.items() if expires <= now.timestamp()]
+        for jti in expired:
+            del self._revoked_jtis[jti]
+
+        # Bloom filters can't forget; rebuild once expired ids dominate the bit array
+        if expired and len(expired) >= len(self._revoked_jtis):
+            self._bloom = BloomFilter(self.num_bits, self.num_hashes)
+            for jti in self._revoked_jtis:
+                self._bloom.add(jti)
+
+        # A user revocation can be dropped once every token it covers has expired anyway
+        horizon = now - timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        for user_id in [key for key, before in self._revoked_users.items() if before < horizon]:
+            del self._revoked_users[user_id]
+
+    def revoke_token(self, db: Session, payload: dict, reason: str) -> None:
+        jti = payload.get("jti")
+        if not jti:
+            return
+
+        row = TokenRevocation(
+            jti=jti,
+            user_id=UUID(payload["sub"]) if payload.get("sub") else None,
+            reason=reason,
+            expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+        )
+        db.add(row)
+        db.commit()
+        with self._lock:
+            self._apply(row)
+
+    def revoke_user(self, db: Session, user_id, reason: str) -> None:
+        # Aware, so a timestamptz column stores this instant whatever the session time zone
+        now = datetime.now(timezone.utc)
+        row = TokenRevocation(
+            user_id=user_id,
+            revoked_before=now,
+            reason=reason,
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        db.add(row)
+        db.commit()
+        with self._lock:
+            self._apply(row)
+
+    async def run_refresher(self, session_factory: Callable[[], Session], interval: float = settings.REVOCATION_REFRESH_SECONDS) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._refresh_with, session_factory)
+            except Exception as e:
+                logger.error(f"Failed to refresh revocation list: {e}")
+            await asyncio.sleep(interval)
+
+    def _refresh_with(self, session_factory: Callable[[], Session]) -> None:
+        db = session_factory()
+        try:
+            self.refresh(db)
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._revoked_jtis),
+            "revoked_users": len(self._revoked_users),
+            "bloom_bits": self.num_bits,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+def _aware_utc(value: datetime) -> datetime:
+    # SQLite hands back naive values; everything written here is UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _to_timestamp(value: datetime) -> float:
+    return _aware_utc(value).timestamp()
+
+
+revocation_store = RevocationStore()
@@ -1,8 +1,11 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
-from warnings import deprecated
+from typing import Any, Union, Optional, Tuple
+from uuid import uuid4
 from jose import JWTError, jwt
-from passlib.hash import pbkdf2_sha256
+from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from app.core.config import Settings, settings
 
@@ -10,13 +13,47 @@ from app.core.config import Settings, settings
 ALGORITHM = settings.ALGORITHM
 SECRET_KEY = settings.SECRET_KEY
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
-REFRESH_TOKEN_EXPIRE_DAYS = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
+
+def build_password_context(schemes: list, rounds: Optional[int] = None) -> CryptContext:
+    policy = {}
+    if rounds is not None:
+        # Pinning min and max to the target makes any other cost trigger a rehash
+        for option in ("default_rounds", "min_rounds", "max_rounds"):
+            policy[f"{schemes[0]}__{option}"] = rounds
+    return CryptContext(schemes=schemes, deprecated="auto", **policy)
+
+pwd_context = build_password_context(settings.PASSWORD_HASH_SCHEMES, settings.PASSWORD_HASH_ROUNDS)
+
+# Hashing is CPU-bound, so it runs on a bounded pool instead of the event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pbkdf2_sha256.verify(plain_password, hashed_password)
+    return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pbkdf2_sha256.hash(password)
+    return pwd_context.hash(password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_and_update_password, plain_password, hashed_password)
+
+def shutdown_password_executor() -> None:
+    _password_executor.shutdown(wait=False, cancel_futures=True)
 
 def create_access_token(data:dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -25,7 +62,7 @@ def create_access_token(data:dict, expires_delta: Optional[timedelta] = None) ->
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid4().hex, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -36,7 +73,7 @@ def create_refress_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
 
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid4().hex, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
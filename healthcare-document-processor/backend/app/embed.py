@@ -0,0 +1,69 @@
+"""Embed every chunk that has no vector from the configured model.
+
+    python -m app.embed
+    python -m app.embed --batch 2000 --limit 50000
+
+New chunks are embedded as documents are processed; this fills in chunks
+from before embedding was enabled, from after a model change, or from runs
+where the model couldn't be loaded, and adds them to the vector index. Each
+batch is committed on its own, so an interrupted run just picks up where it
+stopped.
+"""
+import argparse
+import sys
+import time
+
+from app.core.database import SessionLocal
+from app.services.embedding_service import ChunkEmbeddingService
+from app.services.registry import services
+from app.services.vector_index import vector_index
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.embed", description="Backfill chunk embeddings")
+    parser.add_argument("--batch", type=int, default=1000, help="Chunks embedded and committed per round")
+    parser.add_argument("--limit", type=int, help="Stop after this many chunks")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    backend = services.embeddings
+    if backend is None:
+        print("No embedding backend is configured or it failed to load", file=sys.stderr)
+        return 1
+
+    db = SessionLocal()
+    total, hits, misses, started = 0, 0, 0, time.perf_counter()
+    try:
+        service = ChunkEmbeddingService(db, backend)
+        while args.limit is None or total < args.limit:
+            size = args.batch if args.limit is None else min(args.batch, args.limit - total)
+            chunks = service.pending_chunks(size)
+            if not chunks:
+                break
+            documents = {(chunk.document.user_id, chunk.document_id) for chunk in chunks}
+            stats = service.embed_chunks(chunks)
+            db.commit()
+            for user_id, document_id in documents:
+                vector_index.index_document(db, backend.model_name, user_id, document_id)
+            total += stats["chunks"]
+            hits += stats["cache_hits"]
+            misses += stats["cache_misses"]
+            print(
+                f"{total} chunks embedded with {stats['model']}: "
+                f"this round {stats['chunks_per_second'] or 0:.1f} chunks/s, {stats['cache_hit_rate'] or 0:.1%} cached; "
+                f"overall {total / (time.perf_counter() - started):.1f} chunks/s, {hits / max(hits + misses, 1):.1%} cached",
+                flush=True
+            )
+        return 0
+    except KeyboardInterrupt:
+        print(f"Interrupted after {total} chunks; run again to continue", file=sys.stderr)
+        return 130
+    finally:
+        db.close()
+        services.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,12 @@ from .user import User, UserRole
 from .document import Document, DocumentStatus, DocumentType
 from .analysis import DocumentAnalysis, AnalysisStatus, AnalysisType
 from .chunk import DocumentChunk
+from .tag import DocumentTag
+from .revocation import TokenRevocation
+from .blob import StoredBlob
+from .job import ProcessingJob, JobPriority, JobStatus
+from .batch import ProcessingBatch, BatchStatus
+from .embedding_cache import EmbeddingCacheEntry
 
 __all__ = [
     "User",
@@ -12,5 +18,14 @@ __all__ = [
     "DocumentAnalysis",
     "AnalysisStatus",
     "AnalysisType",
-    "DocumentChunk"
+    "DocumentChunk",
+    "DocumentTag",
+    "TokenRevocation",
+    "StoredBlob",
+    "ProcessingJob",
+    "JobPriority",
+    "JobStatus",
+    "ProcessingBatch",
+    "BatchStatus",
+    "EmbeddingCacheEntry"
 ]
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, UUID, DateTime, Enum, ForeignKey, Integer, JSON
+from sqlalchemy.sql import func
+import enum
+from uuid import uuid4
+from app.core.database import Base
+from app.models.job import JobPriority
+
+
+class BatchStatus(str, enum.Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+class ProcessingBatch(Base):
+    __tablename__ = "processing_batches"
+
+    id = Column(UUID, primary_key=True, index=True, default=uuid4)
+    created_by = Column(UUID, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)  # None when started from the CLI
+    status = Column(Enum(BatchStatus), default=BatchStatus.RUNNING, nullable=False)
+    priority = Column(Enum(JobPriority), default=JobPriority.BACKFILL, nullable=False)
+    filters = Column(JSON, nullable=False)  # user_id, document_type, status, created_after, created_before
+    concurrency = Column(Integer, nullable=False)  # Jobs of this batch queued or running at once
+    cursor_document_id = Column(UUID, nullable=True)  # Checkpoint: documents are walked in id order up to here
+    enqueued = Column(Integer, default=0, nullable=False)
+    embedding_cache_hits = Column(Integer, default=0, nullable=False)  # Summed over the batch's finished jobs
+    embedding_cache_misses = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<ProcessingBatch(id={self.id}, status='{self.status}', enqueued={self.enqueued})>"
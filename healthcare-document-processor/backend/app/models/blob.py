@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, UUID, String, DateTime, Integer
+from sqlalchemy.sql import func
+from uuid import uuid4
+from app.core.database import Base
+
+class StoredBlob(Base):
+    __tablename__ = "stored_blobs"
+
+    id = Column(UUID, primary_key=True, index=True, default=uuid4)
+    checksum_sha256 = Column(String(64), nullable=False, unique=True)  # Content address of the stored bytes
+    object_key = Column(String(500), nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)  # Documents pointing at this blob
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<StoredBlob(id={self.id}, checksum_sha256={self.checksum_sha256}, ref_count={self.ref_count})>"
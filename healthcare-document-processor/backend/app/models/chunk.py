@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, UUID, Text, JSON, ForeignKey, Float
+from sqlalchemy import Column, DDL, Integer, LargeBinary, String, DateTime, UUID, Text, JSON, ForeignKey, Float, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from uuid import uuid4
@@ -14,6 +14,7 @@ class DocumentChunk(Base):
     content_type = Column(String(50), default="text", nullable=False)  # text, table, image, etc.
     embedding_id = Column(String(255), nullable=True, index=True)  # Vector database embedding ID
     embedding_model = Column(String(100), nullable=True)  # Model used for embedding
+    embedding = Column(LargeBinary, nullable=True)  # Little-endian float32 vector from embedding_model
     chunk_metadata = Column(JSON, nullable=True)  # Additional chunk metadata
     confidence_score = Column(Float, nullable=True)  # Confidence in chunk extraction
     page_number = Column(Integer, nullable=True)  # Source page number
@@ -23,5 +24,39 @@ class DocumentChunk(Base):
 
     document = relationship("Document", back_populates="chunks")
     
-    def __repr__(self):
-        return f"<DocumentChunk(id={self.id}, document_id={self.document_id}, chunk_index={self.chunk_index})>"
\ No newline at end of file
+    def __repr__(self) -> str:
+        return f"<DocumentChunk(id={self.id}, document_id={self.document_id}, chunk_index={self.chunk_index})>"
+
+
+# Full-text index over chunk content. Postgres keeps a generated tsvector column,
+# SQLite mirrors content into an FTS5 table through triggers. Both are maintained
+# per row, so rewriting one chunk never reindexes the rest of its document.
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', content)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_document_chunks_search_vector ON document_chunks USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts "
+    "USING fts5(content, content='document_chunks', content_rowid='rowid')",
+    "CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ai AFTER INSERT ON document_chunks BEGIN "
+    "INSERT INTO document_chunks_fts(rowid, content) VALUES (new.rowid, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ad AFTER DELETE ON document_chunks BEGIN "
+    "INSERT INTO document_chunks_fts(document_chunks_fts, rowid, content) VALUES ('delete', old.rowid, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS document_chunks_fts_au AFTER UPDATE OF content ON document_chunks BEGIN "
+    "INSERT INTO document_chunks_fts(document_chunks_fts, rowid, content) VALUES ('delete', old.rowid, old.content); "
+    "INSERT INTO document_chunks_fts(rowid, content) VALUES (new.rowid, new.content); END",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(DocumentChunk.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(DocumentChunk.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+event.listen(
+    DocumentChunk.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS document_chunks_fts").execute_if(dialect="sqlite")
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Column, UUID, String, DateTime, Text, Enum, JSON, ForeignKey, Float, false, null
+from sqlalchemy import BigInteger, Column, UUID, String, DateTime, Text, Enum, JSON, ForeignKey, Float, Index, false, null
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -23,26 +23,36 @@ class DocumentStatus(str, enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_user_created", "user_id", "created_at"),
+        Index("ix_documents_user_status", "user_id", "status"),
+        Index("ix_documents_user_type", "user_id", "document_type"),
+    )
 
     id = Column(UUID, primary_key=True, index=True, default=uuid4)
     user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
-    file_path = Column(String(500), nullable=False)
+    file_path = Column(String(500), nullable=False)  # This document's own path, shown to clients
+    object_key = Column(String(500), nullable=False)  # Where the bytes are stored; shared by documents with the same content
     file_size = Column(BigInteger, nullable=False)
+    checksum_sha256 = Column(String(64), nullable=True, index=True)  # Computed while the upload streams to storage
     mime_type = Column(String(100), nullable=False)
     document_type = Column(Enum(DocumentType), nullable=False)
     status = Column(Enum(DocumentStatus), default=DocumentStatus.UPLOADED, nullable=False)
     document_metadata = Column(JSON, nullable=True)  # Additional document metadata
     description = Column(Text, nullable=True)
-    tags = Column(JSON, nullable=True)
+    tags = Column(JSON, nullable=True)  # Mirrored into document_tags for indexed filtering
+    ocr_confidence = Column(Float, nullable=True, index=True)  # Promoted from document_metadata for indexed filtering
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, onupdate=func.now())
     processed_at = Column(DateTime(timezone=True), nullable=True)
+    deduplicated_from_id = Column(UUID, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)  # Same user's document whose OCR results were copied; never returned to clients
 
     user = relationship("User", back_populates="documents")
     analyses = relationship("DocumentAnalysis", back_populates="document", cascade="all, delete-orphan")
     chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
+    tag_entries = relationship("DocumentTag", back_populates="document", cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f"<Document(id={self.id}, filename='{self.filename}', status='{self.status}')>"
\ No newline at end of file
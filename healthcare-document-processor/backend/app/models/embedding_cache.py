@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    model = Column(String(100), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)  # sha256 of the normalized chunk text
+    vector = Column(LargeBinary, nullable=False)  # Little-endian float32, as stored on chunks
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)  # Eviction order
+
+    def __repr__(self) -> str:
+        return f"<EmbeddingCacheEntry(model='{self.model}', content_hash='{self.content_hash}')>"
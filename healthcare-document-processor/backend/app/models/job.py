@@ -0,0 +1,54 @@
+from sqlalchemy import Column, UUID, String, DateTime, Text, Enum, ForeignKey, Float, Integer, Index
+from sqlalchemy.sql import func, text
+from sqlalchemy.orm import relationship
+import enum
+from uuid import uuid4
+from app.core.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class JobPriority(str, enum.Enum):
+    STAT = "stat"
+    ROUTINE = "routine"
+    BACKFILL = "backfill"
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+    __table_args__ = (
+        Index("ix_processing_jobs_status_created", "status", "created_at"),
+        Index("ix_processing_jobs_claim", "status", "priority", "user_id", "schedule_at"),
+        # At most one queued or running job per document, however many requests race to enqueue it
+        Index(
+            "uq_processing_jobs_active_document", "document_id", unique=True,
+            postgresql_where=text("status IN ('QUEUED', 'RUNNING')"),
+            sqlite_where=text("status IN ('QUEUED', 'RUNNING')")
+        ),
+    )
+
+    id = Column(UUID, primary_key=True, index=True, default=uuid4)
+    document_id = Column(UUID, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    batch_id = Column(UUID, ForeignKey("processing_batches.id", ondelete="SET NULL"), nullable=True, index=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    priority = Column(Enum(JobPriority), default=JobPriority.ROUTINE, nullable=False)
+    page_count = Column(Integer, default=1, nullable=False)  # Known or estimated; drives the shortest-job-first boost
+    schedule_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Enqueue time pushed back by job size; orders a tenant's queue
+    stage = Column(String(50), nullable=True)  # Current pipeline stage while running
+    progress = Column(Float, default=0.0, nullable=False)  # 0.0 - 1.0
+    attempts = Column(Integer, default=0, nullable=False)  # Incremented each time a worker picks the job up
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Refreshed by the running worker's progress updates
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    document = relationship("Document")
+    batch = relationship("ProcessingBatch")
+
+    def __repr__(self) -> str:
+        return f"<ProcessingJob(id={self.id}, document_id={self.document_id}, status='{self.status}')>"
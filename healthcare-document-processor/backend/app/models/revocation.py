@@ -0,0 +1,18 @@
+from sqlalchemy import Column, UUID, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from uuid import uuid4
+from app.core.database import Base
+
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+
+    id = Column(UUID, primary_key=True, index=True, default=uuid4)
+    jti = Column(String(64), nullable=True, index=True)  # Set when a single token is revoked
+    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)  # Set when every token of a user is revoked
+    revoked_before = Column(DateTime(timezone=True), nullable=True)  # Tokens issued before this instant are rejected
+    reason = Column(String(50), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)  # After this no token it covers can still be valid
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<TokenRevocation(id={self.id}, jti={self.jti}, user_id={self.user_id}, reason='{self.reason}')>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, UUID, String, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from uuid import uuid4
+from app.core.database import Base
+
+class DocumentTag(Base):
+    __tablename__ = "document_tags"
+    __table_args__ = (
+        UniqueConstraint("document_id", "tag", name="uq_document_tags_document_tag"),
+        # Serves tag-filtered listing per user without touching the documents table
+        Index("ix_document_tags_user_tag_document", "user_id", "tag", "document_id"),
+        Index("ix_document_tags_tag_document", "tag", "document_id"),
+    )
+
+    id = Column(UUID, primary_key=True, index=True, default=uuid4)
+    document_id = Column(UUID, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # Denormalized from the document for index-only filtering
+    tag = Column(String(100), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    document = relationship("Document", back_populates="tag_entries")
+
+    def __repr__(self) -> str:
+        return f"<DocumentTag(document_id={self.document_id}, tag='{self.tag}')>"
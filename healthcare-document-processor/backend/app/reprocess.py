@@ -0,0 +1,125 @@
+"""Start and follow document reprocessing batches from the command line.
+
+    python -m app.reprocess start --document-type lab_result --status processed --wait
+    python -m app.reprocess resume <batch-id> --requeue-running --wait
+    python -m app.reprocess status <batch-id>
+    python -m app.reprocess cancel <batch-id>
+
+With Celery, ``--wait`` only follows progress while the workers do the
+processing. The local job queue lives inside whichever process enqueued the
+work, so there ``start`` and ``resume`` always wait, running the processing
+workers here (taking any other queued jobs too) until the batch is done.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import BatchStatus, DocumentStatus, DocumentType, JobPriority
+from app.schemas.document import ProcessingBatchFilter
+from app.services.batch_processing_service import BatchProcessingService
+from app.services.job_queue import LocalJobQueue, job_queue
+from app.services.registry import services
+
+POLL_SECONDS = 2.0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.reprocess", description="Reprocess documents in batches")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("start", help="Start a batch over every document matching the filters")
+    start.add_argument("--user-id", type=UUID)
+    start.add_argument("--document-type", type=DocumentType, choices=list(DocumentType))
+    start.add_argument("--status", type=DocumentStatus, choices=list(DocumentStatus))
+    start.add_argument("--created-after", type=datetime.fromisoformat)
+    start.add_argument("--created-before", type=datetime.fromisoformat)
+    start.add_argument("--priority", type=JobPriority, choices=list(JobPriority), default=JobPriority.BACKFILL)
+    start.add_argument("--concurrency", type=int, default=settings.BATCH_PROCESSING_CONCURRENCY)
+    start.add_argument("--wait", action="store_true", help="Follow the batch until it finishes")
+
+    resume = commands.add_parser("resume", help="Pick up an interrupted batch from its checkpoint")
+    resume.add_argument("batch_id", type=UUID)
+    resume.add_argument("--requeue-running", action="store_true", help="Requeue jobs a dead worker left running")
+    resume.add_argument("--wait", action="store_true")
+
+    for name, help_text in (("status", "Show a batch's progress"), ("cancel", "Stop a batch")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("batch_id", type=UUID)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not 1 <= getattr(args, "concurrency", 1) <= settings.BATCH_PROCESSING_MAX_CONCURRENCY:
+        print(f"--concurrency must be between 1 and {settings.BATCH_PROCESSING_MAX_CONCURRENCY}", file=sys.stderr)
+        return 2
+
+    db = SessionLocal()
+    try:
+        service = BatchProcessingService(db, job_queue=job_queue)
+        if args.command == "start":
+            filters = ProcessingBatchFilter(
+                user_id=args.user_id,
+                document_type=args.document_type,
+                status=args.status,
+                created_after=args.created_after,
+                created_before=args.created_before
+            )
+            batch = service.create_batch(filters, args.priority, args.concurrency)
+        elif args.command == "resume":
+            batch = service.resume(args.batch_id, args.requeue_running)
+        elif args.command == "cancel":
+            batch = service.cancel(args.batch_id)
+        else:
+            batch = service.get_batch(args.batch_id)
+
+        _print_summary(service.summary(batch))
+        local = isinstance(job_queue, LocalJobQueue)
+        if getattr(args, "wait", False) or (local and args.command in ("start", "resume")):
+            return _follow(service, batch.id)
+        return 0
+    finally:
+        db.close()
+
+
+def _follow(service: BatchProcessingService, batch_id: UUID) -> int:
+    local = isinstance(job_queue, LocalJobQueue)
+    if local:
+        services.start()
+        job_queue.start()
+
+    try:
+        while True:
+            time.sleep(POLL_SECONDS)
+            service.db.expire_all()
+            summary = service.summary(service.get_batch(batch_id))
+            _print_summary(summary)
+            if summary["status"] != BatchStatus.RUNNING:
+                return 0 if summary["status"] == BatchStatus.COMPLETED else 1
+    except KeyboardInterrupt:
+        print(f"Interrupted; continue with: python -m app.reprocess resume {batch_id}", file=sys.stderr)
+        return 130
+    finally:
+        if local:
+            job_queue.stop()
+            services.close()
+
+
+def _print_summary(summary: dict) -> None:
+    rate = summary["embedding_cache_hit_rate"]
+    print(
+        f"batch {summary['id']} {summary['status'].value}: "
+        f"{summary['enqueued']} enqueued, {summary['queued']} queued, {summary['running']} running, "
+        f"{summary['succeeded']} succeeded, {summary['failed']} failed"
+        + (f", embedding cache hit rate {rate:.1%}" if rate is not None else ""),
+        flush=True
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -39,4 +39,10 @@ class TokenRefresh(BaseModel):
 class PasswordChange(BaseModel):
     current_password: str
     new_password: str
-    confirm_password: str
\ No newline at end of file
+    confirm_password: str
+class TokenPrincipal(BaseModel):
+    """Caller identity rebuilt from verified access token claims."""
+    id: UUID
+    email: EmailStr
+    role: UserRole
+    is_active: bool = True
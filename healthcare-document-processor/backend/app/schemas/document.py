@@ -1,8 +1,9 @@
 from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
-from pydantic import BaseModel
-from app.models import DocumentStatus, DocumentType
+from pydantic import BaseModel, Field
+from app.core.config import settings
+from app.models import BatchStatus, DocumentStatus, DocumentType, JobPriority, JobStatus
 
 class DocumentUploadResponse(BaseModel):
     id: UUID
@@ -16,9 +17,98 @@ class DocumentUploadResponse(BaseModel):
         from_attributes = True
 
 
+class BulkUploadResult(BaseModel):
+    filename: str
+    status: str  # "created" or "failed"
+    document_id: Optional[UUID] = None
+    document_status: Optional[DocumentStatus] = None
+    error: Optional[str] = None
+
+
+class BulkUploadResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkUploadResult]
+
+
 class DocumentMetadataUpdate(BaseModel):
     description: Optional[str] = None
     tags: Optional[List[str]] = None
     document_type: Optional[DocumentType] = None
     status: Optional[DocumentStatus] = None
-    
\ No newline at end of file
+
+
+class DownloadUrlBatchRequest(BaseModel):
+    document_ids: List[UUID] = Field(..., min_length=1, max_length=200)
+
+
+class DownloadUrlResponse(BaseModel):
+    document_id: UUID
+    url: str
+    expires_in: int  # Seconds the URL remains valid
+
+
+class ChunkSearchHit(BaseModel):
+    chunk_id: UUID
+    document_id: UUID
+    chunk_index: int
+    page_number: Optional[int] = None
+    score: float
+    snippet: str
+
+
+class ChunkSearchResponse(BaseModel):
+    query: str
+    total_hits: Optional[int] = None  # Every matching chunk, not just this page; None for semantic search, which only ranks the nearest
+    hits: List[ChunkSearchHit]
+
+
+class ProcessingJobResponse(BaseModel):
+    id: UUID
+    document_id: UUID
+    status: JobStatus
+    priority: JobPriority
+    page_count: int
+    stage: Optional[str] = None
+    progress: float
+    queue_position: Optional[int] = None
+    attempts: int
+    error_message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ProcessingBatchFilter(BaseModel):
+    user_id: Optional[UUID] = None
+    document_type: Optional[DocumentType] = None
+    status: Optional[DocumentStatus] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+
+class ProcessingBatchCreate(BaseModel):
+    filters: ProcessingBatchFilter = Field(default_factory=ProcessingBatchFilter)
+    priority: JobPriority = JobPriority.BACKFILL
+    concurrency: int = Field(settings.BATCH_PROCESSING_CONCURRENCY, ge=1, le=settings.BATCH_PROCESSING_MAX_CONCURRENCY)
+
+
+class ProcessingBatchResponse(BaseModel):
+    id: UUID
+    status: BatchStatus
+    priority: JobPriority
+    filters: dict
+    concurrency: int
+    enqueued: int
+    queued: int = 0
+    running: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+    embedding_cache_hit_rate: Optional[float] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
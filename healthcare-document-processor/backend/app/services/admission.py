@@ -0,0 +1,307 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import JobPriority, JobStatus, ProcessingJob
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+OUTCOMES = ("accepted", "deferred", "shed")
+WORKER_MEMORY_PREFIX = "admission:worker-memory"
+
+
+class QueueLoad(NamedTuple):
+    queued_jobs: int
+    outstanding_pages: int  # Pages queued or being OCR'd right now
+    drain_pages_per_second: float  # Measured over the scheduler's fairness window
+
+
+class AdmissionController:
+    """Decides whether new processing and upload work is taken on now.
+
+    Work beyond the queue limits is deferred with 429, and work arriving
+    while the hosts that would run it are short of memory is shed with 503;
+    both carry a Retry-After. Uploads are buffered by this process, so they
+    are checked against its own memory; jobs are too with the local queue,
+    but with Celery they run elsewhere and are checked against the reports
+    the workers publish instead. Every limit is scaled by the request's priority share, so
+    as load builds backfill is turned away first, then routine, and STAT
+    last. Queue load comes from the jobs table, so the limits hold across
+    API processes; it is cached briefly so a burst of requests costs one
+    aggregate query.
+    """
+
+    def __init__(
+        self,
+        max_queued_jobs: int = settings.ADMISSION_MAX_QUEUED_JOBS,
+        max_outstanding_pages: int = settings.ADMISSION_MAX_OUTSTANDING_PAGES,
+        min_available_memory: int = settings.ADMISSION_MIN_AVAILABLE_MEMORY_MB * MB,
+        max_concurrent_uploads: int = settings.ADMISSION_MAX_CONCURRENT_UPLOADS,
+        priority_shares: Optional[Dict[str, float]] = None,
+        snapshot_ttl: float = settings.ADMISSION_SNAPSHOT_TTL_SECONDS,
+        worker_memory: Optional["WorkerMemoryReports"] = None,
+    ) -> None:
+        self.max_queued_jobs = max_queued_jobs
+        self.max_outstanding_pages = max_outstanding_pages
+        self.min_available_memory = min_available_memory
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self.priority_shares = priority_shares or settings.ADMISSION_PRIORITY_SHARES
+        self.snapshot_ttl = snapshot_ttl
+        self.worker_memory = worker_memory
+        self.window = timedelta(seconds=settings.SCHEDULER_FAIRNESS_WINDOW_SECONDS)
+
+        self._lock = threading.Lock()
+        self._load: Optional[QueueLoad] = None
+        self._load_at = 0.0
+        self._memory: Optional[int] = None
+        self._memory_at = 0.0
+        self._worker_memory: Optional[int] = None
+        self._worker_memory_at = 0.0
+        self._uploads_in_flight = 0
+        self._counters: Dict[str, Dict[str, int]] = {
+            kind: dict.fromkeys(OUTCOMES, 0)
+            for kind in [priority.value for priority in JobPriority] + ["upload"]
+        }
+
+    def _share(self, priority: JobPriority) -> float:
+        return self.priority_shares.get(priority.value, 1.0)
+
+    def admit_job(self, db: Session, priority: JobPriority, pages: int) -> None:
+        """Raise 429 or 503 unless a job of this priority and size may be queued now."""
+        if not settings.ADMISSION_ENABLED:
+            return
+
+        share = self._share(priority)
+        self._check_memory(priority.value, share, self._job_memory())
+
+        load = self._queue_load(db)
+        allowed_pages = self.max_outstanding_pages * share
+        if load.queued_jobs + 1 > self.max_queued_jobs * share or load.outstanding_pages + pages > allowed_pages:
+            self._count(priority.value, "deferred")
+            excess = load.outstanding_pages + pages - allowed_pages
+            _reject(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                f"Processing queue is full for {priority.value} work, try again later",
+                self._drain_time(max(excess, pages), load)
+            )
+
+        with self._lock:
+            # Count this job now so the rest of a burst sees it before the next refresh
+            self._load = load._replace(queued_jobs=load.queued_jobs + 1, outstanding_pages=load.outstanding_pages + pages)
+        self._count(priority.value, "accepted")
+
+    @contextmanager
+    def upload_slot(self) -> Iterator[None]:
+        """Hold one of the upload slots for the duration of an upload request."""
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+
+        self._check_memory("upload", self._share(JobPriority.ROUTINE), self._available_memory())
+        with self._lock:
+            if self._uploads_in_flight >= self.max_concurrent_uploads:
+                self._counters["upload"]["deferred"] += 1
+                full = True
+            else:
+                self._uploads_in_flight += 1
+                self._counters["upload"]["accepted"] += 1
+                full = False
+        if full:
+            _reject(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many uploads in progress, try again later",
+                settings.ADMISSION_UPLOAD_RETRY_AFTER_SECONDS
+            )
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._uploads_in_flight -= 1
+
+    def _check_memory(self, kind: str, share: float, available: Optional[int]) -> None:
+        # Lower-priority work needs proportionally more headroom left over
+        if available is not None and available < self.min_available_memory / share:
+            self._count(kind, "shed")
+            _reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Server is under memory pressure, try again later",
+                settings.ADMISSION_DEFAULT_RETRY_AFTER_SECONDS
+            )
+
+    def _drain_time(self, pages: float, load: QueueLoad) -> float:
+        if load.drain_pages_per_second <= 0:
+            return settings.ADMISSION_DEFAULT_RETRY_AFTER_SECONDS
+        return pages / load.drain_pages_per_second
+
+    def _queue_load(self, db: Session) -> QueueLoad:
+        now = time.monotonic()
+        with self._lock:
+            if self._load is not None and now - self._load_at < self.snapshot_ttl:
+                return self._load
+
+        queued_jobs, outstanding_pages = db.query(
+            func.coalesce(func.sum(case((ProcessingJob.status == JobStatus.QUEUED, 1), else_=0)), 0),
+            func.coalesce(func.sum(ProcessingJob.page_count), 0)
+        ).filter(ProcessingJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])).one()
+
+        drained_pages = db.query(func.coalesce(func.sum(ProcessingJob.page_count), 0)).filter(
+            ProcessingJob.finished_at >= datetime.utcnow() - self.window
+        ).scalar()
+
+        load = QueueLoad(int(queued_jobs), int(outstanding_pages), drained_pages / self.window.total_seconds())
+        with self._lock:
+            self._load = load
+            self._load_at = now
+        return load
+
+    def _available_memory(self) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._memory_at < self.snapshot_ttl:
+                return self._memory
+
+        memory = read_available_memory()
+        with self._lock:
+            self._memory = memory
+            self._memory_at = now
+        return memory
+
+    def _job_memory(self) -> Optional[int]:
+        """Memory left where queued jobs will run; None, skipping the check, when no worker reports it."""
+        if self.worker_memory is None:
+            return self._available_memory()
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._worker_memory_at < self.snapshot_ttl:
+                return self._worker_memory
+
+        try:
+            memory = self.worker_memory.most_available()
+        except Exception as e:
+            logger.warning(f"Worker memory reports unavailable: {e}")
+            memory = None
+        with self._lock:
+            self._worker_memory = memory
+            self._worker_memory_at = now
+        return memory
+
+    def _count(self, kind: str, outcome: str) -> None:
+        with self._lock:
+            self._counters[kind][outcome] += 1
+
+    def stats(self, db: Session) -> dict:
+        load = self._queue_load(db)
+        available = self._available_memory()
+        job_memory = self._job_memory()
+        with self._lock:
+            counters = {kind: dict(outcomes) for kind, outcomes in self._counters.items()}
+            uploads_in_flight = self._uploads_in_flight
+        return {
+            "enabled": settings.ADMISSION_ENABLED,
+            "counters": counters,
+            "load": {
+                **load._asdict(),
+                "uploads_in_flight": uploads_in_flight,
+                "available_memory_mb": available // MB if available is not None else None,
+                "job_available_memory_mb": job_memory // MB if job_memory is not None else None,
+                "job_memory_source": "workers" if self.worker_memory is not None else "local",
+            },
+            "limits": {
+                "max_queued_jobs": self.max_queued_jobs,
+                "max_outstanding_pages": self.max_outstanding_pages,
+                "min_available_memory_mb": self.min_available_memory // MB,
+                "max_concurrent_uploads": self.max_concurrent_uploads,
+                "priority_shares": self.priority_shares,
+            },
+        }
+
+
+def read_available_memory() -> Optional[int]:
+    """Bytes of memory still available to this process's container, or the host if unconfined."""
+    try:
+        limit = Path("/sys/fs/cgroup/memory.max").read_text().strip()
+        if limit != "max":
+            used = int(Path("/sys/fs/cgroup/memory.current").read_text())
+            return max(int(limit) - used, 0)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+class WorkerMemoryReports:
+    """Available memory of each Celery worker host, shared through Redis.
+
+    Each host writes its figure under its own key, which expires after a
+    few missed reports, so hosts that stop reporting drop out by themselves.
+    Jobs go to whichever worker is free, so work is shed only once no host
+    has enough headroom left.
+    """
+
+    def __init__(self, client, interval: float = settings.ADMISSION_WORKER_MEMORY_REPORT_SECONDS) -> None:
+        self.client = client
+        self.interval = interval
+
+    def publish(self, host: str, available: Optional[int]) -> None:
+        if available is not None:
+            self.client.set(f"{WORKER_MEMORY_PREFIX}:{host}", available, ex=max(1, math.ceil(self.interval * 3)))
+
+    def reports(self) -> List[int]:
+        keys = list(self.client.scan_iter(match=f"{WORKER_MEMORY_PREFIX}:*"))
+        if not keys:
+            return []
+        return [int(value) for value in self.client.mget(keys) if value is not None]
+
+    def most_available(self) -> Optional[int]:
+        reports = self.reports()
+        return max(reports) if reports else None
+
+    def run(self, host: str) -> None:
+        """Publish this host's available memory every ``interval`` seconds; runs until the process exits."""
+        while True:
+            try:
+                self.publish(host, read_available_memory())
+            except Exception as e:
+                logger.warning(f"Failed to publish worker memory: {e}")
+            time.sleep(self.interval)
+
+
+def create_worker_memory_reports() -> Optional[WorkerMemoryReports]:
+    try:
+        import redis
+    except ImportError:
+        logger.warning("redis is not installed; job admission falls back to this host's memory")
+        return None
+    return WorkerMemoryReports(redis.Redis.from_url(settings.REDIS_URL))
+
+def _reject(status_code: int, detail: str, retry_after: float) -> None:
+    retry_after = min(max(1, math.ceil(retry_after)), settings.ADMISSION_MAX_RETRY_AFTER_SECONDS)
+    raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+admission_controller = AdmissionController(
+    worker_memory=create_worker_memory_reports() if settings.JOB_QUEUE_BACKEND == "celery" else None
+)
+
+def get_admission_controller() -> AdmissionController:
+    return admission_controller
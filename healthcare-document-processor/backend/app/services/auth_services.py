@@ -1,9 +1,12 @@
 from datetime import datetime
 from typing import Optional
+from uuid import UUID
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status, Depends
 from app.core.database import get_db
-from app.core.security import create_token_pair, verify_password, get_password_hash, create_access_token, verify_token
+from app.core.principal_cache import principal_cache
+from app.core.revocation import revocation_store
+from app.core.security import create_token_pair, get_password_hash_async, create_access_token, verify_and_update_password_async, verify_token
 from app.models import User, UserRole
 from app.schemas.auth import UserCreate, UserLogin
 
@@ -12,7 +15,7 @@ class AuthService:
     def __init__(self, db: Session):
         self.db = db
 
-    def register_user(self, user_data: UserCreate) -> dict:
+    async def register_user(self, user_data: UserCreate) -> dict:
 
         if user_data.password != user_data.confirm_password:
             raise HTTPException(
@@ -36,7 +39,7 @@ class AuthService:
                 detail="Password must be at least 8 characters long"
             )
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         new_user = User(
             email=user_data.email,
             password_hash=hashed_password,
@@ -64,11 +67,15 @@ class AuthService:
             "tokens": tokens
         }
 
-    def login_user(self, login_data: UserLogin) -> dict:
+    async def login_user(self, login_data: UserLogin) -> dict:
         
         user = self.db.query(User).filter(User.email == login_data.email).first()
 
-        if not user or not verify_password(login_data.password, user.password_hash):
+        verified, new_hash = (False, None)
+        if user:
+            verified, new_hash = await verify_and_update_password_async(login_data.password, user.password_hash)
+
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -81,8 +88,12 @@ class AuthService:
                 detail="Account is deactivated"
             )
 
+        if new_hash:
+            # Hash predates the current policy; upgrade it while we have the plaintext
+            user.password_hash = new_hash
         user.last_login = datetime.utcnow()
         self.db.commit()
+        principal_cache.invalidate(user.id)
 
         tokens = create_token_pair(
             user_id=str(user.id),
@@ -107,13 +118,13 @@ class AuthService:
         payload = verify_token(refresh_token, "refresh")
         user_id = payload.get("sub")
 
-        if not user_id:
+        if not user_id or revocation_store.is_revoked(payload):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
 
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.query(User).filter(User.id == _parse_subject(user_id)).first()
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -132,8 +143,10 @@ class AuthService:
         }
 
     def get_current_user(self, token: str) -> User:
+        return self.get_user_by_claims(verify_token(token, "access"))
+
+    def get_user_by_claims(self, payload: dict) -> User:
 
-        payload = verify_token(token, "access")
         user_id = payload.get("sub")
 
         if not user_id:
@@ -141,14 +154,29 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             )
-        user = self.db.query(User).filter(User.id == user_id).first()
+
+        user = principal_cache.get(self.db, user_id)
+        if user is not None:
+            return user
+
+        user = self.db.query(User).filter(User.id == _parse_subject(user_id)).first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
 
+        principal_cache.put(user)
         return user
 
+def _parse_subject(user_id: str) -> UUID:
+    try:
+        return UUID(str(user_id))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token subject"
+        )
+
 def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
         return AuthService(db)
\ No newline at end of file
@@ -0,0 +1,244 @@
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import BatchStatus, Document, JobPriority, JobStatus, ProcessingBatch, ProcessingJob, User
+from app.schemas.document import ProcessingBatchFilter
+from app.services.admission import AdmissionController, admission_controller
+from app.services.job_queue import JobQueue, get_job_queue
+from app.services.job_scheduler import JobScheduler, estimate_page_count, job_scheduler
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+REFILL_ATTEMPTS = 3
+# Serializes refills between worker threads; the row lock covers other processes
+_advance_lock = threading.Lock()
+
+
+class BatchProcessingService:
+    """Reprocesses every document matching a filter through the job queue.
+
+    A batch keeps at most ``concurrency`` of its jobs queued or running and
+    refills that window each time one of them finishes, so a large corpus
+    never floods the queue and runs on the workers' already-loaded OCR and
+    storage clients. Documents are walked in id order; each refill creates
+    its jobs and moves the checkpoint in the same commit, so an interrupted
+    batch resumes right after the last document it handed out.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        job_queue: Optional[JobQueue] = None,
+        scheduler: Optional[JobScheduler] = None,
+        admission: Optional[AdmissionController] = None
+    ) -> None:
+        self.db = db
+        self.job_queue = job_queue or get_job_queue()
+        self.scheduler = scheduler or job_scheduler
+        self.admission = admission or admission_controller
+
+    def create_batch(
+        self,
+        filters: ProcessingBatchFilter,
+        priority: JobPriority,
+        concurrency: int,
+        user: Optional[User] = None
+    ) -> ProcessingBatch:
+        batch = ProcessingBatch(
+            created_by=user.id if user else None,
+            status=BatchStatus.RUNNING,
+            priority=priority,
+            filters=filters.model_dump(mode="json", exclude_none=True),
+            concurrency=concurrency,
+            enqueued=0
+        )
+        self.db.add(batch)
+        self.db.commit()
+
+        self.advance(batch.id)
+        self.db.refresh(batch)
+        return batch
+
+    def get_batch(self, batch_id: UUID) -> ProcessingBatch:
+        batch = self.db.query(ProcessingBatch).filter(ProcessingBatch.id == batch_id).first()
+        if not batch:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+        return batch
+
+    def advance(self, batch_id: UUID) -> int:
+        """Top the batch's window back up to its concurrency; returns how many jobs were queued."""
+        with _advance_lock:
+            for _ in range(REFILL_ATTEMPTS):
+                try:
+                    jobs = self._refill(batch_id)
+                    break
+                except IntegrityError:
+                    # Another request queued one of these documents first; it is busy on the next pass
+                    self.db.rollback()
+            else:
+                jobs = []
+        self._wake(jobs)
+        return len(jobs)
+
+    def _refill(self, batch_id: UUID) -> List[ProcessingJob]:
+        # The row lock keeps two workers finishing jobs at once from handing out the same documents
+        batch = self.db.query(ProcessingBatch).filter(ProcessingBatch.id == batch_id).with_for_update().first()
+        if batch is None or batch.status != BatchStatus.RUNNING:
+            self.db.commit()
+            return []
+
+        active = self._job_counts(batch.id, ACTIVE_STATUSES)
+        room = batch.concurrency - sum(active.values())
+        documents = self._next_documents(batch, room) if room > 0 else []
+
+        if not documents:
+            if not active:
+                batch.status = BatchStatus.COMPLETED
+                batch.finished_at = datetime.utcnow()
+            self.db.commit()
+            return []
+
+        now = datetime.utcnow()
+        jobs = []
+        for document in documents:
+            page_count = estimate_page_count(document)
+            if active or jobs:
+                # Batch work yields to interactive requests under load, but always keeps one job going
+                try:
+                    self.admission.admit_job(self.db, batch.priority, page_count)
+                except HTTPException:
+                    break
+            jobs.append(ProcessingJob(
+                document_id=document.id,
+                user_id=document.user_id,
+                batch_id=batch.id,
+                status=JobStatus.QUEUED,
+                priority=batch.priority,
+                page_count=page_count,
+                created_at=now,
+                schedule_at=self.scheduler.schedule_at(now, page_count)
+            ))
+
+        if jobs:
+            self.db.add_all(jobs)
+            batch.cursor_document_id = jobs[-1].document_id
+            batch.enqueued += len(jobs)
+            batch.updated_at = now
+        self.db.commit()
+        return jobs
+
+    def resume(self, batch_id: UUID, requeue_running: bool = False) -> ProcessingBatch:
+        """Re-send wake-ups for a batch's queued jobs and refill its window.
+
+        ``requeue_running`` puts jobs left running by a dead worker straight
+        back in the queue instead of waiting for the scheduler's timeout; only
+        use it when no worker can still be running them.
+        """
+        batch = self.get_batch(batch_id)
+        if batch.status != BatchStatus.RUNNING:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Batch is {batch.status.value}")
+
+        if requeue_running:
+            self.db.query(ProcessingJob).filter(
+                ProcessingJob.batch_id == batch.id,
+                ProcessingJob.status == JobStatus.RUNNING
+            ).update({ProcessingJob.status: JobStatus.QUEUED, ProcessingJob.stage: None}, synchronize_session=False)
+            self.db.commit()
+
+        queued = self.db.query(ProcessingJob).filter(
+            ProcessingJob.batch_id == batch.id,
+            ProcessingJob.status == JobStatus.QUEUED
+        ).all()
+        self._wake(queued)
+
+        self.advance(batch.id)
+        self.db.refresh(batch)
+        return batch
+
+    def cancel(self, batch_id: UUID) -> ProcessingBatch:
+        """Stop handing out documents and drop queued jobs; running ones are left to finish."""
+        batch = self.get_batch(batch_id)
+        if batch.status != BatchStatus.RUNNING:
+            return batch
+
+        now = datetime.utcnow()
+        self.db.query(ProcessingJob).filter(
+            ProcessingJob.batch_id == batch.id,
+            ProcessingJob.status == JobStatus.QUEUED
+        ).update(
+            {ProcessingJob.status: JobStatus.FAILED, ProcessingJob.error_message: "Batch cancelled", ProcessingJob.finished_at: now},
+            synchronize_session=False
+        )
+        batch.status = BatchStatus.CANCELLED
+        batch.finished_at = now
+        self.db.commit()
+        self.db.refresh(batch)
+        return batch
+
+    def summary(self, batch: ProcessingBatch) -> dict:
+        counts = self._job_counts(batch.id)
+        lookups = batch.embedding_cache_hits + batch.embedding_cache_misses
+        return {
+            "id": batch.id,
+            "status": batch.status,
+            "priority": batch.priority,
+            "filters": batch.filters,
+            "concurrency": batch.concurrency,
+            "enqueued": batch.enqueued,
+            **{job_status.value: counts.get(job_status, 0) for job_status in JobStatus},
+            "embedding_cache_hits": batch.embedding_cache_hits,
+            "embedding_cache_misses": batch.embedding_cache_misses,
+            "embedding_cache_hit_rate": batch.embedding_cache_hits / lookups if lookups else None,
+            "created_at": batch.created_at,
+            "finished_at": batch.finished_at
+        }
+
+    def _job_counts(self, batch_id: UUID, statuses=tuple(JobStatus)) -> dict:
+        return {
+            job_status: count
+            for job_status, count in self.db.query(ProcessingJob.status, func.count()).filter(
+                ProcessingJob.batch_id == batch_id,
+                ProcessingJob.status.in_(statuses)
+            ).group_by(ProcessingJob.status)
+        }
+
+    def _next_documents(self, batch: ProcessingBatch, limit: int) -> List[Document]:
+        filters = ProcessingBatchFilter.model_validate(batch.filters)
+        query = self.db.query(Document)
+
+        if filters.user_id is not None:
+            query = query.filter(Document.user_id == filters.user_id)
+        if filters.document_type is not None:
+            query = query.filter(Document.document_type == filters.document_type)
+        if filters.status is not None:
+            query = query.filter(Document.status == filters.status)
+        if filters.created_after is not None:
+            query = query.filter(Document.created_at >= filters.created_after)
+        if filters.created_before is not None:
+            query = query.filter(Document.created_at < filters.created_before)
+        if batch.cursor_document_id is not None:
+            query = query.filter(Document.id > batch.cursor_document_id)
+
+        # Documents already queued by someone else are passed over rather than processed twice
+        busy = self.db.query(ProcessingJob.id).filter(
+            ProcessingJob.document_id == Document.id,
+            ProcessingJob.status.in_(ACTIVE_STATUSES)
+        ).exists()
+        return query.filter(~busy).order_by(Document.id).limit(limit).all()
+
+    def _wake(self, jobs: List[ProcessingJob]) -> None:
+        # Rows are already committed; a lost wake-up is recovered by resume
+        for job in jobs:
+            try:
+                self.job_queue.enqueue(job.id)
+            except Exception as e:
+                logger.warning(f"Could not enqueue batch job {job.id}: {e}")
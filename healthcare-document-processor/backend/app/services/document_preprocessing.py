@@ -1,6 +1,8 @@
 import re
-from typing import List, Tuple
-from app.services.ocr_service import OCRService
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+from app.services.ocr_service import OCRService, PageCallback
+from app.utils.helpers import timed
 
 class DocumentPreprocessor:
     def __init__(self, ocr_service: OCRService) -> None:
@@ -47,6 +49,8 @@ class DocumentPreprocessor:
                 'word_count': len(chunk_words)
             })
 
+            if end_idx == len(words):
+                break
             start_idx = end_idx - chunk_overlap
             chunk_index += 1
 
@@ -54,17 +58,21 @@ class DocumentPreprocessor:
 
     def process_document(
         self, 
-        file_bytes: bytes,
+        file_path: Union[str, Path],
         filename: str,
         mime_type: str,
         chunk_size: int = 1000,
-        chunk_overlap: int = 200
+        chunk_overlap: int = 200,
+        on_page: Optional[PageCallback] = None
     ) -> dict:
         raw_text, ocr_metadata = self.ocr_service.extract_text_from_file(
-            file_bytes, filename, mime_type
+            file_path, filename, mime_type, on_page=on_page
         )
-        cleaned_text = self.clean_text(raw_text)
-        chunks = self.chunk_text(cleaned_text, chunk_size, chunk_overlap)
+        timings = {}
+        with timed(timings, 'clean'):
+            cleaned_text = self.clean_text(raw_text)
+        with timed(timings, 'chunk'):
+            chunks = self.chunk_text(cleaned_text, chunk_size, chunk_overlap)
 
         return {
             'raw_text': raw_text,
@@ -73,5 +81,6 @@ class DocumentPreprocessor:
             'ocr_metadata': ocr_metadata,
             'total_chunks': len(chunks),
             'total_characters': len(cleaned_text),
-            'total_words': len(cleaned_text.split())
+            'total_words': len(cleaned_text.split()),
+            'timings': timings
         }
\ No newline at end of file
@@ -1,23 +1,49 @@
+import logging
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Callable, List, Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
-from app.models import Document, DocumentStatus, DocumentChunk, User
-from app.services.ocr_service import OCRService
+from app.models import AnalysisStatus, AnalysisType, Document, DocumentAnalysis, DocumentStatus, DocumentChunk, User
+from app.services.embedding_service import ChunkEmbeddingService, EmbeddingBackend
+from app.services.ocr_service import OCR_DPI, OCRService, PageCallback
 from app.services.document_preprocessing import DocumentPreprocessor
-from app.services.storage_service import S3StorageService
+from app.services.registry import get_embedding_backend, get_storage_service
+from app.services.storage_service import StorageBackend
+from app.services.vector_index import VectorIndex, get_vector_index
+from app.utils.helpers import timed
+
+logger = logging.getLogger(__name__)
 
 
 class DocumentProcessingService:
-    def __init__(self, db: Session, ocr_service: Optional[OCRService], storage_service: Optional[S3StorageService]) -> None:
+    def __init__(
+        self,
+        db: Session,
+        ocr_service: Optional[OCRService],
+        storage_service: Optional[StorageBackend],
+        embedding_backend: Optional[EmbeddingBackend] = None,
+        vector_index: Optional[VectorIndex] = None
+    ) -> None:
         self.db = db
         self.ocr_service = ocr_service or OCRService()
         self.preprocessor = DocumentPreprocessor(self.ocr_service)
-        self.storage_service = storage_service or S3StorageService()
+        self.storage_service = storage_service or get_storage_service()
+        self.embedding_backend = embedding_backend or get_embedding_backend()
+        self.vector_index = vector_index or get_vector_index()
+        self.embedding_stats: Optional[dict] = None  # From the last document processed, for run-level totals
+
+    def process_document(
+        self,
+        document_id: UUID,
+        user: User,
+        on_progress: Optional[Callable[[str, float, Optional[dict]], None]] = None,
+        twins_processed_after: Optional[datetime] = None
+    ) -> Document:
+        report = on_progress or _ignore_progress
 
-    def process_document(self, document_id: UUID, user: User) -> Document:
         document = self.db.query(Document).filter(
             Document.id == document_id,
             Document.user_id == user.id
@@ -26,57 +52,87 @@ class DocumentProcessingService:
         if not document:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Document not found')
 
+        twin = find_processed_twin(
+            self.db, document.user_id, document.checksum_sha256, exclude_id=document.id, processed_after=twins_processed_after
+        )
+        if twin is not None:
+            # Identical bytes were already OCR'd; reuse that output instead of running it again
+            copy_processing_results(twin, document)
+            document.updated_at = datetime.utcnow()
+            self.db.flush()
+            # Copied vectors are kept; only those from another model are redone
+            self._embed_chunks(document.id)
+            self.db.commit()
+            self._index_chunks(document)
+            self.db.refresh(document)
+            return document
+
         document.status = DocumentStatus.PROCESSING
         document.updated_at = datetime.utcnow()
         self.db.commit()
 
+        timings = {}
+        page_timings = []
         try:
-            file_bytes = self._download_file_from_s3(document.file_path)
-            processing_result = self.preprocessor.process_document(
-                file_bytes=file_bytes,
-                filename=document.filename,
-                mime_type=document.mime_type
-            )
+            report('ocr', 0.1)
+            # OCR tools read from a path: local files are used in place, remote
+            # objects are streamed to a temp file once and never held as bytes
+            started = time.perf_counter()
+            with self.storage_service.local_copy(document.object_key) as file_path:
+                timings['download'] = time.perf_counter() - started
+                processing_result = self.preprocessor.process_document(
+                    file_path=file_path,
+                    filename=document.filename,
+                    mime_type=document.mime_type,
+                    on_page=_page_reporter(report)
+                )
 
-            self.db.query(DocumentChunk).filter(
-                DocumentChunk.document_id == document_id
-            ).delete()
+            ocr_metadata = processing_result['ocr_metadata']
+            page_timings = _page_timings(ocr_metadata)
+            for page in page_timings:
+                for stage in ('rasterize', 'preprocess', 'ocr'):
+                    if stage in page:
+                        timings[stage] = timings.get(stage, 0.0) + page[stage]
+            timings.update(processing_result['timings'])
 
-            for chunk_data in processing_result['chunks']:
-                chunk = DocumentChunk(
-                    document_id=document_id,
-                    chunk_index=chunk_data['chunk_index'],
-                    content = chunk_data['content'],
-                    content_type='text',
-                    page_number=processing_result['ocr_metadata'].get('pages', [{}])[0].get('page_number') if processing_result['ocr_metadata'].get('pages') else None,
-                    metadata={
-                        'start_char': chunk_data['start_char'],
-                        'end_char': chunk_data['end_char'],
-                        'word_count': chunk_data.get('word_count', 0)
-                    }
-                )
-                self.db.add(chunk)
+            report('indexing', 0.9)
+            with timed(timings, 'persist'):
+                page_number = ocr_metadata.get('pages', [{}])[0].get('page_number') if ocr_metadata.get('pages') else None
+                self._sync_chunks(document_id, processing_result['chunks'], page_number)
 
-            document.status = DocumentStatus.PROCESSED
-            document.processed_at = datetime.utcnow()
-            document.document_metadata = {
-                'ocr_confidence': processing_result['ocr_metadata'].get('average_confidence', 0),
-                'total_chunks': processing_result['total_chunks'],
-                'total_words': processing_result['total_words'],
-                'total_characters': processing_result['total_characters']
-            }
-            document.updated_at = datetime.utcnow()
+                # PDFs report an average over their pages, single images just their own confidence
+                confidence = ocr_metadata.get('average_confidence', ocr_metadata.get('confidence', 0))
+                document.status = DocumentStatus.PROCESSED
+                document.processed_at = datetime.utcnow()
+                document.ocr_confidence = confidence
+                document.document_metadata = {
+                    'ocr_confidence': confidence,
+                    'total_chunks': processing_result['total_chunks'],
+                    'total_pages': ocr_metadata.get('total_pages', 1),
+                    'total_words': processing_result['total_words'],
+                    'total_characters': processing_result['total_characters']
+                }
+                document.updated_at = datetime.utcnow()
+                self.db.flush()
+
+            with timed(timings, 'embed'):
+                embedding_stats = self._embed_chunks(document_id)
+
+            self.db.add(self._ocr_analysis(document, AnalysisStatus.COMPLETED, timings, page_timings, ocr_metadata, embedding_stats))
             self.db.commit()
+            self._index_chunks(document)
             self.db.refresh(document)
 
             return document
 
         except Exception as e:
+            self.db.rollback()
             document.status = DocumentStatus.FAILED
             document.document_metadata = {
                 'error': str(e)
             }
             document.updated_at = datetime.utcnow()
+            self.db.add(self._ocr_analysis(document, AnalysisStatus.FAILED, timings, page_timings, error=str(e)))
             self.db.commit()
 
             raise HTTPException(
@@ -84,16 +140,108 @@ class DocumentProcessingService:
                 detail=f"Document processing failed: {e}"
             )
 
-    def _download_file_from_s3(self, object_key: str) -> bytes:
-        try:
-            response = self.storage_service.client.get_object(Bucket=self.storage_service.bucket, Key=object_key)
-            return response['Body'].read()
+    def _ocr_analysis(
+        self,
+        document: Document,
+        analysis_status: AnalysisStatus,
+        timings: dict,
+        page_timings: List[dict],
+        ocr_metadata: Optional[dict] = None,
+        embedding_stats: Optional[dict] = None,
+        error: Optional[str] = None
+    ) -> DocumentAnalysis:
+        """OCR run record; stage timings feed the pipeline timing percentiles."""
+        ocr_metadata = ocr_metadata or {}
+        now = datetime.utcnow()
+        return DocumentAnalysis(
+            document_id=document.id,
+            user_id=document.user_id,
+            analysis_type=AnalysisType.OCR,
+            status=analysis_status,
+            extracted_data={
+                'total_pages': ocr_metadata.get('total_pages', len(page_timings) or 1),
+                'total_words': ocr_metadata.get('total_words'),
+                'stage_timings': timings,
+                'page_timings': page_timings,
+                'embedding': embedding_stats
+            },
+            confidence_scores={
+                'average': ocr_metadata.get('average_confidence', ocr_metadata.get('confidence')),
+                'pages': [page.get('confidence') for page in ocr_metadata.get('pages', [])]
+            } if ocr_metadata else None,
+            processing_time=sum(timings.values()),
+            error_message=error,
+            model_version=self.ocr_service.engine_version(),
+            parameters={'mime_type': document.mime_type, 'dpi': OCR_DPI},
+            completed_at=now
+        )
+
+    def _embed_chunks(self, document_id: UUID) -> Optional[dict]:
+        self.embedding_stats = None
+        if self.embedding_backend is None:
+            return None
 
+        try:
+            stats = ChunkEmbeddingService(self.db, self.embedding_backend).embed_document(document_id)
         except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to download file from storage: {e}"
+            # Keep the OCR output; the chunks stay pending for python -m app.embed
+            logger.warning(f"Could not embed chunks of document {document_id}: {e}")
+            return {'model': self.embedding_backend.model_name, 'error': str(e)}
+
+        if stats['chunks']:
+            logger.info(
+                f"Embedded {stats['chunks']} chunks of document {document_id} with {stats['model']} "
+                f"in {stats['seconds']:.2f}s ({stats['chunks_per_second'] or 0:.1f} chunks/s, "
+                f"{stats['cache_hits']} of {stats['cache_hits'] + stats['cache_misses']} texts cached)"
             )
+        self.embedding_stats = stats
+        return stats
+
+    def _index_chunks(self, document: Document) -> None:
+        # After the commit: the index is rebuilt from committed embeddings, never ahead of them
+        if self.embedding_backend is None:
+            return
+        try:
+            self.vector_index.index_document(self.db, self.embedding_backend.model_name, document.user_id, document.id)
+        except Exception as e:
+            logger.warning(f"Could not update the vector index for document {document.id}: {e}")
+
+    def _sync_chunks(self, document_id: UUID, chunks_data: List[dict], page_number: Optional[int]) -> None:
+        # Update chunks in place by index so unchanged rows keep their search index entries
+        existing = {
+            chunk.chunk_index: chunk
+            for chunk in self.db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id)
+        }
+
+        for chunk_data in chunks_data:
+            metadata = {
+                'start_char': chunk_data['start_char'],
+                'end_char': chunk_data['end_char'],
+                'word_count': chunk_data.get('word_count', 0)
+            }
+            chunk = existing.pop(chunk_data['chunk_index'], None)
+            if chunk is None:
+                self.db.add(DocumentChunk(
+                    document_id=document_id,
+                    chunk_index=chunk_data['chunk_index'],
+                    content=chunk_data['content'],
+                    content_type='text',
+                    page_number=page_number,
+                    chunk_metadata=metadata
+                ))
+                continue
+
+            if chunk.content != chunk_data['content']:
+                chunk.content = chunk_data['content']
+                # The old vector no longer describes this text
+                chunk.embedding = None
+                chunk.embedding_id = None
+                chunk.embedding_model = None
+            chunk.page_number = page_number
+            chunk.chunk_metadata = metadata
+
+        for stale in existing.values():
+            self.db.delete(stale)
 
     def get_document_text(self, document_id: UUID, user: User) -> dict:
         
@@ -124,4 +272,81 @@ class DocumentProcessingService:
             'text': full_text,
             'total_chunks': len(chunks),
             'metadata': document.document_metadata
-        }
\ No newline at end of file
+        }
+
+
+def _ignore_progress(stage: str, progress: float, details: Optional[dict] = None) -> None:
+    pass
+
+def _page_timings(ocr_metadata: dict) -> List[dict]:
+    # Images come back as a single page's metadata rather than a list of pages
+    pages = ocr_metadata.get('pages') or [ocr_metadata]
+    return [
+        {'page': page.get('page_number', number), **page.get('timings', {})}
+        for number, page in enumerate(pages, start=1)
+    ]
+
+def _page_reporter(report: Callable[[str, float, Optional[dict]], None]) -> PageCallback:
+    """Turn per-page OCR results into progress between 0.1 and 0.9 with a running confidence."""
+    confidences = []
+
+    def on_page(page_number: int, total_pages: int, metadata: dict) -> None:
+        confidences.append(metadata.get('confidence', 0))
+        report('ocr', 0.1 + 0.8 * len(confidences) / max(total_pages, len(confidences)), {
+            'page': page_number,
+            'total_pages': total_pages,
+            'confidence': sum(confidences) / len(confidences)
+        })
+
+    return on_page
+
+def find_processed_twin(
+    db: Session,
+    user_id: UUID,
+    checksum_sha256: Optional[str],
+    exclude_id: Optional[UUID] = None,
+    processed_after: Optional[datetime] = None
+) -> Optional[Document]:
+    """The user's most recently processed document with the same content, if any.
+
+    Never another user's: the bytes may be shared in storage, but OCR text
+    and chunks stay with the tenant that produced them.
+    """
+    if not checksum_sha256:
+        return None
+
+    query = db.query(Document).filter(
+        Document.user_id == user_id,
+        Document.checksum_sha256 == checksum_sha256,
+        Document.status == DocumentStatus.PROCESSED
+    )
+    if exclude_id is not None:
+        query = query.filter(Document.id != exclude_id)
+    if processed_after is not None:
+        query = query.filter(Document.processed_at >= processed_after)
+    return query.order_by(Document.processed_at.desc()).first()
+
+def copy_processing_results(source: Document, target: Document) -> None:
+    # Same text, so the source's vectors describe these chunks too
+    if source.user_id != target.user_id:
+        raise ValueError("Processing results are only copied between documents of the same user")
+    target.status = DocumentStatus.PROCESSED
+    target.processed_at = source.processed_at
+    target.ocr_confidence = source.ocr_confidence
+    target.document_metadata = dict(source.document_metadata or {})
+    target.deduplicated_from_id = source.id
+    target.chunks = [
+        DocumentChunk(
+            chunk_index=chunk.chunk_index,
+            content=chunk.content,
+            content_type=chunk.content_type,
+            embedding_id=chunk.embedding_id,
+            embedding_model=chunk.embedding_model,
+            embedding=chunk.embedding,
+            chunk_metadata=chunk.chunk_metadata,
+            confidence_score=chunk.confidence_score,
+            page_number=chunk.page_number,
+            coordinates=chunk.coordinates
+        )
+        for chunk in sorted(source.chunks, key=lambda chunk: chunk.chunk_index)
+    ]
@@ -1,24 +1,57 @@
+import logging
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import IO, Optional
-from uuid import UUID
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.models import Document, DocumentStatus, DocumentType, User
+from app.models import Document, DocumentStatus, DocumentTag, DocumentType, StoredBlob, User, UserRole
 from app.schemas.document import DocumentMetadataUpdate
-from app.services.storage_service import S3StorageService
+from app.services.document_processing_service import copy_processing_results
+from app.services.presigned_url_cache import PresignedUrlCache
+from app.services.registry import get_download_url_cache, get_embedding_backend, get_storage_service
+from app.services.storage_service import StorageBackend, build_content_key, build_document_path
+from app.services.vector_index import VectorIndex, get_vector_index
+from app.utils.archives import UploadEntry
+from app.utils.file_validation import UploadStream, open_upload_stream
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StagedUpload:
+    filename: str
+    staging_key: str
+    checksum_sha256: str
+    size: int
+    content_type: Optional[str]
+    object_key: Optional[str] = None  # Set once the content-addressed blob is resolved
+
 
 class DocumentService:
-    def __init__(self, db: Session, storage_service: Optional[S3StorageService]) -> None:
+    def __init__(
+        self,
+        db: Session,
+        storage_service: Optional[StorageBackend] = None,
+        url_cache: Optional[PresignedUrlCache] = None,
+        vector_index: Optional[VectorIndex] = None
+    ) -> None:
         self.db = db
-        self.storage = storage_service or S3StorageService()
+        self.storage = storage_service or get_storage_service()
+        self.url_cache = url_cache or get_download_url_cache()
+        self.vector_index = vector_index or get_vector_index()
 
     def upload_document(
         self,
         *,
-        file_obj: IO[bytes],
+        stream: UploadStream,
         filename: str,
         content_type: Optional[str],
         user: User,
@@ -26,63 +59,357 @@ class DocumentService:
         description: Optional[str],
         tags: Optional[list[str]],
     ) -> Document:
-        object_key = self.storage.upload_file(
-            file_obj=file_obj,
+        if not content_type or content_type == "application/octet-stream":
+            content_type = stream.detected_mimetype
+
+        # Storage pulls from the stream, which hashes and size-checks as it goes.
+        # The bytes land under a staging key until their checksum is known.
+        staging_key = self.storage.upload_file(
+            file_obj=stream,
             filename=filename,
             user_id=str(user.id),
             content_type=content_type
         )
+        staged = StagedUpload(filename, staging_key, stream.sha256, stream.bytes_read, content_type)
+        self._store_blobs([staged])
+
+        doc = self._build_document(staged, user, document_type, description, tags)
+        self.db.add(doc)
+        linked = self._link_processed_results([doc])
+        self.db.commit()
+        self._index_linked(linked)
+        self.db.refresh(doc)
+        return doc
 
+    def upload_documents(
+        self,
+        *,
+        entries: Iterable[UploadEntry],
+        user: User,
+        document_type: DocumentType,
+        description: Optional[str],
+        tags: Optional[list[str]],
+    ) -> List[dict]:
+        """Upload many files at once and report a result per file.
+
+        Entries are validated and streamed to storage by a bounded worker pool
+        while the next ones are still being read; every document row is then
+        written in a single commit.
+        """
+        with ThreadPoolExecutor(max_workers=settings.BULK_UPLOAD_CONCURRENCY) as executor:
+            outcomes = list(self._stage_entries(entries, str(user.id), executor))
+            staged = [outcome for _, outcome in outcomes if isinstance(outcome, StagedUpload)]
+            if staged:
+                self._store_blobs(staged, executor)
+
+        results: List[dict] = []
+        docs: List[Document] = []
+        linked: List[Document] = []
+        for filename, outcome in outcomes:
+            if isinstance(outcome, StagedUpload):
+                doc = self._build_document(outcome, user, document_type, description, tags)
+                docs.append(doc)
+                results.append({"filename": filename, "document": doc})
+            else:
+                results.append({"filename": filename, "status": "failed", "error": outcome})
+
+        if docs:
+            self.db.add_all(docs)
+            linked = self._link_processed_results(docs)
+
+        # Read what the response needs now; after commit each attribute would reload one row at a time
+        for result in results:
+            doc = result.pop("document", None)
+            if doc is not None:
+                result.update(status="created", document_id=doc.id, document_status=doc.status)
+
+        self.db.commit()
+        self._index_linked(linked)
+        return results
+
+    def _stage_entries(self, entries: Iterable[UploadEntry], user_id: str, executor: ThreadPoolExecutor) -> Iterator[Tuple[str, object]]:
+        slots = threading.BoundedSemaphore(settings.BULK_UPLOAD_CONCURRENCY)
+        close_lock = threading.Lock()
+        pending = []
+
+        for count, entry in enumerate(entries, start=1):
+            if count > settings.BULK_UPLOAD_MAX_FILES:
+                _close_entry(entry, close_lock)
+                pending.append((entry.filename, f"Batch exceeds {settings.BULK_UPLOAD_MAX_FILES} files"))
+                continue
+
+            # Hold off reading further entries until a worker is free
+            slots.acquire()
+            future = executor.submit(self._stage_entry, entry, user_id, close_lock)
+            future.add_done_callback(lambda _: slots.release())
+            pending.append((entry.filename, future))
+
+        for filename, future in pending:
+            if isinstance(future, str):
+                yield filename, future
+                continue
+            try:
+                yield filename, future.result()
+            except HTTPException as exc:
+                yield filename, exc.detail
+            except Exception as exc:
+                yield filename, str(exc)
+
+    def _stage_entry(self, entry: UploadEntry, user_id: str, close_lock: threading.Lock) -> StagedUpload:
+        try:
+            if entry.error:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=entry.error)
+
+            stream = open_upload_stream(entry.file_obj, entry.filename, entry.size)
+            content_type = mimetypes.guess_type(entry.filename)[0] or stream.detected_mimetype
+            staging_key = self.storage.upload_file(
+                file_obj=stream,
+                filename=entry.filename,
+                user_id=user_id,
+                content_type=content_type
+            )
+            return StagedUpload(entry.filename, staging_key, stream.sha256, stream.bytes_read, content_type)
+        finally:
+            _close_entry(entry, close_lock)
+
+    def _build_document(
+        self,
+        staged: StagedUpload,
+        user: User,
+        document_type: DocumentType,
+        description: Optional[str],
+        tags: Optional[list[str]],
+    ) -> Document:
+        now = datetime.utcnow()
+        doc_id = uuid4()
         doc = Document(
+            id=doc_id,
             user_id=user.id,
-            filename=filename,
-            original_filename=filename,
-            file_path=object_key,
-            file_size=file_obj.seek(0, 2) or 0,
-            mime_type = content_type or "application/octet-stream",
+            filename=staged.filename,
+            original_filename=staged.filename,
+            # The blob key is shared across users, so clients get a path of their own
+            file_path=build_document_path(user.id, doc_id, staged.filename),
+            object_key=staged.object_key,
+            file_size=staged.size,
+            checksum_sha256=staged.checksum_sha256,
+            mime_type = staged.content_type or "application/octet-stream",
             document_type=document_type,
             status=DocumentStatus.UPLOADED,
             description=description,
-            tags=tags,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            created_at=now,
+            updated_at=now
         )
-
-        self.db.add(doc)
-        self.db.commit()
-        self.db.refresh()
+        self._apply_tags(doc, tags or [])
         return doc
 
-    def list_documents(self, user: User, skip: int = 0, limit:int = 50):
+    def _link_processed_results(self, docs: List[Document]) -> List[Document]:
+        """Give documents whose content was already OCR'd those results; returns the ones linked."""
+        checksums = {doc.checksum_sha256 for doc in docs}
+        # Only the uploader's own documents: another user's OCR text must never be copied in
+        user_ids = {doc.user_id for doc in docs}
+        twins = {
+            (twin.user_id, twin.checksum_sha256): twin
+            for twin in self.db.query(Document).filter(
+                Document.user_id.in_(user_ids),
+                Document.checksum_sha256.in_(checksums),
+                Document.status == DocumentStatus.PROCESSED
+            ).order_by(Document.processed_at)
+        }
+        linked = []
+        for doc in docs:
+            twin = twins.get((doc.user_id, doc.checksum_sha256))
+            if twin is not None and twin is not doc:
+                copy_processing_results(twin, doc)
+                linked.append(doc)
+        return linked
+
+    def _index_linked(self, docs: List[Document]) -> None:
+        # The copied chunks carry their twin's embeddings; make them searchable under the new document
+        backend = get_embedding_backend() if docs else None
+        if backend is None:
+            return
+        for doc in docs:
+            try:
+                self.vector_index.index_document(self.db, backend.model_name, doc.user_id, doc.id)
+            except Exception as e:
+                logger.warning(f"Could not update the vector index for document {doc.id}: {e}")
+
+    def list_documents(
+        self,
+        user: User,
+        skip: int = 0,
+        limit:int = 50,
+        *,
+        tags: Optional[List[str]] = None,
+        document_type: Optional[DocumentType] = None,
+        status: Optional[DocumentStatus] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        min_ocr_confidence: Optional[float] = None,
+    ):
         query = self.db.query(Document)
-        if user.role not in {DocumentType.ADMIN}:
+        scoped = user.role != UserRole.ADMIN
+        if scoped:
             query = query.filter(Document.user_id == user.id)
 
-        return query.offset(skip).limit(limit).all()
+        # Blank values like ?tags=%20 normalize away; they don't filter anything
+        wanted = _normalize_tags(tags or [])
+        if wanted:
+            tagged = (
+                select(DocumentTag.document_id)
+                .where(DocumentTag.tag.in_(wanted))
+                .group_by(DocumentTag.document_id)
+                .having(func.count(DocumentTag.tag) == len(wanted))
+            )
+            if scoped:
+                tagged = tagged.where(DocumentTag.user_id == user.id)
+            query = query.filter(Document.id.in_(tagged))
+
+        if document_type is not None:
+            query = query.filter(Document.document_type == document_type)
+        if status is not None:
+            query = query.filter(Document.status == status)
+        if created_after is not None:
+            query = query.filter(Document.created_at >= created_after)
+        if created_before is not None:
+            query = query.filter(Document.created_at < created_before)
+        if min_ocr_confidence is not None:
+            query = query.filter(Document.ocr_confidence >= min_ocr_confidence)
+
+        return query.order_by(Document.created_at.desc()).offset(skip).limit(limit).all()
 
     def get_document(self, doc_id: UUID, user: User) -> Document:
-        doc = self.db.query(Document).filter(Document.id == user.id)
+        doc = self.db.query(Document).filter(Document.id == doc_id).first()
         if not doc:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
 
-        if doc.user_id != user.id and user.role != DocumentType.ADMIN:
+        if doc.user_id != user.id and user.role != UserRole.ADMIN:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
         return doc
 
-    def delete_document(self, doc: document) -> None:
-        self.storage.delete_file(doc.file_path)
+    def delete_document(self, doc: Document) -> None:
+        blob = self.db.query(StoredBlob).filter(StoredBlob.object_key == doc.object_key).with_for_update().first()
+        if blob is None:
+            # Uploaded before content addressing; the object belongs to this document alone
+            self.storage.delete_file(doc.object_key)
+        else:
+            blob.ref_count -= 1
+            if blob.ref_count <= 0:
+                self.db.delete(blob)
+                # Removed while the row lock is held, so a concurrent upload can't take a new reference to it
+                self.storage.delete_file(blob.object_key)
+
         self.db.delete(doc)
         self.db.commit()
+        self.url_cache.invalidate(doc.object_key)
+        try:
+            self.vector_index.remove_document(doc.user_id, doc.id)
+        except Exception as e:
+            logger.warning(f"Could not remove document {doc.id} from the vector index: {e}")
 
     def update_metadata(self, doc: Document, payload: DocumentMetadataUpdate) -> Document:
         for field, value in payload.model_dump(exclude_none=True).items():
-            setattr(doc, field, value)
+            if field == "tags":
+                self._apply_tags(doc, value)
+            else:
+                setattr(doc, field, value)
 
         doc.updated_at = datetime.utcnow()
         self.db.commit()
         self.db.refresh(doc)
         return doc
 
-    def generate_download_url(self, doc: Document) -> str:
-        return self.storage.generate_presigned_url(doc.file_path)
\ No newline at end of file
+    def generate_download_url(self, doc: Document) -> Tuple[str, int]:
+        return self.url_cache.get(doc.object_key)
+
+    def generate_download_urls(self, doc_ids: List[UUID], user: User) -> List[dict]:
+        # One query for the whole page; ids the user can't see are left out
+        query = self.db.query(Document.id, Document.object_key).filter(Document.id.in_(doc_ids))
+        if user.role != UserRole.ADMIN:
+            query = query.filter(Document.user_id == user.id)
+        rows = query.all()
+
+        links = self.url_cache.get_many(row.object_key for row in rows)
+        return [
+            {"document_id": row.id, "url": links[row.object_key][0], "expires_in": links[row.object_key][1]}
+            for row in rows
+        ]
+
+    def _store_blobs(self, staged: List[StagedUpload], executor: Optional[ThreadPoolExecutor] = None) -> None:
+        """Point each staged upload at a content-addressed blob, taking one reference per upload."""
+        by_checksum: Dict[str, List[StagedUpload]] = {}
+        for item in staged:
+            by_checksum.setdefault(item.checksum_sha256, []).append(item)
+
+        known = {
+            checksum for (checksum,) in self.db.query(StoredBlob.checksum_sha256).filter(
+                StoredBlob.checksum_sha256.in_(list(by_checksum))
+            )
+        }
+
+        storage_ops = []
+        new_blobs = []
+        for checksum, items in by_checksum.items():
+            blob = self._reference_blob(checksum, len(items)) if checksum in known else None
+            if blob is not None:
+                object_key = blob.object_key
+                discarded = items
+            else:
+                object_key = build_content_key(checksum, items[0].filename)
+                storage_ops.append((self.storage.move_file, items[0].staging_key, object_key))
+                discarded = items[1:]
+                new_blobs.append(StoredBlob(checksum_sha256=checksum, object_key=object_key, size=items[0].size, ref_count=len(items)))
+
+            storage_ops.extend((self.storage.delete_file, item.staging_key) for item in discarded)
+            for item in items:
+                item.object_key = object_key
+
+        run = executor.map if executor is not None else map
+        list(run(lambda op: op[0](*op[1:]), storage_ops))
+
+        try:
+            with self.db.begin_nested():
+                self.db.add_all(new_blobs)
+        except IntegrityError:
+            # A concurrent upload registered some of the same content first
+            for blob in new_blobs:
+                self._register_blob(blob, by_checksum[blob.checksum_sha256])
+
+    def _register_blob(self, blob: StoredBlob, items: List[StagedUpload]) -> None:
+        try:
+            with self.db.begin_nested():
+                self.db.add(blob)
+        except IntegrityError:
+            existing = self._reference_blob(blob.checksum_sha256, blob.ref_count)
+            if existing.object_key != blob.object_key:
+                self.storage.delete_file(blob.object_key)
+            for item in items:
+                item.object_key = existing.object_key
+
+    def _reference_blob(self, checksum_sha256: str, references: int = 1) -> Optional[StoredBlob]:
+        updated = self.db.query(StoredBlob).filter(
+            StoredBlob.checksum_sha256 == checksum_sha256
+        ).update({StoredBlob.ref_count: StoredBlob.ref_count + references}, synchronize_session=False)
+        if not updated:
+            return None
+        return self.db.query(StoredBlob).filter(StoredBlob.checksum_sha256 == checksum_sha256).one()
+
+    def _apply_tags(self, doc: Document, tags: List[str]) -> None:
+        normalized = _normalize_tags(tags)
+        existing = {entry.tag: entry for entry in doc.tag_entries}
+        doc.tag_entries = [
+            existing.get(tag) or DocumentTag(user_id=doc.user_id, tag=tag)
+            for tag in normalized
+        ]
+        doc.tags = normalized or None
+
+
+def _close_entry(entry: UploadEntry, lock: threading.Lock) -> None:
+    # Zip members share one file handle whose reference count isn't thread-safe
+    if entry.file_obj is not None:
+        with lock:
+            entry.file_obj.close()
+
+def _normalize_tags(tags: List[str]) -> List[str]:
+    return list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
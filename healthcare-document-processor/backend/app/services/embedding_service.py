@@ -0,0 +1,387 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from cachetools import LRUCache
+from sqlalchemy import func, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import DocumentChunk, EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+CACHE_LOOKUP_BATCH = 500  # Keys per IN query
+EVICT_CHECK_INSERTS = 1000  # Inserts between checks of the table size
+EVICT_TO_FRACTION = 0.9  # Eviction goes below the bound so it doesn't run on every check
+
+
+class Embeddings(NamedTuple):
+    vectors: np.ndarray  # float32, one unit-length row per input text
+    tokens: int
+
+
+class EmbeddingBackend(ABC):
+    """Turns chunk text into unit-length vectors for similarity search."""
+
+    model_name: str
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> Embeddings:
+        ...
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """Runs a sentence-embedding model exported to ONNX on this host's CPUs.
+
+    Texts are sorted by token count and cut into batches of similar length,
+    each padded only to its own longest text, so a batch of short chunks
+    isn't padded out to the length of the longest chunk in the document.
+    Batch size adapts to length: short texts go through in batches of up to
+    ``batch_size``, long ones in fewer rows per call, keeping every call
+    under ``max_batch_tokens`` padded tokens.
+
+    Chunks are longer than the model's ``max_tokens`` window. Rather than
+    truncate them to their first few hundred tokens, each is split into
+    overlapping windows that are embedded separately and averaged, weighted
+    by their token counts, into one vector for the whole chunk.
+    """
+
+    def __init__(
+        self,
+        model_dir: str = settings.EMBEDDING_MODEL_DIR,
+        model_name: str = settings.EMBEDDING_MODEL_NAME,
+        max_tokens: int = settings.EMBEDDING_MAX_TOKENS,
+        batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+        max_batch_tokens: int = settings.EMBEDDING_MAX_BATCH_TOKENS,
+        threads: int = settings.EMBEDDING_THREADS,
+    ) -> None:
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        model_dir = Path(model_dir)
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.pad_id = (self.tokenizer.padding or {}).get("pad_id", 0)
+        self.tokenizer.no_padding()
+        # Tokens past the window come back as overflowing encodings, each sharing a few tokens with the last
+        self.tokenizer.enable_truncation(max_length=max_tokens, stride=max_tokens // 8)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        # One session serves every worker thread; run() is thread-safe
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir / "model.onnx"), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def embed(self, texts: Sequence[str]) -> Embeddings:
+        encodings, owners = [], []
+        for text_index, encoding in enumerate(self.tokenizer.encode_batch(list(texts))):
+            for window in (encoding, *encoding.overflowing):
+                encodings.append(window)
+                owners.append(text_index)
+        if not encodings:
+            return Embeddings(np.empty((0, 0), dtype=np.float32), 0)
+        lengths = [len(encoding.ids) for encoding in encodings]
+        rows: List[Optional[np.ndarray]] = [None] * len(encodings)
+
+        for batch in length_batches(lengths, self.batch_size, self.max_batch_tokens):
+            width = max(lengths[i] for i in batch)
+            input_ids = np.full((len(batch), width), self.pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                input_ids[row, :lengths[i]] = encodings[i].ids
+                attention_mask[row, :lengths[i]] = 1
+
+            for row, vector in zip(batch, self._run(input_ids, attention_mask)):
+                rows[row] = vector
+
+        windows = np.vstack(rows)
+        vectors = np.zeros((len(texts), windows.shape[1]), dtype=np.float32)
+        np.add.at(vectors, owners, windows * np.asarray(lengths, dtype=np.float32)[:, None])
+        return Embeddings(normalize_rows(vectors), sum(lengths))
+
+    def _run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": np.zeros_like(input_ids)}
+        output = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+        if output.ndim == 3:
+            # Token embeddings: mean over the real tokens, ignoring padding
+            weights = attention_mask[..., None].astype(np.float32)
+            output = (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return normalize_rows(output)
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Hosted embeddings, for sites that allow document text to leave the network."""
+
+    def __init__(self, model_name: str = settings.EMBEDDING_OPENAI_MODEL, batch_size: int = settings.EMBEDDING_BATCH_SIZE) -> None:
+        from openai import OpenAI
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    def embed(self, texts: Sequence[str]) -> Embeddings:
+        vectors, tokens = [], 0
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(model=self.model_name, input=list(texts[start:start + self.batch_size]))
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+            tokens += response.usage.total_tokens
+        if not vectors:
+            return Embeddings(np.empty((0, 0), dtype=np.float32), 0)
+        return Embeddings(normalize_rows(np.asarray(vectors, dtype=np.float32)), tokens)
+
+
+class EmbeddingCache:
+    """Vectors already computed, keyed by model and normalized chunk text hash.
+
+    Reprocessed, re-chunked and duplicate documents mostly produce text that
+    was embedded before. Lookups try a per-process LRU first, then the shared
+    ``embedding_cache`` table, one query per ``CACHE_LOOKUP_BATCH`` keys.
+    The table holds at most ``max_entries`` rows: every
+    ``EVICT_CHECK_INSERTS`` inserts, the least recently used rows are deleted
+    down to ``EVICT_TO_FRACTION`` of that. A hit moves ``last_used_at``
+    forward at most once per ``touch_seconds``, so a hot entry costs one
+    write per interval rather than one per hit. As with the chunk rows, a
+    vector is trusted for as long as its model name is unchanged.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.EMBEDDING_CACHE_MAX_ENTRIES,
+        memory_entries: int = settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+        touch_seconds: int = settings.EMBEDDING_CACHE_TOUCH_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.touch_seconds = touch_seconds
+        # (model, content hash) -> (vector bytes, monotonic time last_used_at was known fresh)
+        self._memory: LRUCache = LRUCache(maxsize=memory_entries)
+        self._lock = threading.Lock()
+        # Starts due, so every process checks the bound on its first insert
+        self._inserts = EVICT_CHECK_INSERTS
+
+    def get_many(self, db: Session, model_name: str, keys: Sequence[str]) -> Dict[str, bytes]:
+        """Cached vectors for whichever of ``keys`` have one."""
+        found: Dict[str, bytes] = {}
+        stale: List[str] = []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get((model_name, key))
+                if entry is None:
+                    continue
+                found[key] = entry[0]
+                if now - entry[1] >= self.touch_seconds:
+                    stale.append(key)
+                    self._memory[(model_name, key)] = (entry[0], now)
+
+        missing = [key for key in keys if key not in found]
+        for start in range(0, len(missing), CACHE_LOOKUP_BATCH):
+            loaded = dict(db.query(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.vector).filter(
+                EmbeddingCacheEntry.model == model_name,
+                EmbeddingCacheEntry.content_hash.in_(missing[start:start + CACHE_LOOKUP_BATCH])
+            ).all())
+            found.update(loaded)
+            stale.extend(loaded)
+            with self._lock:
+                for key, vector in loaded.items():
+                    self._memory[(model_name, key)] = (vector, now)
+
+        self._touch(db, model_name, stale)
+        return found
+
+    def put_many(self, db: Session, model_name: str, vectors: Dict[str, bytes]) -> None:
+        if not vectors:
+            return
+
+        now = datetime.utcnow()
+        entries = [
+            EmbeddingCacheEntry(model=model_name, content_hash=key, vector=vector, created_at=now, last_used_at=now)
+            for key, vector in vectors.items()
+        ]
+        try:
+            with db.begin_nested():
+                db.add_all(entries)
+        except IntegrityError:
+            # Another worker cached some of the same text first
+            for entry in entries:
+                try:
+                    with db.begin_nested():
+                        db.add(entry)
+                except IntegrityError:
+                    pass
+
+        with self._lock:
+            for key, vector in vectors.items():
+                self._memory[(model_name, key)] = (vector, time.monotonic())
+            self._inserts += len(entries)
+            due = self._inserts >= EVICT_CHECK_INSERTS
+            if due:
+                self._inserts = 0
+        if due:
+            self.evict(db)
+
+    def evict(self, db: Session) -> int:
+        """Delete the least recently used rows if the table is over its bound; returns how many went."""
+        excess = db.query(func.count()).select_from(EmbeddingCacheEntry).scalar() - self.max_entries
+        if excess <= 0:
+            return 0
+
+        # By key rather than by a last_used_at cutoff: rows inserted together share a timestamp
+        oldest = select(EmbeddingCacheEntry.model, EmbeddingCacheEntry.content_hash).order_by(
+            EmbeddingCacheEntry.last_used_at
+        ).limit(excess + self.max_entries - int(self.max_entries * EVICT_TO_FRACTION))
+        deleted = db.query(EmbeddingCacheEntry).filter(
+            tuple_(EmbeddingCacheEntry.model, EmbeddingCacheEntry.content_hash).in_(oldest)
+        ).delete(synchronize_session=False)
+        logger.info(f"Evicted {deleted} embedding cache entries")
+        return deleted
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _touch(self, db: Session, model_name: str, keys: List[str]) -> None:
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.touch_seconds)
+        # Sorted so concurrent touches lock rows in the same order
+        keys = sorted(keys)
+        for start in range(0, len(keys), CACHE_LOOKUP_BATCH):
+            db.query(EmbeddingCacheEntry).filter(
+                EmbeddingCacheEntry.model == model_name,
+                EmbeddingCacheEntry.content_hash.in_(keys[start:start + CACHE_LOOKUP_BATCH]),
+                EmbeddingCacheEntry.last_used_at < cutoff
+            ).update({EmbeddingCacheEntry.last_used_at: now}, synchronize_session=False)
+
+
+class ChunkEmbeddingService:
+    """Writes an embedding onto every chunk that lacks one from the current model.
+
+    Vectors are stored on the chunk row as little-endian float32 bytes next
+    to ``embedding_model`` and ``embedding_id``, the hash of the normalized
+    chunk text, so identical text is recognisable across documents. Texts
+    found in the embedding cache aren't embedded again. Nothing is committed
+    here; callers commit with the rest of their work.
+    """
+
+    def __init__(self, db: Session, backend: EmbeddingBackend, cache: Optional[EmbeddingCache] = None) -> None:
+        self.db = db
+        self.backend = backend
+        self.cache = cache or get_embedding_cache()
+
+    def embed_document(self, document_id: UUID) -> dict:
+        chunks = self._pending().filter(DocumentChunk.document_id == document_id).all()
+        return self.embed_chunks(chunks)
+
+    def pending_chunks(self, limit: int) -> List[DocumentChunk]:
+        """Up to ``limit`` chunks from any document still to embed, e.g. to backfill after a model change."""
+        return self._pending().order_by(DocumentChunk.id).limit(limit).all()
+
+    def embed_chunks(self, chunks: List[DocumentChunk]) -> dict:
+        # Repeated text (letterheads, footers) is looked up and embedded once per call
+        model_name = self.backend.model_name
+        keys = [content_key(chunk.content) for chunk in chunks]
+        unique: Dict[str, str] = {}
+        for key, chunk in zip(keys, chunks):
+            unique.setdefault(key, chunk.content)
+
+        started = time.perf_counter()
+        vectors = self.cache.get_many(self.db, model_name, list(unique)) if self.cache and unique else {}
+        misses = {key: text for key, text in unique.items() if key not in vectors}
+        result = self.backend.embed(list(misses.values())) if misses else Embeddings(np.empty((0, 0), dtype=np.float32), 0)
+
+        embedded = {key: vector_to_bytes(vector) for key, vector in zip(misses, result.vectors)}
+        if self.cache:
+            self.cache.put_many(self.db, model_name, embedded)
+        vectors.update(embedded)
+        seconds = time.perf_counter() - started
+
+        for key, chunk in zip(keys, chunks):
+            chunk.embedding = vectors[key]
+            chunk.embedding_model = model_name
+            chunk.embedding_id = key
+        self.db.flush()
+
+        hits = len(unique) - len(misses)
+        return {
+            "model": model_name,
+            "chunks": len(chunks),
+            "embedded": len(misses),
+            "cache_hits": hits,
+            "cache_misses": len(misses),
+            "cache_hit_rate": hits / len(unique) if unique else None,
+            "tokens": result.tokens,
+            "seconds": seconds,
+            "chunks_per_second": len(chunks) / seconds if seconds > 0 else None
+        }
+
+    def _pending(self):
+        return self.db.query(DocumentChunk).filter(or_(
+            DocumentChunk.embedding.is_(None),
+            DocumentChunk.embedding_model.is_(None),
+            DocumentChunk.embedding_model != self.backend.model_name
+        ))
+
+
+def create_embedding_backend(backend: str = settings.EMBEDDING_BACKEND) -> Optional[EmbeddingBackend]:
+    if backend == "none":
+        return None
+    if backend == "onnx":
+        return OnnxEmbeddingBackend()
+    if backend == "openai":
+        return OpenAIEmbeddingBackend()
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+def length_batches(lengths: Sequence[int], batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """Indices grouped into batches of similar length, each under both limits once padded."""
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches, batch = [], []
+    for i in order:
+        # Sorted ascending, so the text being added is the batch's longest
+        if batch and (len(batch) >= batch_size or (len(batch) + 1) * lengths[i] > max_batch_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def content_key(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def vector_to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+def vector_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<f4")
+
+
+embedding_cache = EmbeddingCache()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    return embedding_cache if settings.EMBEDDING_CACHE_ENABLED else None
@@ -0,0 +1,291 @@
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, List, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import JobStatus, ProcessingBatch, ProcessingJob, User
+from app.services.document_processing_service import DocumentProcessingService
+from app.services.job_scheduler import job_scheduler
+from app.services.progress_events import ProgressBroker, progress_broker
+from app.services.registry import services
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue(ABC):
+    """Carries one wake-up per queued job to the workers.
+
+    A worker doesn't run the job it was woken for; it asks the scheduler for
+    whichever queued job should go next. Every job enqueues its wake-up after
+    its row is committed, so no job is left without a worker to claim it.
+    """
+
+    @abstractmethod
+    def enqueue(self, job_id: UUID) -> None:
+        ...
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class CeleryJobQueue(JobQueue):
+    """Hands jobs to Celery workers, which run as their own processes and scale separately."""
+
+    def enqueue(self, job_id: UUID) -> None:
+        from app.worker import process_next_job_task
+
+        process_next_job_task.apply_async(queue=settings.PROCESSING_QUEUE_NAME)
+
+
+class LocalJobQueue(JobQueue):
+    """In-process stand-in for the broker, drained by worker threads.
+
+    Job rows stay queued or running until a worker finishes them, so jobs
+    interrupted by a restart are picked up again on start. Meant for
+    development and tests with a single API process.
+    """
+
+    def __init__(self, workers: int = settings.PROCESSING_WORKERS, runner: Optional[Callable[[], None]] = None) -> None:
+        self.workers = workers
+        self.runner = runner or run_next_job
+        self._queue: "queue.Queue[Optional[bool]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for _ in range(_unfinished_job_count()):
+                self._queue.put(True)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"processing-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, job_id: UUID) -> None:
+        self._queue.put(True)
+        if not self._threads:
+            self.start()
+
+    def join(self) -> None:
+        """Block until every queued job has been run."""
+        self._queue.join()
+
+    def stop(self) -> None:
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join(timeout=5)
+            self._threads = []
+
+    def _work(self) -> None:
+        while True:
+            token = self._queue.get()
+            try:
+                if token is None:
+                    return
+                self.runner()
+            except Exception as e:
+                logger.error(f"Processing worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def create_job_queue(backend: str = settings.JOB_QUEUE_BACKEND) -> JobQueue:
+    if backend == "celery":
+        return CeleryJobQueue()
+    if backend == "local":
+        return LocalJobQueue()
+    raise ValueError(f"Unknown job queue backend: {backend}")
+
+def _unfinished_job_count() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(ProcessingJob).filter(
+            ProcessingJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+        ).count()
+    finally:
+        db.close()
+
+
+class JobProgress:
+    """Records stage and progress on the job row and publishes each update to stream subscribers.
+
+    The row is written once per stage; page-level updates only go to the
+    broker, so following a job doesn't cost a database write per page. Every
+    write also refreshes the job's heartbeat, and page-level updates refresh
+    it on its own at most once per ``heartbeat_seconds``, so the scheduler
+    can tell a long job from one whose worker died.
+    """
+
+    def __init__(
+        self,
+        job: ProcessingJob,
+        session_factory: Callable[[], Session] = SessionLocal,
+        broker: ProgressBroker = progress_broker,
+        heartbeat_seconds: float = settings.PROCESSING_JOB_HEARTBEAT_SECONDS
+    ) -> None:
+        self.job_id = job.id
+        self.document_id = job.document_id
+        self.user_id = job.user_id
+        self.session_factory = session_factory
+        self.broker = broker
+        self.heartbeat_seconds = heartbeat_seconds
+        self._stage: Optional[str] = None
+        self._last_beat = time.monotonic()
+
+    def __call__(self, stage: str, progress: float, details: Optional[dict] = None) -> None:
+        if stage != self._stage:
+            self._stage = stage
+            self._record({ProcessingJob.stage: stage, ProcessingJob.progress: progress})
+        elif time.monotonic() - self._last_beat >= self.heartbeat_seconds:
+            self._record({})
+        self.publish("progress", stage=stage, progress=progress, **(details or {}))
+
+    def publish(self, event_type: str, **fields) -> None:
+        try:
+            self.broker.publish({
+                "type": event_type,
+                "job_id": str(self.job_id),
+                "document_id": str(self.document_id),
+                "user_id": str(self.user_id),
+                **fields
+            })
+        except Exception as e:
+            logger.warning(f"Could not publish progress for job {self.job_id}: {e}")
+
+    def _record(self, values: dict) -> None:
+        self._last_beat = time.monotonic()
+        db = self.session_factory()
+        try:
+            db.query(ProcessingJob).filter(ProcessingJob.id == self.job_id).update(
+                {**values, ProcessingJob.heartbeat_at: datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Could not record progress for job {self.job_id}: {e}")
+        finally:
+            db.close()
+
+
+def run_next_job(session_factory: Callable[[], Session] = SessionLocal) -> Optional[UUID]:
+    """Claim the job the scheduler picks and run it; returns its id, or None if nothing was queued."""
+    db = session_factory()
+    try:
+        requeued = job_scheduler.requeue_stale(db)
+        job_id = job_scheduler.claim_next(db)
+    finally:
+        db.close()
+
+    _wake(requeued)
+    if job_id is not None:
+        run_job(job_id, session_factory)
+    return job_id
+
+def requeue_stale_jobs(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """Requeue jobs whose worker went quiet and send each a wake-up; returns how many there were."""
+    db = session_factory()
+    try:
+        requeued = job_scheduler.requeue_stale(db)
+    finally:
+        db.close()
+
+    _wake(requeued)
+    return len(requeued)
+
+def run_stale_job_sweeper(interval: float = settings.PROCESSING_JOB_TIMEOUT_SECONDS / 2) -> None:
+    """Requeue stale jobs forever; run it on a daemon thread so they recover even when no wake-ups arrive."""
+    while True:
+        time.sleep(interval)
+        try:
+            requeue_stale_jobs()
+        except Exception as e:
+            logger.warning(f"Could not requeue stale jobs: {e}")
+
+def _wake(job_ids: List[UUID]) -> None:
+    for job_id in job_ids:
+        logger.warning(f"Requeued job {job_id}: its worker stopped sending heartbeats")
+        try:
+            job_queue.enqueue(job_id)
+        except Exception as e:
+            logger.warning(f"Could not enqueue requeued job {job_id}: {e}")
+
+def run_job(job_id: UUID, session_factory: Callable[[], Session] = SessionLocal) -> None:
+    """Run a job already claimed by this worker."""
+    db = session_factory()
+    try:
+        job = db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
+        if job is None or job.status != JobStatus.RUNNING:
+            return
+
+        user = db.query(User).filter(User.id == job.user_id).first()
+        service = DocumentProcessingService(
+            db, ocr_service=services.ocr, storage_service=services.storage, embedding_backend=services.embeddings
+        )
+        progress = JobProgress(job, session_factory)
+        progress.publish("progress", stage="starting", progress=0.0)
+        try:
+            service.process_document(
+                job.document_id,
+                user,
+                on_progress=progress,
+                # A reprocessing batch must not copy results older than the batch itself
+                twins_processed_after=job.batch.created_at if job.batch is not None else None
+            )
+        except Exception as e:
+            db.rollback()
+            job.status = JobStatus.FAILED
+            job.error_message = e.detail if isinstance(e, HTTPException) else str(e)
+        else:
+            job.status = JobStatus.SUCCEEDED
+            job.stage = "done"
+            job.progress = 1.0
+            if job.batch_id is not None and service.embedding_stats:
+                _count_cache_lookups(db, job.batch_id, service.embedding_stats)
+
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        # Only after the commit, so a client reacting to it reads the final rows
+        progress.publish(job.status.value, stage=job.stage, progress=job.progress, error=job.error_message)
+
+        if job.batch_id is not None:
+            _advance_batch(db, job.batch_id)
+    finally:
+        db.close()
+
+def _count_cache_lookups(db: Session, batch_id: UUID, stats: dict) -> None:
+    # In SQL, so workers finishing jobs of the same batch at once don't lose counts
+    db.query(ProcessingBatch).filter(ProcessingBatch.id == batch_id).update({
+        ProcessingBatch.embedding_cache_hits: ProcessingBatch.embedding_cache_hits + stats.get("cache_hits", 0),
+        ProcessingBatch.embedding_cache_misses: ProcessingBatch.embedding_cache_misses + stats.get("cache_misses", 0)
+    }, synchronize_session=False)
+
+def _advance_batch(db: Session, batch_id: UUID) -> None:
+    from app.services.batch_processing_service import BatchProcessingService
+
+    try:
+        BatchProcessingService(db, job_queue=job_queue).advance(batch_id)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Could not advance batch {batch_id}: {e}")
+
+
+job_queue = create_job_queue()
+
+def get_job_queue() -> JobQueue:
+    return job_queue
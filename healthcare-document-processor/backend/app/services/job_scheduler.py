@@ -0,0 +1,209 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Document, JobPriority, JobStatus, ProcessingJob
+from app.utils.helpers import percentile
+
+PRIORITY_ORDER = [JobPriority.STAT, JobPriority.ROUTINE, JobPriority.BACKFILL]
+CLAIM_ATTEMPTS = 5
+
+
+class JobScheduler:
+    """Decides which queued job a free worker runs next.
+
+    Jobs are claimed from the database, so the same policy holds for local
+    worker threads and for Celery workers in other processes:
+
+    * Priority classes share capacity by weight (STAT 16 : routine 4 :
+      backfill 1 by default). The class with the fewest pages served in the
+      fairness window relative to its weight goes next, so STAT work jumps
+      ahead without starving backfill outright.
+    * Within a class, tenants (users) are picked the same way. One user's
+      5,000 queued pages only compete with a single prescription for its
+      share of the workers.
+    * Within a tenant, jobs run in ``schedule_at`` order. That is the enqueue
+      time pushed back by the job's page count, so short documents get ahead
+      while large ones still age to the front.
+    """
+
+    def __init__(
+        self,
+        priority_weights: Dict[str, float] = settings.SCHEDULER_PRIORITY_WEIGHTS,
+        tenant_weights: Dict[str, float] = settings.SCHEDULER_TENANT_WEIGHTS,
+        window_seconds: int = settings.SCHEDULER_FAIRNESS_WINDOW_SECONDS,
+        sjf_seconds_per_page: float = settings.SCHEDULER_SJF_SECONDS_PER_PAGE,
+        job_timeout_seconds: int = settings.PROCESSING_JOB_TIMEOUT_SECONDS,
+    ) -> None:
+        self.priority_weights = {priority: float(priority_weights.get(priority.value, 1.0)) for priority in PRIORITY_ORDER}
+        self.tenant_weights = {str(user_id): float(weight) for user_id, weight in tenant_weights.items()}
+        self.window = timedelta(seconds=window_seconds)
+        self.sjf_seconds_per_page = sjf_seconds_per_page
+        self.job_timeout = timedelta(seconds=job_timeout_seconds)
+
+    def schedule_at(self, enqueued_at: datetime, page_count: int) -> datetime:
+        return enqueued_at + timedelta(seconds=max(page_count - 1, 0) * self.sjf_seconds_per_page)
+
+    def claim_next(self, db: Session) -> Optional[UUID]:
+        """Mark the next job running and return its id, or None when nothing is queued."""
+        now = datetime.utcnow()
+        for _ in range(CLAIM_ATTEMPTS):
+            job_id = self._pick(db, now)
+            if job_id is None:
+                return None
+
+            # Conditional update: if another worker got there first, pick again
+            claimed = db.query(ProcessingJob).filter(
+                ProcessingJob.id == job_id,
+                ProcessingJob.status == JobStatus.QUEUED
+            ).update({
+                ProcessingJob.status: JobStatus.RUNNING,
+                ProcessingJob.stage: "starting",
+                ProcessingJob.started_at: now,
+                ProcessingJob.heartbeat_at: now,
+                ProcessingJob.attempts: ProcessingJob.attempts + 1,
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return job_id
+
+        return None
+
+    def requeue_stale(self, db: Session) -> List[UUID]:
+        """Put running jobs whose worker stopped sending heartbeats back in the queue; returns their ids.
+
+        Each needs a fresh wake-up: the one that started it was used up by
+        the worker that went quiet.
+        """
+        stale = (
+            ProcessingJob.status == JobStatus.RUNNING,
+            # Jobs claimed before heartbeats existed fall back to their start time
+            func.coalesce(ProcessingJob.heartbeat_at, ProcessingJob.started_at) < datetime.utcnow() - self.job_timeout
+        )
+        job_ids = [job_id for (job_id,) in db.query(ProcessingJob.id).filter(*stale)]
+        if job_ids:
+            db.query(ProcessingJob).filter(ProcessingJob.id.in_(job_ids), *stale).update(
+                {ProcessingJob.status: JobStatus.QUEUED, ProcessingJob.stage: None}, synchronize_session=False
+            )
+        db.commit()
+        return job_ids
+
+    def _pick(self, db: Session, now: datetime) -> Optional[UUID]:
+        queued = {
+            priority for (priority,) in db.query(ProcessingJob.priority).filter(
+                ProcessingJob.status == JobStatus.QUEUED
+            ).group_by(ProcessingJob.priority)
+        }
+        if not queued:
+            return None
+
+        since = now - self.window
+        served = dict(
+            db.query(ProcessingJob.priority, func.sum(ProcessingJob.page_count)).filter(
+                ProcessingJob.started_at >= since
+            ).group_by(ProcessingJob.priority).all()
+        )
+        priority = min(
+            queued,
+            key=lambda p: ((served.get(p) or 0) / self.priority_weights[p], PRIORITY_ORDER.index(p))
+        )
+
+        tenants = db.query(ProcessingJob.user_id, func.min(ProcessingJob.schedule_at)).filter(
+            ProcessingJob.status == JobStatus.QUEUED,
+            ProcessingJob.priority == priority
+        ).group_by(ProcessingJob.user_id).all()
+        usage = dict(
+            db.query(ProcessingJob.user_id, func.sum(ProcessingJob.page_count)).filter(
+                ProcessingJob.priority == priority,
+                or_(ProcessingJob.status == JobStatus.RUNNING, ProcessingJob.started_at >= since)
+            ).group_by(ProcessingJob.user_id).all()
+        )
+        user_id, _ = min(
+            tenants,
+            key=lambda row: ((usage.get(row[0]) or 0) / self.tenant_weights.get(str(row[0]), 1.0), row[1])
+        )
+
+        row = db.query(ProcessingJob.id).filter(
+            ProcessingJob.status == JobStatus.QUEUED,
+            ProcessingJob.priority == priority,
+            ProcessingJob.user_id == user_id
+        ).order_by(ProcessingJob.schedule_at).first()
+        return row.id if row else None
+
+    def queue_position(self, db: Session, job: ProcessingJob) -> Optional[int]:
+        """Estimated 1-based position: queued jobs of higher classes, then tenants taken in turn within its own."""
+        if job.status != JobStatus.QUEUED:
+            return None
+
+        higher = PRIORITY_ORDER[:PRIORITY_ORDER.index(job.priority)]
+        ahead = db.query(ProcessingJob).filter(
+            ProcessingJob.status == JobStatus.QUEUED,
+            ProcessingJob.priority.in_(higher)
+        ).count()
+
+        earlier_by_tenant = dict(
+            db.query(ProcessingJob.user_id, func.count()).filter(
+                ProcessingJob.status == JobStatus.QUEUED,
+                ProcessingJob.priority == job.priority,
+                ProcessingJob.schedule_at < job.schedule_at
+            ).group_by(ProcessingJob.user_id).all()
+        )
+        # Each other tenant gets roughly one turn per job this tenant still has ahead
+        own = earlier_by_tenant.pop(job.user_id, 0)
+        ahead += own + sum(min(count, own + 1) for count in earlier_by_tenant.values())
+        return ahead + 1
+
+    def metrics(self, db: Session) -> Dict[str, dict]:
+        now = datetime.utcnow()
+        since = now - self.window
+        metrics = {}
+
+        for priority in PRIORITY_ORDER:
+            counts = dict(
+                db.query(ProcessingJob.status, func.count()).filter(
+                    ProcessingJob.priority == priority,
+                    ProcessingJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+                ).group_by(ProcessingJob.status).all()
+            )
+            oldest = db.query(func.min(ProcessingJob.created_at)).filter(
+                ProcessingJob.priority == priority,
+                ProcessingJob.status == JobStatus.QUEUED
+            ).scalar()
+            started = db.query(ProcessingJob.created_at, ProcessingJob.started_at).filter(
+                ProcessingJob.priority == priority,
+                ProcessingJob.started_at >= since
+            ).all()
+            waits = sorted((_naive_utc(started_at) - _naive_utc(created_at)).total_seconds() for created_at, started_at in started)
+
+            metrics[priority.value] = {
+                "queued": counts.get(JobStatus.QUEUED, 0),
+                "running": counts.get(JobStatus.RUNNING, 0),
+                "oldest_wait_seconds": (now - _naive_utc(oldest)).total_seconds() if oldest else 0.0,
+                "started_in_window": len(waits),
+                "wait_seconds_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_seconds_p50": percentile(waits, 0.50),
+                "wait_seconds_p95": percentile(waits, 0.95),
+            }
+
+        return metrics
+
+
+def estimate_page_count(document: Document) -> int:
+    pages = (document.document_metadata or {}).get("total_pages")
+    if pages:
+        return int(pages)
+    if document.mime_type in ("image/png", "image/jpeg"):
+        return 1
+    return max(1, document.file_size // settings.SCHEDULER_BYTES_PER_PAGE)
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,109 @@
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.services.storage_service import STREAM_READ_SIZE, StorageBackend
+
+
+class LocalStorageService(StorageBackend):
+    """Stores documents on a local (or mounted) filesystem.
+
+    Objects are spread over two levels of 256 directories keyed by the start
+    of their random id, so no single directory grows large. Uploads are
+    written to a temp file beside their final path and renamed into place,
+    so readers never see a partial file. Download links are HMAC-signed and
+    expire like S3 presigned URLs; the documents router serves them.
+    """
+
+    def __init__(
+        self,
+        root: str = settings.LOCAL_STORAGE_ROOT,
+        url_prefix: str = settings.LOCAL_STORAGE_URL_PREFIX,
+        fsync: bool = settings.LOCAL_STORAGE_FSYNC,
+    ) -> None:
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.fsync = fsync
+        self._signing_key = settings.SECRET_KEY.encode()
+
+    def _build_object_key(self, filename: str) -> str:
+        file_ext = Path(filename).suffix.lower()
+        unique_id = uuid4().hex
+        return f"{unique_id[:2]}/{unique_id[2:4]}/{unique_id}{file_ext}"
+
+    def _path_for(self, object_key: str) -> Path:
+        path = (self.root / object_key).resolve()
+        if self.root not in path.parents:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        return path
+
+    def upload_file(
+        self,
+        file_obj: BinaryIO,
+        filename: str,
+        user_id: str,
+        content_type: Optional[str] = None
+    ) -> str:
+        object_key = self._build_object_key(filename)
+        path = self._path_for(object_key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(file_obj, tmp, STREAM_READ_SIZE)
+                if self.fsync:
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        return object_key
+
+    def download_file(self, object_key: str) -> BinaryIO:
+        try:
+            return open(self._path_for(object_key), "rb")
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    def delete_file(self, object_key: str) -> None:
+        self._path_for(object_key).unlink(missing_ok=True)
+
+    def move_file(self, source_key: str, dest_key: str) -> None:
+        dest = self._path_for(dest_key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._path_for(source_key), dest)
+
+    def local_path(self, object_key: str) -> Optional[Path]:
+        return self._path_for(object_key)
+
+    def _sign(self, object_key: str, expires: int) -> str:
+        return hmac.new(self._signing_key, f"{object_key}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    def generate_presigned_url(self, object_key: str, expires_in: int = 600) -> str:
+        expires = int(time.time()) + expires_in
+        query = urlencode({"expires": expires, "signature": self._sign(object_key, expires)})
+        return f"{self.url_prefix}/{object_key}?{query}"
+
+    def resolve_signed(self, object_key: str, expires: int, signature: str) -> Path:
+        """Check a signed link and return the file it points at."""
+        if expires < time.time() or not hmac.compare_digest(self._sign(object_key, expires), signature):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Download link is invalid or expired")
+
+        path = self._path_for(object_key)
+        if not path.is_file():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        return path
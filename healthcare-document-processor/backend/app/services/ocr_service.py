@@ -1,29 +1,44 @@
-from curses import meta
-import io
 import logging
+import tempfile
+import time
 from pathlib import Path
-from re import L
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple, Union
 from pdf2image.pdf2image import PDFInfoNotInstalledError
 import pytesseract
 from PIL import Image, ImageEnhance, ImageFilter
 import pdf2image
 from pdf2image.exceptions import PDFInfoNotInstalledError, PDFPageCountError
 
-from core.config import settings
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+OCR_DPI = 300
+
+# Called after each page with (page number, total pages, that page's metadata)
+PageCallback = Callable[[int, int, dict], None]
+
 class OCRService:
     def __init__(self, tesseract_cmd: Optional[str] = None):
         if tesseract_cmd:
             pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
         elif settings.TESSERACT_CMD:
             pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
+        self._engine_version: Optional[str] = None
+
+    def engine_version(self) -> Optional[str]:
+        """Tesseract version, looked up once; None if the binary can't be run."""
+        if self._engine_version is None:
+            try:
+                self._engine_version = f"tesseract {pytesseract.get_tesseract_version()}"
+            except Exception as e:
+                logger.warning(f"Could not read tesseract version: {e}")
+                self._engine_version = ""
+        return self._engine_version or None
 
     def preprocess_image(self, image: Image.Image) -> Image.Image:
         if image.mode != 'L':
-            image.image.convert('L')
+            image = image.convert('L')
 
         enhancer = ImageEnhance.Contrast(image)
         image = enhancer.enhance(1.5)
@@ -37,13 +52,16 @@ class OCRService:
 
     def extract_text_from_image(self, image: Image.Image, lang:str = 'eng') -> Tuple[str, dict]:
         try:
+            started = time.perf_counter()
             processed_image = self.preprocess_image(image)
+            preprocessed = time.perf_counter()
 
             ocr_data = pytesseract.image_to_data(
                 processed_image,
                 lang=lang,
                 output_type=pytesseract.Output.DICT
             )
+            recognized = time.perf_counter()
 
             text_parts = []
             for i, word in enumerate(ocr_data['text']):
@@ -57,7 +75,8 @@ class OCRService:
             metadata = {
                 'confidence': avg_confidence,
                 'word_count': len([w for w in text_parts if w.strip()]),
-                'language' : lang
+                'language' : lang,
+                'timings': {'preprocess': preprocessed - started, 'ocr': recognized - preprocessed}
             }
 
             return full_text, metadata
@@ -66,24 +85,35 @@ class OCRService:
             logger.error(f"Error extracting text from image: {e}")
             raise
 
-    def extract_text_from_pdf(self, pdf_bytes: bytes, first_page: int = 1, last_page: Optional[int] = None):
+    def extract_text_from_pdf(
+        self,
+        pdf_path: Union[str, Path],
+        first_page: int = 1,
+        last_page: Optional[int] = None,
+        on_page: Optional[PageCallback] = None
+    ):
         try:
-            images = pdf2image.convert_from_bytes(
-                pdf_bytes,
-                first_page=first_page,
-                last_page=last_page,
-                dpi=300,
-                fmt='png'
-            )
-
-            all_texts = []
-            all_metadata = []
-
-            for page_num, image in enumerate(images, start=first_page):
-                text, metadata = self.extract_text_from_image(image)
-                metadata['page_number'] = page_num
-                all_texts.append(text)
-                all_metadata.append(metadata)
+            with tempfile.TemporaryDirectory(prefix="ocr-pages-") as output_folder:
+                # Pages are rendered to disk and opened one at a time, so only the
+                # page being OCR'd is ever decoded in memory
+                started = time.perf_counter()
+                page_paths = pdf2image.convert_from_path(
+                    pdf_path,
+                    first_page=first_page,
+                    last_page=last_page,
+                    dpi=OCR_DPI,
+                    fmt='png',
+                    grayscale=True,
+                    output_folder=output_folder,
+                    paths_only=True
+                )
+                rasterize_seconds = time.perf_counter() - started
+
+                all_texts, all_metadata = self._extract_pages(page_paths, first_page, on_page)
+
+            # Rendering happens for the whole range at once; spread it evenly over the pages
+            for metadata in all_metadata:
+                metadata['timings']['rasterize'] = rasterize_seconds / len(all_metadata)
 
             return all_texts, all_metadata
 
@@ -99,11 +129,37 @@ class OCRService:
             logger.error(f"Error extracting text from PDF: {e}")
             raise
 
-    def extract_text_from_file(self, file_bytes: bytes, filename: str, mime_type: str) -> Tuple[str, dict]:
+    def _extract_pages(
+        self,
+        page_paths: List[str],
+        first_page: int,
+        on_page: Optional[PageCallback] = None
+    ) -> Tuple[List[str], List[dict]]:
+        all_texts = []
+        all_metadata = []
+
+        for page_num, page_path in enumerate(page_paths, start=first_page):
+            with Image.open(page_path) as image:
+                text, metadata = self.extract_text_from_image(image)
+            metadata['page_number'] = page_num
+            all_texts.append(text)
+            all_metadata.append(metadata)
+            if on_page is not None:
+                on_page(page_num, first_page + len(page_paths) - 1, metadata)
+
+        return all_texts, all_metadata
+
+    def extract_text_from_file(
+        self,
+        file_path: Union[str, Path],
+        filename: str,
+        mime_type: str,
+        on_page: Optional[PageCallback] = None
+    ) -> Tuple[str, dict]:
         file_ext = Path(filename).suffix.lower()
 
         if file_ext == '.pdf' or mime_type == 'application/pdf':
-            texts, metadata_list = self.extract_text_from_pdf(file_bytes)
+            texts, metadata_list = self.extract_text_from_pdf(file_path, on_page=on_page)
             full_text = '\n\n'.join(texts)
             combined_metadata = {
                 'total_pages': len(texts),
@@ -115,8 +171,10 @@ class OCRService:
             return full_text, combined_metadata
 
         elif file_ext in ['.png', '.jpg', '.jpeg', '.tiff', '.tif'] or mime_type.startswith('image/'):
-            image = Image.open(io.BytesIO(file_bytes))
-            text, metadata = self.extract_text_from_image(image)
+            with Image.open(file_path) as image:
+                text, metadata = self.extract_text_from_image(image)
+            if on_page is not None:
+                on_page(1, 1, metadata)
             return text, metadata
         
         else:
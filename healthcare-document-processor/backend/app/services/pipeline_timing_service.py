@@ -0,0 +1,85 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import AnalysisStatus, AnalysisType, Document, DocumentAnalysis, DocumentType
+from app.utils.helpers import percentile
+
+STAGES = ("download", "rasterize", "preprocess", "ocr", "clean", "chunk", "persist", "embed")
+PAGE_STAGES = ("rasterize", "preprocess", "ocr")
+PAGE_BUCKETS = ((1, 1), (2, 5), (6, 20), (21, 100), (101, None))
+
+
+class PipelineTimingService:
+    """Percentiles of the stage timings recorded on completed OCR analyses."""
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def stage_percentiles(self, hours: int = 24, document_type: Optional[DocumentType] = None) -> List[dict]:
+        """Stage and per-page timings grouped by document type and page-count bucket."""
+        query = self.db.query(Document.document_type, DocumentAnalysis.extracted_data).join(
+            Document, Document.id == DocumentAnalysis.document_id
+        ).filter(
+            DocumentAnalysis.analysis_type == AnalysisType.OCR,
+            DocumentAnalysis.status == AnalysisStatus.COMPLETED,
+            DocumentAnalysis.created_at >= datetime.utcnow() - timedelta(hours=hours)
+        )
+        if document_type is not None:
+            query = query.filter(Document.document_type == document_type)
+        rows = query.order_by(DocumentAnalysis.created_at.desc()).limit(settings.PIPELINE_TIMING_MAX_ROWS).all()
+
+        groups: Dict[Tuple[DocumentType, str], Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        for doc_type, data in rows:
+            data = data or {}
+            samples = groups[(doc_type, _page_bucket(data.get("total_pages") or 1))]
+            samples["documents"].append(1.0)
+
+            stage_timings = data.get("stage_timings") or {}
+            for stage in STAGES:
+                if stage in stage_timings:
+                    samples[stage].append(stage_timings[stage])
+            samples["total"].append(sum(stage_timings.values()))
+            for page in data.get("page_timings") or []:
+                for stage in PAGE_STAGES:
+                    if stage in page:
+                        samples[f"page_{stage}"].append(page[stage])
+
+        return [
+            {
+                "document_type": doc_type.value,
+                "pages": bucket,
+                "documents": len(samples.pop("documents")),
+                "stages": {stage: _summary(values) for stage, values in samples.items() if not stage.startswith("page_")},
+                "per_page": {stage[len("page_"):]: _summary(values) for stage, values in samples.items() if stage.startswith("page_")},
+            }
+            for (doc_type, bucket), samples in sorted(groups.items(), key=lambda item: (item[0][0].value, _bucket_order(item[0][1])))
+        ]
+
+
+def _page_bucket(pages: int) -> str:
+    for low, high in PAGE_BUCKETS:
+        if high is None or pages <= high:
+            return _bucket_label(low, high)
+    return _bucket_label(*PAGE_BUCKETS[-1])
+
+def _bucket_label(low: int, high: Optional[int]) -> str:
+    if high is None:
+        return f"{low}+"
+    return str(low) if low == high else f"{low}-{high}"
+
+def _bucket_order(label: str) -> int:
+    return [_bucket_label(low, high) for low, high in PAGE_BUCKETS].index(label)
+
+def _summary(values: List[float]) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+    }
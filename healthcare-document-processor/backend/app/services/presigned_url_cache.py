@@ -0,0 +1,55 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.services.storage_service import StorageBackend
+
+
+class PresignedUrlCache:
+    """Reuses signed download URLs until they get close to expiring.
+
+    Entries are dropped after ``ttl`` seconds, which is kept below the URL
+    lifetime, so a cached link always has at least ``expires_in - ttl``
+    seconds left when it is handed out. Keys are object keys, so documents
+    sharing a deduplicated blob share one link.
+    """
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        expires_in: int = settings.DOWNLOAD_URL_EXPIRES_SECONDS,
+        ttl: int = settings.DOWNLOAD_URL_CACHE_TTL_SECONDS,
+        maxsize: int = settings.DOWNLOAD_URL_CACHE_MAX_SIZE,
+    ) -> None:
+        if ttl >= expires_in:
+            raise ValueError("Download URL cache TTL must be shorter than the URL expiry")
+
+        self.storage = storage
+        self.expires_in = expires_in
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, object_key: str) -> Tuple[str, int]:
+        """Return a download URL for ``object_key`` and its remaining lifetime in seconds."""
+        now = time.time()
+        with self._lock:
+            entry: Optional[Tuple[str, float]] = self._cache.get(object_key)
+
+        if entry is None:
+            url = self.storage.generate_presigned_url(object_key, self.expires_in)
+            entry = (url, now + self.expires_in)
+            with self._lock:
+                self._cache[object_key] = entry
+
+        url, expires_at = entry
+        return url, max(0, int(expires_at - now))
+
+    def get_many(self, object_keys: Iterable[str]) -> Dict[str, Tuple[str, int]]:
+        return {object_key: self.get(object_key) for object_key in dict.fromkeys(object_keys)}
+
+    def invalidate(self, object_key: str) -> None:
+        with self._lock:
+            self._cache.pop(object_key, None)
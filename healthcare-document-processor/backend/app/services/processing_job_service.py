@@ -0,0 +1,128 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Document, JobPriority, JobStatus, ProcessingJob, User, UserRole
+from app.services.admission import AdmissionController, admission_controller
+from app.services.job_queue import JobQueue, get_job_queue
+from app.services.job_scheduler import JobScheduler, estimate_page_count, job_scheduler
+
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+# Patients can't jump the clinical queue
+STAT_ROLES = (UserRole.ADMIN, UserRole.DOCTOR, UserRole.NURSE, UserRole.STAFF)
+
+
+class ProcessingJobService:
+    def __init__(
+        self,
+        db: Session,
+        job_queue: Optional[JobQueue] = None,
+        scheduler: Optional[JobScheduler] = None,
+        admission: Optional[AdmissionController] = None
+    ) -> None:
+        self.db = db
+        self.job_queue = job_queue or get_job_queue()
+        self.scheduler = scheduler or job_scheduler
+        self.admission = admission or admission_controller
+
+    def enqueue(self, document_id: UUID, user: User, priority: JobPriority = JobPriority.ROUTINE) -> ProcessingJob:
+        if priority == JobPriority.STAT and user.role not in STAT_ROLES:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to request STAT processing")
+
+        document = self.db.query(Document).filter(
+            Document.id == document_id,
+            Document.user_id == user.id
+        ).first()
+
+        if not document:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+
+        # Asking again while a job is pending returns that job instead of queueing a second one
+        active = self._active_job(document_id)
+        if active:
+            return active
+
+        page_count = estimate_page_count(document)
+        self.admission.admit_job(self.db, priority, page_count)
+
+        now = datetime.utcnow()
+        job = ProcessingJob(
+            document_id=document_id,
+            user_id=user.id,
+            status=JobStatus.QUEUED,
+            priority=priority,
+            page_count=page_count,
+            created_at=now,
+            schedule_at=self.scheduler.schedule_at(now, page_count)
+        )
+        self.db.add(job)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent request queued the document first; the partial unique index kept it to one job
+            self.db.rollback()
+            active = self._active_job(document_id)
+            if active is None:
+                raise
+            return active
+
+        try:
+            self.job_queue.enqueue(job.id)
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error_message = f"Could not enqueue job: {e}"
+            self.db.commit()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Processing queue unavailable, try again later"
+            )
+
+        self.db.refresh(job)
+        return job
+
+    def _active_job(self, document_id: UUID) -> Optional[ProcessingJob]:
+        return self.db.query(ProcessingJob).filter(
+            ProcessingJob.document_id == document_id,
+            ProcessingJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+    def get_job(self, job_id: UUID, user: User) -> ProcessingJob:
+        job = self.db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
+        if not job or (job.user_id != user.id and user.role != UserRole.ADMIN):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+        return job
+
+    def queue_position(self, job: ProcessingJob) -> Optional[int]:
+        return self.scheduler.queue_position(self.db, job)
+
+    def queue_metrics(self) -> dict:
+        return self.scheduler.metrics(self.db)
+
+    def admission_stats(self) -> dict:
+        return self.admission.stats(self.db)
+
+    def progress_snapshot(self, user_id: UUID, document_id: Optional[UUID] = None) -> List[dict]:
+        """Current state as stream events: a document's latest job, or all of a user's active jobs."""
+        query = self.db.query(ProcessingJob).filter(ProcessingJob.user_id == user_id)
+        if document_id is not None:
+            jobs = query.filter(ProcessingJob.document_id == document_id).order_by(ProcessingJob.created_at.desc()).limit(1).all()
+        else:
+            jobs = query.filter(ProcessingJob.status.in_(ACTIVE_STATUSES)).order_by(ProcessingJob.created_at).all()
+        return [_job_event(job) for job in jobs]
+
+
+def _job_event(job: ProcessingJob) -> dict:
+    return {
+        "type": "progress" if job.status in ACTIVE_STATUSES else job.status.value,
+        "job_id": str(job.id),
+        "document_id": str(job.document_id),
+        "user_id": str(job.user_id),
+        "status": job.status.value,
+        "stage": job.stage,
+        "progress": job.progress,
+        "error": job.error_message
+    }
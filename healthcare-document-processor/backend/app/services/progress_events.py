@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_EVENTS = ("succeeded", "failed")
+
+
+class Subscriber:
+    """One open event stream: a bounded queue on the loop serving it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, document_id: Optional[str], queue_size: int) -> None:
+        self.loop = loop
+        self.document_id = document_id
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event: dict) -> bool:
+        return self.document_id is None or event.get("document_id") == self.document_id
+
+    def push(self, event: dict) -> None:
+        # Runs on the subscriber's loop. Progress is superseded by later
+        # progress, so a slow client loses the oldest events, never the newest.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Next event, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ProgressBroker:
+    """Fans processing progress out to the clients following it.
+
+    Workers publish from their own threads; each event is handed to the
+    event loop of every matching subscriber. With the redis backend events
+    go through a pub/sub channel instead, so progress from Celery worker
+    processes reaches whichever API process holds the client's stream.
+    """
+
+    def __init__(
+        self,
+        backend: str = settings.PROGRESS_EVENTS_BACKEND,
+        queue_size: int = settings.PROGRESS_EVENTS_QUEUE_SIZE,
+        channel: str = settings.PROGRESS_EVENTS_CHANNEL,
+    ) -> None:
+        self.queue_size = queue_size
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscriber]] = {}  # user id -> open streams
+        self._redis = None
+
+        if backend == "redis":
+            self._init_shared_backend()
+        elif backend != "memory":
+            raise ValueError(f"Unknown progress events backend: {backend}")
+
+    def _init_shared_backend(self) -> None:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("redis is not installed; progress events stay in-process")
+            return
+
+        self._redis = redis.Redis.from_url(settings.REDIS_URL)
+
+    @property
+    def shared(self) -> bool:
+        return self._redis is not None
+
+    def publish(self, event: dict) -> None:
+        """Send an event from any thread. Events carry string ``user_id`` and ``document_id``."""
+        if self._redis is not None:
+            try:
+                self._redis.publish(self.channel, json.dumps(event))
+                return
+            except Exception as e:
+                # Clients on this process still get it; others fall back to the job row
+                logger.warning(f"Shared progress channel unavailable: {e}")
+        self._deliver(event)
+
+    def _deliver(self, event: dict) -> None:
+        with self._lock:
+            subscribers = [s for s in self._subscribers.get(event.get("user_id"), ()) if s.wants(event)]
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, event)
+            except RuntimeError:
+                pass  # Loop already closed; the stream is going away
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str, document_id: Optional[str] = None) -> AsyncIterator[Subscriber]:
+        """Receive events for a user's jobs, optionally narrowed to one document, while open."""
+        subscriber = Subscriber(asyncio.get_running_loop(), document_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            with self._lock:
+                streams = self._subscribers.get(user_id)
+                if streams is not None:
+                    streams.discard(subscriber)
+                    if not streams:
+                        del self._subscribers[user_id]
+
+    async def stream(
+        self,
+        user_id: str,
+        document_id: Optional[str] = None,
+        snapshot: Optional[Callable[[], Awaitable[List[dict]]]] = None,
+        heartbeat: float = settings.PROGRESS_EVENTS_HEARTBEAT_SECONDS
+    ) -> AsyncIterator[str]:
+        """Server-Sent Events text for a subscription.
+
+        ``snapshot`` supplies the current state and is read only after
+        subscribing, so nothing published in between is missed. A stream for
+        one document ends once its job finishes.
+        """
+        async with self.subscribe(user_id, document_id) as subscriber:
+            for event in (await snapshot() if snapshot else []):
+                yield format_sse(event)
+                if document_id is not None and event["type"] in TERMINAL_EVENTS:
+                    return
+
+            while True:
+                event = await subscriber.next(heartbeat)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+                if document_id is not None and event["type"] in TERMINAL_EVENTS:
+                    return
+
+    async def run_listener(self) -> None:
+        """Relay the shared channel to this process's subscribers; returns at once when in-process."""
+        if self._redis is None:
+            return
+
+        import redis.asyncio as redis_asyncio
+
+        while True:
+            client = redis_asyncio.from_url(settings.REDIS_URL)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._deliver(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Progress event listener failed: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            streams = sum(len(s) for s in self._subscribers.values())
+        return {"backend": "redis" if self.shared else "memory", "open_streams": streams}
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+progress_broker = ProgressBroker()
+
+def get_progress_broker() -> ProgressBroker:
+    return progress_broker
@@ -0,0 +1,110 @@
+import logging
+import threading
+from typing import Optional
+
+from app.core.config import settings
+from app.services.embedding_service import EmbeddingBackend, create_embedding_backend
+from app.services.local_storage_service import LocalStorageService
+from app.services.ocr_service import OCRService
+from app.services.presigned_url_cache import PresignedUrlCache
+from app.services.storage_service import S3StorageService, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Process-wide service instances shared by every request.
+
+    boto3 clients are thread-safe, so one storage client (and its keep-alive
+    connection pool) serves all requests. Instances are created on startup by
+    the application lifespan, or lazily on first use outside it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._storage: Optional[StorageBackend] = None
+        self._ocr: Optional[OCRService] = None
+        self._download_urls: Optional[PresignedUrlCache] = None
+        self._embeddings: Optional[EmbeddingBackend] = None
+        self._embeddings_loaded = False
+
+    @property
+    def storage(self) -> StorageBackend:
+        if self._storage is None:
+            with self._lock:
+                if self._storage is None:
+                    self._storage = create_storage_backend()
+        return self._storage
+
+    @property
+    def ocr(self) -> OCRService:
+        if self._ocr is None:
+            with self._lock:
+                if self._ocr is None:
+                    self._ocr = OCRService()
+        return self._ocr
+
+    @property
+    def download_urls(self) -> PresignedUrlCache:
+        if self._download_urls is None:
+            storage = self.storage
+            with self._lock:
+                if self._download_urls is None:
+                    self._download_urls = PresignedUrlCache(storage)
+        return self._download_urls
+
+    @property
+    def embeddings(self) -> Optional[EmbeddingBackend]:
+        """The loaded embedding model, or None when embedding is off or the model can't be loaded."""
+        if not self._embeddings_loaded:
+            with self._lock:
+                if not self._embeddings_loaded:
+                    try:
+                        self._embeddings = create_embedding_backend()
+                    except Exception as e:
+                        # Processing carries on without vectors; python -m app.embed backfills them later
+                        logger.error(f"Embedding backend unavailable, chunks will not be embedded: {e}")
+                    self._embeddings_loaded = True
+        return self._embeddings
+
+    def start(self) -> None:
+        self.storage
+        self.ocr
+        self.download_urls
+        self.embeddings
+
+    def close(self) -> None:
+        with self._lock:
+            if self._storage is not None:
+                try:
+                    self._storage.close()
+                except Exception as e:
+                    logger.warning(f"Error closing storage client: {e}")
+            self._storage = None
+            self._ocr = None
+            self._download_urls = None
+            self._embeddings = None
+            self._embeddings_loaded = False
+
+
+def create_storage_backend(backend: str = settings.STORAGE_BACKEND) -> StorageBackend:
+    if backend == "local":
+        return LocalStorageService()
+    if backend == "s3":
+        return S3StorageService()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+services = ServiceRegistry()
+
+def get_storage_service() -> StorageBackend:
+    return services.storage
+
+def get_ocr_service() -> OCRService:
+    return services.ocr
+
+def get_download_url_cache() -> PresignedUrlCache:
+    return services.download_urls
+
+def get_embedding_backend() -> Optional[EmbeddingBackend]:
+    return services.embeddings
@@ -0,0 +1,219 @@
+import html
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import Float, Integer, Text, bindparam, column, text
+from sqlalchemy.orm import Session
+
+from app.models import Document, DocumentChunk, User, UserRole
+from app.services.embedding_service import EmbeddingBackend
+from app.services.vector_index import VectorIndex
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# The database marks matches with control characters rather than HTML so the
+# snippet can be escaped before the highlight tags go in
+MATCH_START = "\x02"
+MATCH_STOP = "\x03"
+SNIPPET_CHARS = 300
+
+POSTGRES_SEARCH_SQL = """
+    SELECT hits.id, hits.document_id, hits.chunk_index, hits.page_number, hits.rank,
+           ts_headline('english', c.content, websearch_to_tsquery('english', :query), :headline_options) AS snippet
+    FROM (
+        SELECT c.id, c.document_id, c.chunk_index, c.page_number,
+               ts_rank_cd(c.search_vector, websearch_to_tsquery('english', :query)) AS rank
+        FROM document_chunks c
+        JOIN documents d ON d.id = c.document_id
+        WHERE c.search_vector @@ websearch_to_tsquery('english', :query)
+        {scope}
+        ORDER BY rank DESC
+        LIMIT :limit OFFSET :skip
+    ) hits
+    JOIN document_chunks c ON c.id = hits.id
+    ORDER BY hits.rank DESC
+"""
+
+POSTGRES_COUNT_SQL = """
+    SELECT count(*)
+    FROM document_chunks c
+    JOIN documents d ON d.id = c.document_id
+    WHERE c.search_vector @@ websearch_to_tsquery('english', :query)
+    {scope}
+"""
+
+SQLITE_SEARCH_SQL = """
+    SELECT c.id, c.document_id, c.chunk_index, c.page_number,
+           -bm25(document_chunks_fts) AS rank,
+           snippet(document_chunks_fts, 0, :match_start, :match_stop, '...', 24) AS snippet
+    FROM document_chunks_fts
+    JOIN document_chunks c ON c.rowid = document_chunks_fts.rowid
+    JOIN documents d ON d.id = c.document_id
+    WHERE document_chunks_fts MATCH :query
+    {scope}
+    ORDER BY bm25(document_chunks_fts)
+    LIMIT :limit OFFSET :skip
+"""
+
+SQLITE_COUNT_SQL = """
+    SELECT count(*)
+    FROM document_chunks_fts
+    JOIN document_chunks c ON c.rowid = document_chunks_fts.rowid
+    JOIN documents d ON d.id = c.document_id
+    WHERE document_chunks_fts MATCH :query
+    {scope}
+"""
+
+
+class SearchService:
+    def __init__(
+        self,
+        db: Session,
+        embedding_backend: Optional[EmbeddingBackend] = None,
+        vector_index: Optional[VectorIndex] = None
+    ) -> None:
+        self.db = db
+        self.embedding_backend = embedding_backend
+        self.vector_index = vector_index
+
+    def search_chunks(
+        self,
+        query: str,
+        user: User,
+        skip: int = 0,
+        limit: int = 20,
+        document_id: Optional[str] = None,
+    ) -> Tuple[List[dict], int]:
+        """One page of matching chunks, best first, and how many chunks match in all."""
+        search_sql, count_sql, query_param = self._dialect_sql(query)
+        scope, params, binds = _scope(user, document_id)
+        params["query"] = query_param
+
+        statement = text(search_sql.format(scope=scope)).bindparams(*binds).columns(
+            DocumentChunk.__table__.c.id,
+            DocumentChunk.__table__.c.document_id,
+            column("chunk_index", Integer),
+            column("page_number", Integer),
+            column("rank", Float),
+            column("snippet", Text),
+        )
+        rows = self.db.execute(statement, {
+            **params,
+            "limit": limit,
+            "skip": skip,
+            "match_start": MATCH_START,
+            "match_stop": MATCH_STOP,
+            "headline_options": f"StartSel={MATCH_START}, StopSel={MATCH_STOP}, MaxWords=35, MinWords=15, MaxFragments=2",
+        }).mappings().all()
+
+        if len(rows) < limit and (rows or skip == 0):
+            # A short page is the last one, so the total is known without counting
+            total = skip + len(rows)
+        else:
+            total = self.db.execute(text(count_sql.format(scope=scope)).bindparams(*binds), params).scalar()
+
+        hits = [
+            {
+                "chunk_id": str(row["id"]),
+                "document_id": str(row["document_id"]),
+                "chunk_index": row["chunk_index"],
+                "page_number": row["page_number"],
+                "score": row["rank"],
+                "snippet": _highlight(row["snippet"]),
+            }
+            for row in rows
+        ]
+        return hits, total
+
+    def _dialect_sql(self, query: str) -> Tuple[str, str, str]:
+        query = query.strip()
+        if not query:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query is empty")
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return POSTGRES_SEARCH_SQL, POSTGRES_COUNT_SQL, query
+        if dialect == "sqlite":
+            return SQLITE_SEARCH_SQL, SQLITE_COUNT_SQL, _fts5_query(query)
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"Full-text search is not supported on {dialect}"
+        )
+
+
+    def semantic_search(
+        self,
+        query: str,
+        user: User,
+        limit: int = 20,
+        document_id: Optional[UUID] = None,
+    ) -> List[dict]:
+        """Chunks nearest in meaning to the query, from the caller's own vector partition (every partition for admins)."""
+        query = query.strip()
+        if not query:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query is empty")
+        if self.embedding_backend is None or self.vector_index is None:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Semantic search is not available")
+
+        vector = self.embedding_backend.embed([query]).vectors[0]
+        hits = self.vector_index.search(
+            self.embedding_backend.model_name,
+            vector,
+            limit,
+            user_id=None if user.role == UserRole.ADMIN else user.id,
+            document_id=document_id
+        )
+        if not hits:
+            return []
+
+        # The index can briefly trail the database; chunks deleted since are dropped here
+        chunks = {
+            chunk.id: chunk
+            for chunk in self.db.query(
+                DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.chunk_index,
+                DocumentChunk.page_number, DocumentChunk.content
+            ).filter(DocumentChunk.id.in_([hit.chunk_id for hit in hits]))
+        }
+        return [
+            {
+                "chunk_id": str(hit.chunk_id),
+                "document_id": str(hit.document_id),
+                "chunk_index": chunks[hit.chunk_id].chunk_index,
+                "page_number": chunks[hit.chunk_id].page_number,
+                "score": hit.score,
+                "snippet": html.escape(_truncate(chunks[hit.chunk_id].content)),
+            }
+            for hit in hits
+            if hit.chunk_id in chunks
+        ]
+
+
+def _scope(user: User, document_id: Optional[str]):
+    scope, params, binds = [], {}, []
+    if user.role != UserRole.ADMIN:
+        scope.append("AND d.user_id = :user_id")
+        params["user_id"] = user.id
+        binds.append(bindparam("user_id", type_=Document.__table__.c.user_id.type))
+    if document_id is not None:
+        scope.append("AND c.document_id = :document_id")
+        params["document_id"] = document_id
+        binds.append(bindparam("document_id", type_=DocumentChunk.__table__.c.document_id.type))
+    return " ".join(scope), params, binds
+
+def _highlight(snippet: str) -> str:
+    """Escape the chunk text, then turn the database's match markers into highlight tags."""
+    parts = []
+    for i, segment in enumerate(snippet.split(MATCH_START)):
+        matched, _, rest = segment.partition(MATCH_STOP) if i else ("", "", segment)
+        if matched:
+            parts.append(HIGHLIGHT_START + html.escape(matched.replace(MATCH_STOP, "")) + HIGHLIGHT_STOP)
+        parts.append(html.escape(rest.replace(MATCH_STOP, "")))
+    return "".join(parts)
+
+def _truncate(content: str) -> str:
+    return content if len(content) <= SNIPPET_CHARS else content[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+
+def _fts5_query(query: str) -> str:
+    # Quote every term so user input can't inject FTS5 operators or column filters
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
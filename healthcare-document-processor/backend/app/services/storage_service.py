@@ -1,17 +1,91 @@
 import mimetypes
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import BinaryIO, Optional
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
+from typing import BinaryIO, Iterator, Optional
 from uuid import uuid4
 import uuid
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import HTTPException, status
-from sqlalchemy.sql.coercions import expect
 
 from app.core.config import settings
 
-class S3StorageService:
+MB = 1024 * 1024
+STREAM_READ_SIZE = 1 * MB
+
+def build_content_key(checksum_sha256: str, filename: str) -> str:
+    """Object key addressed by content, sharded on the leading hex digits."""
+    file_ext = Path(filename).suffix.lower()
+    return f"blobs/{checksum_sha256[:2]}/{checksum_sha256[2:4]}/{checksum_sha256}{file_ext}"
+
+def build_document_path(user_id, document_id, filename: str) -> str:
+    """Per-document path shown to clients, in the layout uploads used before content addressing."""
+    return f"user/{user_id}/{document_id}{Path(filename).suffix.lower()}"
+
+
+class StorageBackend(ABC):
+    """Interface shared by the object stores documents can live in."""
+
+    @abstractmethod
+    def upload_file(
+        self,
+        file_obj: BinaryIO,
+        filename: str,
+        user_id: str,
+        content_type: Optional[str] = None
+    ) -> str:
+        """Store ``file_obj`` by reading it once from the start and return its object key."""
+
+    @abstractmethod
+    def download_file(self, object_key: str) -> BinaryIO:
+        """Return a readable file positioned at the start; the caller closes it."""
+
+    @abstractmethod
+    def delete_file(self, object_key: str) -> None:
+        ...
+
+    @abstractmethod
+    def move_file(self, source_key: str, dest_key: str) -> None:
+        """Move an object to ``dest_key``, replacing anything stored there."""
+
+    @abstractmethod
+    def generate_presigned_url(self, object_key: str, expires_in: int = 600) -> str:
+        ...
+
+    def download_to(self, object_key: str, file_obj: BinaryIO) -> None:
+        with self.download_file(object_key) as source:
+            shutil.copyfileobj(source, file_obj, STREAM_READ_SIZE)
+
+    def local_path(self, object_key: str) -> Optional[Path]:
+        """Path of the object on this host's filesystem, if the backend keeps one."""
+        return None
+
+    @contextmanager
+    def local_copy(self, object_key: str) -> Iterator[Path]:
+        """Yield a filesystem path holding the object, staging remote objects in a temp file."""
+        path = self.local_path(object_key)
+        if path is not None:
+            yield path
+            return
+
+        with NamedTemporaryFile(suffix=Path(object_key).suffix) as tmp:
+            self.download_to(object_key, tmp)
+            tmp.flush()
+            yield Path(tmp.name)
+
+    def close(self) -> None:
+        pass
+
+
+class S3StorageService(StorageBackend):
 
     def __init__(
         self,
@@ -19,6 +93,7 @@ class S3StorageService:
         region: str = settings.AWS_REGION,
         access_key: Optional[str] = settings.AWS_ACCESS_KEY_ID,
         secret_key: Optional[str] = settings.AWS_SECRET_ACCESS_KEY,
+        endpoint_url: Optional[str] = settings.S3_ENDPOINT_URL,
         ) -> None:
         self.bucket = bucket_name
 
@@ -28,7 +103,27 @@ class S3StorageService:
             region_name=region
         )
 
-        self.client = session.client("s3")
+        # Every transfer thread needs its own pooled connection
+        pool_size = max(settings.S3_UPLOAD_CONCURRENCY, settings.S3_DOWNLOAD_CONCURRENCY, settings.BULK_UPLOAD_CONCURRENCY, 10)
+        self.client = session.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=pool_size, tcp_keepalive=True, retries={"mode": "adaptive"})
+        )
+
+        self.upload_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=settings.S3_UPLOAD_CONCURRENCY,
+            use_threads=settings.S3_UPLOAD_CONCURRENCY > 1
+        )
+        self.download_part_size = settings.S3_DOWNLOAD_PART_SIZE
+        self.download_threshold = settings.S3_DOWNLOAD_THRESHOLD
+        self.download_concurrency = settings.S3_DOWNLOAD_CONCURRENCY
+        self.spool_max_size = settings.DOWNLOAD_SPOOL_MAX_SIZE
+
+    def close(self) -> None:
+        self.client.close()
 
     def _build_object_key(self, user_id: str, filename: str) -> str:
         file_ext = Path(filename).suffix.lower()
@@ -52,11 +147,12 @@ class S3StorageService:
                 file_obj,
                 self.bucket,
                 object_key,
-                ExtraAgrs = {
+                ExtraArgs = {
                     "ACL": "private",
                     "ContentType": content_type,
                     "ServerSideEncryption": "AES256"
-                }
+                },
+                Config=self.upload_config
             )
         except (BotoCoreError, ClientError) as exc:
             raise HTTPException(
@@ -64,6 +160,8 @@ class S3StorageService:
                 detail=f"Failed to upload file to storage: {exc}"
             )
 
+        return object_key
+
     def generate_presigned_url(
         self,
         object_key: str,
@@ -79,4 +177,99 @@ class S3StorageService:
             raise HTTPException(
                 status_code=status.HTTP_502_BAD_GATEWAY,
                 detail=f"Failed to generate download url: {exc}"
-            )
\ No newline at end of file
+            )
+
+    def delete_file(self, object_key: str) -> None:
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=object_key)
+        except (BotoCoreError, ClientError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Failed to delete file from storage: {exc}"
+            )
+
+    def move_file(self, source_key: str, dest_key: str) -> None:
+        # Server-side copy; the bytes never pass back through this process
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=dest_key,
+                CopySource={"Bucket": self.bucket, "Key": source_key},
+                ServerSideEncryption="AES256"
+            )
+            self.client.delete_object(Bucket=self.bucket, Key=source_key)
+        except (BotoCoreError, ClientError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Failed to move file in storage: {exc}"
+            )
+
+    def download_file(self, object_key: str) -> SpooledTemporaryFile:
+        """Fetch an object into a spooled buffer, using parallel ranged GETs for large objects.
+
+        The buffer stays in memory up to ``DOWNLOAD_SPOOL_MAX_SIZE`` and rolls
+        over to a temp file beyond that. It is returned rewound; the caller closes it.
+        """
+        buffer = SpooledTemporaryFile(max_size=self.spool_max_size)
+        try:
+            self.download_to(object_key, buffer)
+        except Exception:
+            buffer.close()
+            raise
+
+        buffer.seek(0)
+        return buffer
+
+    def download_to(self, object_key: str, file_obj: BinaryIO) -> None:
+        try:
+            size = self.client.head_object(Bucket=self.bucket, Key=object_key)["ContentLength"]
+            if size <= self.download_threshold or self.download_concurrency <= 1:
+                self._download_range(object_key, file_obj, None, 0)
+            else:
+                self._download_parts(object_key, file_obj, size)
+        except (BotoCoreError, ClientError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Failed to download file from storage: {exc}"
+            )
+
+    def _download_parts(self, object_key: str, buffer: BinaryIO, size: int) -> None:
+        if isinstance(buffer, SpooledTemporaryFile) and size > self.spool_max_size:
+            # Go straight to disk instead of growing an in-memory buffer and copying it over
+            buffer.rollover()
+        lock = threading.Lock()
+        ranges = [
+            (start, min(start + self.download_part_size, size) - 1)
+            for start in range(0, size, self.download_part_size)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.download_concurrency) as executor:
+            futures = [
+                executor.submit(self._download_range, object_key, buffer, f"bytes={start}-{end}", start, lock)
+                for start, end in ranges
+            ]
+            for future in futures:
+                future.result()
+
+    def _download_range(
+        self,
+        object_key: str,
+        buffer: BinaryIO,
+        byte_range: Optional[str],
+        offset: int,
+        lock: Optional[threading.Lock] = None
+    ) -> None:
+        params = {"Bucket": self.bucket, "Key": object_key}
+        if byte_range:
+            params["Range"] = byte_range
+        body = self.client.get_object(**params)["Body"]
+
+        position = offset
+        for chunk in body.iter_chunks(STREAM_READ_SIZE):
+            if lock is None:
+                buffer.write(chunk)
+            else:
+                with lock:
+                    buffer.seek(position)
+                    buffer.write(chunk)
+            position += len(chunk)
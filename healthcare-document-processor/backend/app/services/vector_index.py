@@ -0,0 +1,471 @@
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import DocumentChunk
+from app.services.embedding_service import normalize_rows, vector_from_bytes
+
+logger = logging.getLogger(__name__)
+
+ROW_DTYPE = np.dtype([("chunk_id", "S16"), ("document_id", "S16"), ("deleted", "u1")])
+MIN_CAPACITY = 1024
+BLOCK_ROWS = 16384  # Rows scored per matrix product, bounding the temporaries for int8 partitions
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_CLUSTER = 64
+
+
+class VectorHit(NamedTuple):
+    chunk_id: UUID
+    document_id: UUID
+    score: float
+
+
+class _Files(NamedTuple):
+    meta: dict
+    vectors: np.ndarray
+    scales: Optional[np.ndarray]  # Per-row dequantization factor for int8 partitions
+    rows: np.ndarray
+    lists: Optional[np.ndarray]  # Cluster of each row once the partition is clustered
+    centroids: Optional[np.ndarray]
+
+
+class VectorPartition:
+    """One tenant's vectors from one embedding model, in memory-mapped files.
+
+    Rows are only appended, and ``meta.json`` is replaced after each append
+    to publish the new count, so readers in other processes never see a
+    half-written row. Deletes set a tombstone in place. When tombstones make
+    up too much of the files, or the partition has doubled since it was
+    clustered, everything is rewritten as a new generation and ``meta.json``
+    switched over; searches already mapping the old files finish on them.
+
+    Small partitions are searched exactly. From ``ivf_min_vectors`` live
+    rows on, the partition is clustered with k-means and a search only
+    scores the rows in the ``nprobe`` clusters nearest the query; searches
+    limited to given documents still score all of their rows.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        quantization: str = settings.VECTOR_INDEX_QUANTIZATION,
+        ivf_min_vectors: int = settings.VECTOR_INDEX_IVF_MIN_VECTORS,
+        nprobe: int = settings.VECTOR_INDEX_IVF_NPROBE,
+        compact_fraction: float = settings.VECTOR_INDEX_COMPACT_FRACTION,
+    ) -> None:
+        if quantization not in ("float32", "int8"):
+            raise ValueError(f"Unknown vector quantization: {quantization}")
+        self.path = path
+        self.quantization = quantization
+        self.ivf_min_vectors = ivf_min_vectors
+        self.nprobe = nprobe
+        self.compact_fraction = compact_fraction
+        self._lock = threading.Lock()
+        self._files: Optional[_Files] = None
+
+    def add(self, chunk_ids: Sequence[UUID], document_ids: Sequence[UUID], vectors: np.ndarray) -> None:
+        self.update(chunk_ids=chunk_ids, document_ids=document_ids, vectors=vectors)
+
+    def delete_documents(self, document_ids: Sequence[UUID]) -> None:
+        self.update(remove=document_ids)
+
+    def replace_document(self, document_id: UUID, chunk_ids: Sequence[UUID], vectors: np.ndarray) -> None:
+        self.update(remove=[document_id], chunk_ids=chunk_ids, document_ids=[document_id] * len(chunk_ids), vectors=vectors)
+
+    def update(
+        self,
+        remove: Sequence[UUID] = (),
+        chunk_ids: Sequence[UUID] = (),
+        document_ids: Sequence[UUID] = (),
+        vectors: Optional[np.ndarray] = None
+    ) -> None:
+        """Tombstone every row of the ``remove`` documents, then append the given rows, as one write."""
+        vectors = np.empty((0, 0), dtype=np.float32) if vectors is None else normalize_rows(vectors)
+        with self._writing() as meta:
+            if meta is None:
+                if not len(vectors):
+                    return
+                meta = self._new_meta(vectors.shape[1])
+            elif len(vectors) and vectors.shape[1] != meta["dim"]:
+                raise ValueError(f"Vectors have {vectors.shape[1]} dimensions, the partition holds {meta['dim']}")
+
+            if remove and meta["count"]:
+                self._tombstone(meta, remove)
+            if len(vectors):
+                self._append(meta, chunk_ids, document_ids, vectors)
+            replaced = self._maintain(meta)
+            self._publish(meta)
+            if replaced is not None:
+                # Maps of the old files held by running searches stay valid after the unlink
+                self._remove_generation(replaced)
+
+    def clear(self) -> None:
+        with self._writing() as meta:
+            if meta is None:
+                return
+            cleared = self._new_meta(meta["dim"], generation=meta["generation"] + 1, version=meta["version"])
+            self._allocate(cleared)
+            self._publish(cleared)
+            self._remove_generation(meta["generation"])
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        document_ids: Optional[Sequence[UUID]] = None,
+        exact: bool = False,
+        nprobe: Optional[int] = None
+    ) -> List[VectorHit]:
+        """Top ``k`` rows by inner product with a unit-length ``query``."""
+        files = self._view()
+        if files is None or files.meta["count"] == 0:
+            return []
+        count = files.meta["count"]
+        query = np.asarray(query, dtype=np.float32)
+
+        rows = files.rows[:count]
+        mask = rows["deleted"] == 0
+        if document_ids is not None:
+            # A few documents' rows are scored exactly; probing clusters first would drop most of them
+            mask &= np.isin(rows["document_id"], [document_id.bytes for document_id in document_ids])
+        elif files.centroids is not None and not exact:
+            probed = np.zeros(len(files.centroids), dtype=bool)
+            probed[np.argsort(files.centroids @ query)[-(nprobe or self.nprobe):]] = True
+            mask &= probed[files.lists[:count]]
+
+        candidates = np.flatnonzero(mask)
+        if not candidates.size:
+            return []
+        scores = _score(files, query, None if candidates.size == count else candidates)
+
+        top = np.argpartition(-scores, k - 1)[:k] if scores.size > k else np.arange(scores.size)
+        top = top[np.argsort(-scores[top])]
+        return [
+            VectorHit(_uuid(rows[index]["chunk_id"]), _uuid(rows[index]["document_id"]), float(scores[position]))
+            for position, index in zip(top, candidates[top])
+        ]
+
+    def stats(self) -> dict:
+        meta = self._read_meta()
+        if meta is None:
+            return {"vectors": 0}
+        return {
+            "vectors": meta["count"] - meta["deleted"],
+            "deleted": meta["deleted"],
+            "dimensions": meta["dim"],
+            "quantization": meta["quantization"],
+            "clusters": meta["clusters"],
+        }
+
+    def _new_meta(self, dim: int, generation: int = 0, version: int = 0) -> dict:
+        return {
+            "dim": dim, "quantization": self.quantization, "generation": generation, "version": version,
+            "count": 0, "deleted": 0, "capacity": MIN_CAPACITY, "clusters": 0, "clustered_count": 0,
+        }
+
+    def _append(self, meta: dict, chunk_ids: Sequence[UUID], document_ids: Sequence[UUID], vectors: np.ndarray) -> None:
+        start, end = meta["count"], meta["count"] + len(vectors)
+        if end > meta["capacity"]:
+            meta["capacity"] = max(2 * meta["capacity"], end)
+        self._allocate(meta)
+
+        files = self._map(meta, "r+")
+        _encode_into(files, slice(start, end), vectors)
+        files.rows[start:end] = np.array(
+            [(chunk_id.bytes, document_id.bytes, 0) for chunk_id, document_id in zip(chunk_ids, document_ids)],
+            dtype=ROW_DTYPE
+        )
+        if files.lists is not None:
+            files.lists[start:end] = _nearest(vectors, files.centroids)
+        _flush(files)
+        meta["count"] = end
+
+    def _tombstone(self, meta: dict, document_ids: Sequence[UUID]) -> None:
+        files = self._map(meta, "r+")
+        rows = files.rows[:meta["count"]]
+        hits = np.flatnonzero(
+            np.isin(rows["document_id"], [document_id.bytes for document_id in document_ids]) & (rows["deleted"] == 0)
+        )
+        if hits.size:
+            files.rows["deleted"][hits] = 1
+            _flush(files)
+            meta["deleted"] += int(hits.size)
+
+    def _maintain(self, meta: dict) -> Optional[int]:
+        """Recluster or compact if due; returns the generation this replaced."""
+        live = meta["count"] - meta["deleted"]
+        recluster = live >= self.ivf_min_vectors and (not meta["clusters"] or live >= 2 * meta["clustered_count"])
+        # Clusters are kept until the partition has shrunk well below the threshold, so it doesn't flap
+        drop_clusters = meta["clusters"] and live < self.ivf_min_vectors // 2
+        compact = meta["deleted"] > MIN_CAPACITY and meta["deleted"] > self.compact_fraction * meta["count"]
+        if not (recluster or drop_clusters or compact):
+            return None
+
+        replaced = meta["generation"]
+        meta.update(self._rewrite(meta, recluster, drop_clusters))
+        return replaced
+
+    def _rewrite(self, meta: dict, recluster: bool, drop_clusters: bool) -> dict:
+        old = self._map(meta, "r")
+        keep = np.flatnonzero(old.rows["deleted"][:meta["count"]] == 0)
+        new = self._new_meta(meta["dim"], generation=meta["generation"] + 1, version=meta["version"])
+        # The old rows are copied as stored; a changed quantization setting applies from the next clear
+        new.update(quantization=meta["quantization"], count=len(keep), capacity=max(MIN_CAPACITY, 2 * len(keep)))
+
+        centroids = None
+        if recluster:
+            centroids = train_centroids(_decode(old, keep), max(1, int(math.sqrt(len(keep)))))
+        elif meta["clusters"] and not drop_clusters:
+            centroids = old.centroids
+        if centroids is not None:
+            new.update(clusters=len(centroids), clustered_count=len(keep) if recluster else meta["clustered_count"])
+            np.save(self._file("centroids", new["generation"], ".npy"), centroids)
+
+        self._allocate(new)
+        files = self._map(new, "r+")
+        for start in range(0, len(keep), BLOCK_ROWS):
+            block = keep[start:start + BLOCK_ROWS]
+            target = slice(start, start + len(block))
+            files.vectors[target] = old.vectors[block]
+            if files.scales is not None:
+                files.scales[target] = old.scales[block]
+            files.rows[target] = old.rows[block]
+            if files.lists is not None:
+                files.lists[target] = _nearest(_decode(old, block), centroids) if recluster else old.lists[block]
+        _flush(files)
+
+        logger.info(
+            f"Rewrote vector partition {self.path}: {len(keep)} live of {meta['count']} rows, "
+            f"{new['clusters'] or 'no'} clusters"
+        )
+        return new
+
+    def _publish(self, meta: dict) -> None:
+        meta["version"] += 1
+        staged = self.path / "meta.json.tmp"
+        staged.write_text(json.dumps(meta))
+        os.replace(staged, self.path / "meta.json")
+
+    @contextmanager
+    def _writing(self) -> Iterator[Optional[dict]]:
+        # The thread lock orders writers in this process, the file lock those in others
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path / "lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self._read_meta()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _view(self) -> Optional[_Files]:
+        for _ in range(3):
+            meta = self._read_meta()
+            if meta is None:
+                return None
+            files = self._files
+            if files is not None and (files.meta["generation"], files.meta["capacity"]) == (meta["generation"], meta["capacity"]):
+                # Same files, mapped shared: only the published count may have moved
+                files = files._replace(meta=meta)
+            else:
+                try:
+                    files = self._map(meta, "r")
+                except FileNotFoundError:
+                    continue  # Rewritten between reading meta.json and mapping; read it again
+            self._files = files
+            return files
+        return None
+
+    def _map(self, meta: dict, mode: str) -> _Files:
+        generation, capacity = meta["generation"], meta["capacity"]
+        vector_type = np.int8 if meta["quantization"] == "int8" else np.float32
+        clustered = meta["clusters"] > 0
+        return _Files(
+            meta=meta,
+            vectors=np.memmap(self._file("vectors", generation), dtype=vector_type, mode=mode, shape=(capacity, meta["dim"])),
+            scales=np.memmap(self._file("scales", generation), dtype=np.float32, mode=mode, shape=(capacity,))
+            if meta["quantization"] == "int8" else None,
+            rows=np.memmap(self._file("rows", generation), dtype=ROW_DTYPE, mode=mode, shape=(capacity,)),
+            lists=np.memmap(self._file("lists", generation), dtype=np.int32, mode=mode, shape=(capacity,))
+            if clustered else None,
+            centroids=np.load(self._file("centroids", generation, ".npy")) if clustered else None,
+        )
+
+    def _allocate(self, meta: dict) -> None:
+        """Create or grow the generation's files to hold ``capacity`` rows; existing rows are kept."""
+        generation, capacity = meta["generation"], meta["capacity"]
+        sizes = {
+            "vectors": capacity * meta["dim"] * (1 if meta["quantization"] == "int8" else 4),
+            "rows": capacity * ROW_DTYPE.itemsize,
+        }
+        if meta["quantization"] == "int8":
+            sizes["scales"] = capacity * 4
+        if meta["clusters"]:
+            sizes["lists"] = capacity * 4
+        for name, size in sizes.items():
+            with open(self._file(name, generation), "ab") as handle:
+                if handle.tell() < size:
+                    handle.truncate(size)
+
+    def _remove_generation(self, generation: int) -> None:
+        for path in self.path.glob(f"*-{generation}.*"):
+            path.unlink(missing_ok=True)
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            return json.loads((self.path / "meta.json").read_text())
+        except FileNotFoundError:
+            return None
+
+    def _file(self, name: str, generation: int, suffix: str = ".bin") -> Path:
+        return self.path / f"{name}-{generation}{suffix}"
+
+
+class VectorIndex:
+    """Vector partitions for every tenant and embedding model under one directory.
+
+    A tenant's partition holds only its own documents' chunks, so filtering
+    by user costs nothing and a small practice never scans a large one's
+    vectors. The index is derived from the embeddings stored on the chunk
+    rows and can be rebuilt from them at any time.
+    """
+
+    def __init__(self, root: str = settings.VECTOR_INDEX_ROOT, **partition_options) -> None:
+        self.root = Path(root)
+        self.partition_options = partition_options
+        self._lock = threading.Lock()
+        self._partitions: Dict[Path, VectorPartition] = {}
+
+    def partition(self, model_name: str, user_id: UUID) -> VectorPartition:
+        path = self.root / _model_dir(model_name) / str(user_id)
+        with self._lock:
+            partition = self._partitions.get(path)
+            if partition is None:
+                partition = VectorPartition(path, **self.partition_options)
+                self._partitions[path] = partition
+            return partition
+
+    def user_ids(self, model_name: str) -> List[UUID]:
+        model_root = self.root / _model_dir(model_name)
+        if not model_root.is_dir():
+            return []
+        return [UUID(path.name) for path in model_root.iterdir() if (path / "meta.json").exists()]
+
+    def index_document(self, db: Session, model_name: str, user_id: UUID, document_id: UUID) -> int:
+        """Replace a document's rows with the current embeddings of its chunks."""
+        chunks = db.query(DocumentChunk.id, DocumentChunk.embedding).filter(
+            DocumentChunk.document_id == document_id,
+            DocumentChunk.embedding_model == model_name,
+            DocumentChunk.embedding.isnot(None)
+        ).all()
+        vectors = np.vstack([vector_from_bytes(chunk.embedding) for chunk in chunks]) if chunks else None
+        self.partition(model_name, user_id).replace_document(document_id, [chunk.id for chunk in chunks], vectors)
+        return len(chunks)
+
+    def remove_document(self, user_id: UUID, document_id: UUID) -> None:
+        if not self.root.is_dir():
+            return
+        for model_root in self.root.iterdir():
+            if (model_root / str(user_id) / "meta.json").exists():
+                self.partition(model_root.name, user_id).delete_documents([document_id])
+
+    def search(
+        self,
+        model_name: str,
+        query: np.ndarray,
+        k: int,
+        user_id: Optional[UUID] = None,
+        document_id: Optional[UUID] = None,
+        exact: bool = False
+    ) -> List[VectorHit]:
+        """Nearest chunks within one user's partition, or across every partition when ``user_id`` is None."""
+        user_ids = [user_id] if user_id is not None else self.user_ids(model_name)
+        document_ids = [document_id] if document_id is not None else None
+        hits = [
+            hit
+            for owner in user_ids
+            for hit in self.partition(model_name, owner).search(query, k, document_ids=document_ids, exact=exact)
+        ]
+        return sorted(hits, key=lambda hit: hit.score, reverse=True)[:k]
+
+
+def train_centroids(vectors: np.ndarray, clusters: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over a sample of ``vectors``; unit-length centroids, matched by inner product."""
+    rng = np.random.default_rng(seed)
+    clusters = min(clusters, len(vectors))
+    sample_size = min(len(vectors), clusters * KMEANS_SAMPLE_PER_CLUSTER)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = _nearest(sample, centroids)
+        order = np.argsort(assignment, kind="stable")
+        sorted_assignment = assignment[order]
+        starts = np.flatnonzero(np.r_[True, sorted_assignment[1:] != sorted_assignment[:-1]])
+        sums = sample[rng.choice(sample_size, clusters)]  # Clusters left empty are reseeded at random
+        sums[sorted_assignment[starts]] = np.add.reduceat(sample[order], starts, axis=0)
+        centroids = normalize_rows(sums)
+    return centroids
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(vectors[start:start + BLOCK_ROWS] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), BLOCK_ROWS)
+    ]).astype(np.int32) if len(vectors) else np.empty(0, dtype=np.int32)
+
+def _score(files: _Files, query: np.ndarray, candidates: Optional[np.ndarray]) -> np.ndarray:
+    """Inner products of the query with every live row, or with ``candidates`` only."""
+    total = files.meta["count"] if candidates is None else len(candidates)
+    scores = np.empty(total, dtype=np.float32)
+    for start in range(0, total, BLOCK_ROWS):
+        end = min(start + BLOCK_ROWS, total)
+        rows = slice(start, end) if candidates is None else candidates[start:end]
+        if files.scales is None:
+            scores[start:end] = files.vectors[rows] @ query
+        else:
+            # Scaling the products rather than the rows avoids a second block-sized temporary
+            scores[start:end] = (files.vectors[rows].astype(np.float32) @ query) * files.scales[rows]
+    return scores
+
+def _decode(files: _Files, rows) -> np.ndarray:
+    if files.scales is None:
+        return np.asarray(files.vectors[rows])
+    return files.vectors[rows].astype(np.float32) * files.scales[rows, None]
+
+def _encode_into(files: _Files, rows: slice, vectors: np.ndarray) -> None:
+    if files.scales is None:
+        files.vectors[rows] = vectors
+        return
+    # Symmetric per-row int8: the largest component maps to +/-127
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    files.vectors[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+    files.scales[rows] = scales
+
+def _flush(files: _Files) -> None:
+    for array in (files.vectors, files.scales, files.rows, files.lists):
+        if array is not None:
+            array.flush()
+
+def _uuid(value: bytes) -> UUID:
+    # Fixed-width bytes come back without trailing NULs
+    return UUID(bytes=value.ljust(16, b"\0"))
+
+def _model_dir(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", model_name)
+
+
+vector_index = VectorIndex()
+
+def get_vector_index() -> VectorIndex:
+    return vector_index
@@ -0,0 +1,73 @@
+import io
+import shutil
+import tarfile
+import zipfile
+from pathlib import PurePosixPath
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadEntry(NamedTuple):
+    filename: str
+    file_obj: Optional[BinaryIO]
+    size: Optional[int]
+    error: Optional[str] = None
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+def iter_upload_entries(files: Iterable[UploadFile]) -> Iterator[UploadEntry]:
+    """Flatten uploaded files and archives into one stream of entries."""
+    for file in files:
+        if not is_archive(file.filename):
+            yield UploadEntry(file.filename, file.file, file.size)
+            continue
+
+        try:
+            if file.filename.lower().endswith(".zip"):
+                yield from _iter_zip(file.file)
+            else:
+                yield from _iter_tar(file.file)
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            yield UploadEntry(file.filename, None, None, f"Unreadable archive: {e}")
+
+def _entry_name(path: str) -> Optional[str]:
+    parts = PurePosixPath(path).parts
+    # Skip directory entries and the macOS metadata that rides along in archives
+    if not parts or parts[-1].startswith(".") or "__MACOSX" in parts:
+        return None
+    return parts[-1]
+
+def _iter_zip(file_obj: BinaryIO) -> Iterator[UploadEntry]:
+    # Members are decompressed straight from the uploaded file as they are read
+    with zipfile.ZipFile(file_obj) as archive:
+        for info in archive.infolist():
+            name = _entry_name(info.filename)
+            if info.is_dir() or name is None:
+                continue
+            yield UploadEntry(name, archive.open(info), info.file_size)
+
+def _iter_tar(file_obj: BinaryIO) -> Iterator[UploadEntry]:
+    # Stream mode reads members strictly in order, so each is copied out before
+    # moving on; only the entries currently being uploaded are ever buffered
+    with tarfile.open(fileobj=file_obj, mode="r|*") as archive:
+        for member in archive:
+            name = _entry_name(member.name)
+            if not member.isfile() or name is None:
+                continue
+            if member.size > settings.MAX_FILE_SIZE:
+                yield UploadEntry(name, io.BytesIO(), member.size)
+                continue
+
+            buffer = SpooledTemporaryFile(max_size=settings.DOWNLOAD_SPOOL_MAX_SIZE)
+            shutil.copyfileobj(archive.extractfile(member), buffer, COPY_CHUNK_SIZE)
+            buffer.seek(0)
+            yield UploadEntry(name, buffer, member.size)
@@ -0,0 +1,70 @@
+from typing import Callable, FrozenSet, NamedTuple, Optional
+
+DEFAULT_MIMETYPE = "application/octet-stream"
+
+
+class Signature(NamedTuple):
+    mime_type: str
+    extensions: FrozenSet[str]
+    magic: bytes
+    offset: int = 0
+    window: int = 0  # When set, the magic may start anywhere in the first ``window`` bytes after ``offset``
+    predicate: Optional[Callable[[bytes], bool]] = None
+
+    @property
+    def span(self) -> int:
+        return self.offset + self.window + len(self.magic)
+
+    def matches(self, header: bytes) -> bool:
+        if self.window:
+            found = header.find(self.magic, self.offset, self.span) != -1
+        else:
+            found = header[self.offset:self.offset + len(self.magic)] == self.magic
+        return found and (self.predicate is None or self.predicate(header))
+
+
+def _ftyp_brand(*brands: bytes) -> Callable[[bytes], bool]:
+    # ISO base media files: box size, "ftyp", then the major brand
+    return lambda header: header[8:12] in brands
+
+
+# Multi-page TIFFs share the single-page header; pages live in chained IFDs further in
+SIGNATURES = (
+    # Readers accept leading junk before the PDF header, so look through the first KB
+    Signature("application/pdf", frozenset({"pdf"}), b"%PDF-", window=1024),
+    Signature("image/png", frozenset({"png"}), b"\x89PNG\r\n\x1a\n"),
+    Signature("image/jpeg", frozenset({"jpg", "jpeg"}), b"\xff\xd8\xff"),
+    Signature("image/tiff", frozenset({"tif", "tiff"}), b"II*\x00"),
+    Signature("image/tiff", frozenset({"tif", "tiff"}), b"MM\x00*"),
+    Signature("image/tiff", frozenset({"tif", "tiff"}), b"II+\x00"),  # BigTIFF
+    Signature("image/tiff", frozenset({"tif", "tiff"}), b"MM\x00+"),
+    Signature("image/heic", frozenset({"heic", "heif"}), b"ftyp", offset=4, predicate=_ftyp_brand(b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis")),
+    Signature("image/heif", frozenset({"heic", "heif"}), b"ftyp", offset=4, predicate=_ftyp_brand(b"mif1", b"msf1")),
+    # DICOM Part 10: 128-byte preamble, then the "DICM" prefix
+    Signature("application/dicom", frozenset({"dcm", "dicom"}), b"DICM", offset=128),
+)
+
+HEADER_BYTES = max(signature.span for signature in SIGNATURES)
+
+KNOWN_EXTENSIONS = frozenset(ext for signature in SIGNATURES for ext in signature.extensions)
+
+
+def detect_signature(header: bytes) -> Optional[Signature]:
+    """Match the first ``HEADER_BYTES`` of a file against the signature table."""
+    header = header[:HEADER_BYTES]
+    for signature in SIGNATURES:
+        if signature.matches(header):
+            return signature
+    return None
+
+def detect_mimetype(header: bytes) -> str:
+    signature = detect_signature(header)
+    return signature.mime_type if signature else DEFAULT_MIMETYPE
+
+def content_matches_extension(header: bytes, extension: str) -> bool:
+    """Whether the content fits a declared extension; extensions without a signature always pass."""
+    extension = extension.lower().lstrip(".")
+    if extension not in KNOWN_EXTENSIONS:
+        return True
+    signature = detect_signature(header)
+    return signature is not None and extension in signature.extensions
@@ -1,36 +1,83 @@
-import imghdr
-from typing import Iterable
+import hashlib
+from typing import BinaryIO, Iterable, Optional
 from fastapi import HTTPException, UploadFile, status
 from app.core.config import settings
+from app.utils.file_signatures import HEADER_BYTES, content_matches_extension, detect_mimetype
 
+SNIFF_BYTES = HEADER_BYTES
 
-def _detect_mimetype(content: bytes) -> str:
-    image_type = imghdr.what(None, h=content)
-    if image_type:
-        return f"image/{image_type}"
-    return "application/octet-stream"
+def _size_exceeded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds max size of {settings.MAX_FILE_SIZE // (1024 * 1024)} MB"
+    )
 
-async def validate_upload(file: UploadFile) -> None:
+
+class UploadStream:
+    """Read-once view of an upload that hashes, counts and size-checks bytes as they pass.
+
+    The first ``SNIFF_BYTES`` are read up front for type detection and replayed
+    to the consumer, so storage sees the file from the start in a single pass.
+    It deliberately has no ``seek``/``tell`` so storage clients stream it
+    instead of rewinding.
+    """
+
+    def __init__(self, file_obj: BinaryIO, max_size: int = settings.MAX_FILE_SIZE) -> None:
+        self._file = file_obj
+        self.max_size = max_size
+        self.bytes_read = 0
+        self._hasher = hashlib.sha256()
+        self.header = file_obj.read(SNIFF_BYTES)
+        self._pending = self.header
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            chunk = self._pending + self._file.read()
+            self._pending = b""
+        elif self._pending:
+            chunk, self._pending = self._pending[:size], self._pending[size:]
+            if len(chunk) < size:
+                chunk += self._file.read(size - len(chunk))
+        else:
+            chunk = self._file.read(size)
+
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_size:
+            raise _size_exceeded()
+        self._hasher.update(chunk)
+        return chunk
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    @property
+    def detected_mimetype(self) -> str:
+        return detect_mimetype(self.header)
+
+
+def open_upload_stream(file_obj: BinaryIO, filename: str, size: Optional[int] = None) -> UploadStream:
     allowed_ext: Iterable[str] = {ext.lower() for ext in settings.ALLOWED_EXTENSIONS}
 
-    file_ext = file.filename.split(".")[-1].lower()
+    file_ext = filename.split(".")[-1].lower()
     if file_ext not in allowed_ext:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type .{file_ext} not allowed"
         )
 
-    content = await file.read()
-    await file.seek(0)
+    # The declared size is known before any content; reject before reading anything
+    if size is not None and size > settings.MAX_FILE_SIZE:
+        raise _size_exceeded()
 
-    if len(content) > settings.MAX_FILE_SIZE:
+    stream = UploadStream(file_obj)
+    if not content_matches_extension(stream.header, file_ext):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File exceeds max size of {settings.MAX_FILE_SIZE // (1024 * 1024)} MB"
+            detail=f"File content does not match the .{file_ext} extension"
         )
-    detected = _detect_mimetype(content)
-    if detected.startswith("image/") and file_ext not in {"png", "jpg", "jpeg", "tiff"}:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Image content does not match the declare content"
-        )
\ No newline at end of file
+
+    return stream
+
+def validate_upload(file: UploadFile) -> UploadStream:
+    return open_upload_stream(file.file, file.filename, file.size)
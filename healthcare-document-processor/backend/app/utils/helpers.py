@@ -0,0 +1,22 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """Add the wall-clock seconds spent in the block to ``timings[stage]``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list; 0.0 when empty."""
+    if not sorted_values:
+        return 0.0
+    # The smallest value with at least ``fraction`` of the list at or below it; the epsilon absorbs float error like 0.07 * 100
+    rank = math.ceil(fraction * len(sorted_values) - 1e-9)
+    return sorted_values[min(len(sorted_values) - 1, max(rank - 1, 0))]
@@ -0,0 +1,191 @@
+"""Maintain and measure the local vector index.
+
+    python -m app.vectors stats
+    python -m app.vectors rebuild [--user-id <id>]
+    python -m app.vectors bench --vectors 200000 --queries 200 --k 10
+    python -m app.vectors bench --user-id <id>
+
+``rebuild`` refills partitions from the embeddings stored on the chunk rows;
+searches against a partition see it partly filled until it finishes.
+``bench`` builds a throwaway partition, from synthetic clustered vectors or
+from one user's stored embeddings, and reports recall@k and latency of the
+approximate search at each probe count against exact search.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import Document, DocumentChunk
+from app.services.embedding_service import normalize_rows, vector_from_bytes
+from app.services.registry import services
+from app.services.vector_index import VectorPartition, vector_index
+from app.utils.helpers import percentile
+
+ADD_BATCH = 5000
+NPROBES = (1, 2, 4, 8, 16, 32, 64)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.vectors", description="Local vector index maintenance")
+    parser.add_argument("--model", help="Embedding model whose partitions to use; defaults to the configured backend's")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="Show every partition's size")
+
+    rebuild = commands.add_parser("rebuild", help="Refill partitions from stored chunk embeddings")
+    rebuild.add_argument("--user-id", type=UUID)
+
+    bench = commands.add_parser("bench", help="Measure recall@k against latency")
+    bench.add_argument("--user-id", type=UUID, help="Use this user's stored embeddings instead of synthetic vectors")
+    bench.add_argument("--vectors", type=int, default=100000)
+    bench.add_argument("--dim", type=int, default=384)
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--quantization", choices=("float32", "int8"), default=settings.VECTOR_INDEX_QUANTIZATION)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    model_name = args.model
+    if model_name is None and (args.command != "bench" or args.user_id is not None):
+        backend = services.embeddings
+        if backend is None:
+            print("No embedding backend is configured; pass --model", file=sys.stderr)
+            return 1
+        model_name = backend.model_name
+
+    if args.command == "stats":
+        for user_id in vector_index.user_ids(model_name):
+            print(f"{user_id}: {vector_index.partition(model_name, user_id).stats()}")
+        return 0
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            return rebuild(db, model_name, args.user_id)
+        if args.user_id is not None:
+            vectors = _stored_vectors(db, model_name, args.user_id)
+            if not len(vectors):
+                print(f"User {args.user_id} has no {model_name} embeddings", file=sys.stderr)
+                return 1
+            rng = np.random.default_rng(0)
+            queries = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+        else:
+            vectors, queries = synthetic_vectors(args.vectors, args.queries, args.dim)
+        bench(vectors, queries, args.k, args.quantization)
+        return 0
+    finally:
+        db.close()
+
+
+def rebuild(db, model_name: str, user_id: Optional[UUID] = None) -> int:
+    if user_id is not None:
+        owners = [user_id]
+    else:
+        stored = db.query(Document.user_id).join(DocumentChunk, DocumentChunk.document_id == Document.id).filter(
+            DocumentChunk.embedding_model == model_name
+        ).distinct()
+        # Partitions of users who no longer have any embeddings are emptied too
+        owners = sorted({owner for owner, in stored} | set(vector_index.user_ids(model_name)), key=str)
+
+    for owner in owners:
+        partition = vector_index.partition(model_name, owner)
+        partition.clear()
+        query = db.query(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.embedding).join(
+            Document, Document.id == DocumentChunk.document_id
+        ).filter(
+            Document.user_id == owner,
+            DocumentChunk.embedding_model == model_name,
+            DocumentChunk.embedding.isnot(None)
+        ).order_by(DocumentChunk.document_id).yield_per(ADD_BATCH)
+
+        batch: List = []
+        for row in query:
+            batch.append(row)
+            if len(batch) == ADD_BATCH:
+                _add(partition, batch)
+                batch = []
+        _add(partition, batch)
+        print(f"{owner}: {partition.stats()}", flush=True)
+    return 0
+
+
+def bench(vectors: np.ndarray, queries: np.ndarray, k: int, quantization: str) -> None:
+    with tempfile.TemporaryDirectory() as root:
+        # Built exact first, then clustered in place so both modes search the same rows
+        partition = VectorPartition(Path(root), quantization=quantization, ivf_min_vectors=len(vectors) + 1)
+        ids = [uuid4() for _ in range(len(vectors))]
+        started = time.perf_counter()
+        for start in range(0, len(vectors), ADD_BATCH):
+            block = slice(start, start + ADD_BATCH)
+            partition.add(ids[block], ids[block], vectors[block])
+        print(f"{len(vectors)} x {vectors.shape[1]} {quantization} vectors added in {time.perf_counter() - started:.1f}s")
+
+        # Ground truth from the original float32 vectors, so int8 storage's loss shows in the exact row too
+        truth = [{ids[i] for i in np.argsort(-(vectors @ query))[:k]} for query in queries]
+        _measure(partition, queries, truth, k, exact=True)
+
+        partition.ivf_min_vectors = 1
+        started = time.perf_counter()
+        partition.update()
+        print(f"Clustered into {partition.stats()['clusters']} lists in {time.perf_counter() - started:.1f}s")
+
+        for nprobe in NPROBES:
+            _measure(partition, queries, truth, k, nprobe=nprobe)
+
+
+def synthetic_vectors(count: int, queries: int, dim: int, seed: int = 0):
+    """Unit vectors scattered around random topics, roughly how chunk embeddings group."""
+    rng = np.random.default_rng(seed)
+    topics = normalize_rows(rng.standard_normal((max(count // 100, 1), dim)))
+
+    def draw(size: int) -> np.ndarray:
+        return normalize_rows(topics[rng.integers(len(topics), size=size)] + 1.5 * normalize_rows(rng.standard_normal((size, dim))))
+
+    return draw(count), draw(queries)
+
+
+def _add(partition: VectorPartition, rows: List) -> None:
+    if rows:
+        partition.add(
+            [row.id for row in rows],
+            [row.document_id for row in rows],
+            np.vstack([vector_from_bytes(row.embedding) for row in rows])
+        )
+
+def _stored_vectors(db, model_name: str, user_id: UUID) -> np.ndarray:
+    rows = db.query(DocumentChunk.embedding).join(Document, Document.id == DocumentChunk.document_id).filter(
+        Document.user_id == user_id,
+        DocumentChunk.embedding_model == model_name,
+        DocumentChunk.embedding.isnot(None)
+    ).all()
+    return np.vstack([vector_from_bytes(row.embedding) for row in rows]) if rows else np.empty((0, 0), dtype=np.float32)
+
+def _measure(partition: VectorPartition, queries: np.ndarray, truth: List[set], k: int, exact: bool = False, nprobe: Optional[int] = None) -> None:
+    found, latencies = 0, []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        hits = partition.search(query, k, exact=exact, nprobe=nprobe)
+        latencies.append(time.perf_counter() - started)
+        found += len(expected & {hit.chunk_id for hit in hits})
+
+    latencies.sort()
+    recall = found / max(sum(len(expected) for expected in truth), 1)
+    print(
+        f"{'exact' if exact else 'ivf':5} nprobe={nprobe or '-':>3}  recall@{k}={recall:.3f}  "
+        f"p50={percentile(latencies, 0.5) * 1000:.2f}ms  p95={percentile(latencies, 0.95) * 1000:.2f}ms",
+        flush=True
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import socket
+import threading
+
+from celery import Celery
+from celery.signals import worker_ready
+
+from app.core.config import settings
+from app.services.admission import create_worker_memory_reports
+from app.services.job_queue import run_next_job, run_stale_job_sweeper
+
+# Start with: celery -A app.worker worker -Q processing --concurrency <n>
+celery_app = Celery("healthcare_document_processor", broker=settings.CELERY_BROKER_URL)
+celery_app.conf.update(
+    task_acks_late=True,  # Acknowledge only once the job has finished
+    task_reject_on_worker_lost=True,  # Redeliver if the worker dies mid-job
+    worker_prefetch_multiplier=1,  # OCR jobs are long; don't let one worker hoard them
+    task_default_queue=settings.PROCESSING_QUEUE_NAME,
+    task_ignore_result=True,  # Status lives in processing_jobs
+)
+
+
+@celery_app.task(name="processing.run_next_job")
+def process_next_job_task() -> None:
+    # Each message is a wake-up; the scheduler decides which job it runs
+    run_next_job()
+
+
+@worker_ready.connect
+def start_memory_reports(**kwargs) -> None:
+    # API processes admit jobs against these figures rather than their own memory
+    reports = create_worker_memory_reports()
+    if reports is not None:
+        threading.Thread(target=reports.run, args=(socket.gethostname(),), name="worker-memory-report", daemon=True).start()
+
+
+@worker_ready.connect
+def start_stale_job_sweeper(**kwargs) -> None:
+    # Jobs of a worker that died are requeued even if no new work arrives to wake anyone
+    threading.Thread(target=run_stale_job_sweeper, name="stale-job-sweeper", daemon=True).start()
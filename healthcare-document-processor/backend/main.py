@@ -1,14 +1,34 @@
-from multiprocessing import process
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import test_db_connection
-from app.api import auth, users, documents, processing
+from app.core.database import SessionLocal, test_db_connection, test_replica_connection
+from app.core.revocation import revocation_store
+from app.core.security import shutdown_password_executor
+from app.services.job_queue import job_queue
+from app.services.progress_events import progress_broker
+from app.services.registry import services
+from app.api import analysis, auth, users, documents, processing, search
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services.start()
+    job_queue.start()
+    revocation_refresher = asyncio.create_task(revocation_store.run_refresher(SessionLocal))
+    progress_listener = asyncio.create_task(progress_broker.run_listener())
+    yield
+    revocation_refresher.cancel()
+    progress_listener.cancel()
+    job_queue.stop()
+    shutdown_password_executor()
+    services.close()
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    description="Healthcare Document Processor API"
+    description="Healthcare Document Processor API",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -23,6 +43,8 @@ app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(documents.router)
 app.include_router(processing.router)
+app.include_router(search.router)
+app.include_router(analysis.router)
 
 @app.get("/")
 async def root():
@@ -31,8 +53,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     db_status = test_db_connection()
+    replica_status = test_replica_connection()
     return {
         "status": "healthy" if db_status else "unhealthy",
         "database": "connected" if db_status else "disconnected",
+        "replica": "not configured" if replica_status is None else ("connected" if replica_status else "disconnected"),
         "version": settings.APP_VERSION
     }
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""Shared fixtures.
+
+Settings and engines are created when ``app`` is first imported, so the
+environment is pointed at a throwaway SQLite file and local storage before
+anything from the application loads.
+"""
+import os
+import tempfile
+
+_ROOT = tempfile.mkdtemp(prefix="hdp-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_ROOT}/primary.db",
+    "STORAGE_BACKEND": "local",
+    "LOCAL_STORAGE_ROOT": f"{_ROOT}/storage",
+    "VECTOR_INDEX_ROOT": f"{_ROOT}/vector_index",
+    "EMBEDDING_BACKEND": "none",
+    "JOB_QUEUE_BACKEND": "local",
+    "PROGRESS_EVENTS_BACKEND": "memory",
+    "LOGIN_RATE_LIMIT_BACKEND": "memory",
+    # Every test logs in from the same client address
+    "LOGIN_IP_BURST": "100000",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import Base, engine
+from app.models import User, UserRole
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    Base.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture(autouse=True)
+def clean_database(database):
+    yield
+    with database.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+@pytest.fixture(scope="session")
+def client():
+    # One app lifespan per session: shutting it down also stops the password hashing pool
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def login(client):
+    """Register a user and return the Authorization header for them."""
+
+    def login_as(email: str, role: UserRole = UserRole.DOCTOR) -> dict:
+        password = "password123"
+        registered = client.post("/auth/register", json={
+            "email": email,
+            "password": password,
+            "confirm_password": password,
+            "full_name": email.split("@")[0],
+            "role": UserRole.DOCTOR.value if role == UserRole.ADMIN else role.value
+        })
+        assert registered.status_code in (200, 201), registered.text
+        if role == UserRole.ADMIN:
+            with engine.begin() as connection:
+                connection.execute(User.__table__.update().where(User.email == email).values(role=UserRole.ADMIN))
+
+        response = client.post("/auth/login", json={"email": email, "password": password})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['tokens']['access_token']}"}
+
+    return login_as
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Stand in for the tesseract binary; set ``.words`` to change what every page reads as."""
+    import pytesseract
+
+    class FakeOcr:
+        words = ["patient", "glucose", "normal", "range"] * 50
+        confidence = "90"
+
+        def image_to_data(self, image, *args, **kwargs):
+            return {"text": list(self.words), "conf": [self.confidence] * len(self.words)}
+
+    fake = FakeOcr()
+    monkeypatch.setattr(pytesseract, "image_to_data", fake.image_to_data)
+    return fake
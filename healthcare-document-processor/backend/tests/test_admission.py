@@ -0,0 +1,100 @@
+import fnmatch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.models import JobPriority
+from app.services import admission
+from app.services.admission import MB, AdmissionController, WorkerMemoryReports
+
+
+class KeyValueStore:
+    """The handful of Redis commands the worker memory reports use."""
+
+    def __init__(self) -> None:
+        self.values = {}
+
+    def set(self, key, value, ex=None):
+        self.values[key] = str(value).encode()
+
+    def scan_iter(self, match):
+        return [key for key in self.values if fnmatch.fnmatch(key, match)]
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+
+@pytest.fixture
+def local_memory(monkeypatch):
+    """Set what this process reads as its own available memory, in MB."""
+    memory = {"mb": 64 * 1024}
+    monkeypatch.setattr(admission, "read_available_memory", lambda: memory["mb"] * MB)
+    return memory
+
+
+def controller(worker_memory=None) -> AdmissionController:
+    return AdmissionController(min_available_memory=512 * MB, snapshot_ttl=0, worker_memory=worker_memory)
+
+
+def admit(gate: AdmissionController, priority: JobPriority = JobPriority.STAT) -> int:
+    with Session(engine) as db:
+        try:
+            gate.admit_job(db, priority, pages=1)
+        except HTTPException as e:
+            return e.status_code
+    return 202
+
+
+def test_local_queue_sheds_jobs_when_this_host_is_short_of_memory(local_memory):
+    gate = controller()
+    assert admit(gate) == 202
+
+    local_memory["mb"] = 100
+    assert admit(gate) == 503
+
+
+def test_celery_jobs_are_admitted_against_worker_reports_not_api_memory(local_memory):
+    reports = WorkerMemoryReports(KeyValueStore())
+    gate = controller(worker_memory=reports)
+
+    # Plenty here, but the only worker is nearly out
+    reports.publish("worker-a", 100 * MB)
+    assert admit(gate) == 503
+
+    # A second worker with headroom can take the job
+    reports.publish("worker-b", 4096 * MB)
+    assert admit(gate) == 202
+    # Backfill needs twice the floor, which worker-b still has
+    assert admit(gate, JobPriority.BACKFILL) == 202
+
+    reports.publish("worker-b", 800 * MB)
+    assert admit(gate, JobPriority.STAT) == 202
+    assert admit(gate, JobPriority.BACKFILL) == 503
+
+
+def test_uploads_still_check_the_api_process_memory(local_memory):
+    reports = WorkerMemoryReports(KeyValueStore())
+    reports.publish("worker-a", 100 * MB)
+    gate = controller(worker_memory=reports)
+
+    with gate.upload_slot():
+        pass
+
+    local_memory["mb"] = 100
+    with pytest.raises(HTTPException) as error:
+        with gate.upload_slot():
+            pass
+    assert error.value.status_code == 503
+
+
+def test_jobs_are_admitted_when_no_worker_reports_memory(local_memory):
+    local_memory["mb"] = 100
+    gate = controller(worker_memory=WorkerMemoryReports(KeyValueStore()))
+
+    assert admit(gate) == 202
+    with Session(engine) as db:
+        load = gate.stats(db)["load"]
+    assert load["job_memory_source"] == "workers"
+    assert load["job_available_memory_mb"] is None
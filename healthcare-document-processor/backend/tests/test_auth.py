@@ -0,0 +1,30 @@
+from app.core.principal_cache import principal_cache
+
+
+def test_cached_principals_leave_the_password_hash_out(client, login):
+    headers = login("cached@example.com")
+    for _ in range(2):
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == 200, response.text
+    assert response.json()["email"] == "cached@example.com"
+
+    snapshot = principal_cache._cache[response.json()["id"]]
+    assert "password_hash" not in snapshot
+    assert "phone" not in snapshot
+
+
+def test_password_change_checks_the_hash_behind_a_cached_principal(client, login):
+    headers = login("rotate@example.com")
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    changed = client.post("/auth/change-password", headers=headers, json={
+        "current_password": "password123", "new_password": "password456", "confirm_password": "password456"
+    })
+    assert changed.status_code == 200, changed.text
+
+    new_headers = {"Authorization": f"Bearer {changed.json()['tokens']['access_token']}"}
+    wrong = client.post("/auth/change-password", headers=new_headers, json={
+        "current_password": "password123", "new_password": "password789", "confirm_password": "password789"
+    })
+    assert wrong.status_code == 400
+    assert client.post("/auth/login", json={"email": "rotate@example.com", "password": "password456"}).status_code == 200
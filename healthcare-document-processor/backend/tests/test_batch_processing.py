@@ -0,0 +1,84 @@
+from collections import Counter
+
+from sqlalchemy.orm import Session
+
+from app import reprocess
+from app.core.database import engine
+from app.models import BatchStatus, JobPriority, JobStatus, ProcessingJob
+from app.schemas.document import ProcessingBatchFilter
+from app.services.batch_processing_service import BatchProcessingService
+from tests.test_jobs import OpenAdmission, RecordingQueue, make_document, make_user
+
+
+def batch_service(db: Session) -> BatchProcessingService:
+    return BatchProcessingService(db, job_queue=RecordingQueue(), admission=OpenAdmission())
+
+
+def start_batch(db: Session, documents: int, concurrency: int):
+    user = make_user(db, "batch@example.com")
+    document_ids = sorted(make_document(db, user).id for _ in range(documents))
+    batch = batch_service(db).create_batch(ProcessingBatchFilter(user_id=user.id), JobPriority.BACKFILL, concurrency)
+    return batch.id, document_ids
+
+
+def active_jobs(db: Session, batch_id) -> list:
+    return db.query(ProcessingJob).filter(
+        ProcessingJob.batch_id == batch_id,
+        ProcessingJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+    ).all()
+
+
+def finish(db: Session, jobs: list) -> None:
+    for job in jobs:
+        job.status = JobStatus.SUCCEEDED
+    db.commit()
+
+
+def jobs_per_document(db: Session, batch_id) -> Counter:
+    return Counter(document_id for (document_id,) in db.query(ProcessingJob.document_id).filter(ProcessingJob.batch_id == batch_id))
+
+
+def test_the_batch_window_never_exceeds_its_concurrency():
+    with Session(engine) as db:
+        batch_id, document_ids = start_batch(db, documents=10, concurrency=3)
+        service = batch_service(db)
+
+        while True:
+            active = active_jobs(db, batch_id)
+            assert len(active) <= 3
+            if not active:
+                break
+            # One job finishes and its worker tops the window up
+            finish(db, active[:1])
+            service.advance(batch_id)
+
+        assert service.get_batch(batch_id).status == BatchStatus.COMPLETED
+        assert jobs_per_document(db, batch_id) == Counter(document_ids)
+
+
+def test_an_interrupted_batch_resumes_after_its_checkpoint():
+    with Session(engine) as db:
+        batch_id, document_ids = start_batch(db, documents=7, concurrency=3)
+        handed_out = sorted(job.document_id for job in active_jobs(db, batch_id))
+        assert handed_out == document_ids[:3]
+        assert batch_service(db).get_batch(batch_id).cursor_document_id == document_ids[2]
+
+        # The process died after its jobs finished but before it refilled the window
+        finish(db, active_jobs(db, batch_id))
+
+    with Session(engine) as db:
+        service = batch_service(db)
+        service.resume(batch_id)
+        assert sorted(job.document_id for job in active_jobs(db, batch_id)) == document_ids[3:6]
+
+        while active_jobs(db, batch_id):
+            finish(db, active_jobs(db, batch_id))
+            service.advance(batch_id)
+
+        assert service.get_batch(batch_id).status == BatchStatus.COMPLETED
+        assert jobs_per_document(db, batch_id) == Counter(document_ids)
+
+
+def test_the_cli_rejects_a_concurrency_below_one(capsys):
+    assert reprocess.main(["start", "--concurrency", "0"]) == 2
+    assert "--concurrency must be between 1 and" in capsys.readouterr().err
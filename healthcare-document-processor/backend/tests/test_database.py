@@ -0,0 +1,108 @@
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core import dependencies
+from app.core.database import DatabaseRouter
+from app.schemas.auth import TokenPrincipal
+
+
+def database_file(path: Path) -> sessionmaker:
+    """A SQLite file that answers ``SELECT name FROM marker`` with its own name."""
+    engine = create_engine(f"sqlite:///{path}")
+    if path.parent.exists():
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE marker (name TEXT)"))
+            connection.execute(text("INSERT INTO marker VALUES (:name)"), {"name": path.stem})
+    return sessionmaker(bind=engine)
+
+
+def served_by(session) -> str:
+    try:
+        return session.execute(text("SELECT name FROM marker")).scalar()
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def primary(tmp_path):
+    return database_file(tmp_path / "primary.db")
+
+
+@pytest.fixture
+def replica(tmp_path):
+    return database_file(tmp_path / "replica.db")
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(primary, replica):
+    router = DatabaseRouter(primary, replica)
+
+    assert served_by(router.read_session()) == "replica"
+    assert served_by(router.write_session()) == "primary"
+
+
+def test_a_user_reads_their_own_writes_from_the_primary(primary, replica):
+    router = DatabaseRouter(primary, replica, sticky_seconds=60)
+
+    session = router.write_session("writer")
+    session.execute(text("INSERT INTO marker VALUES ('written')"))
+    session.commit()
+    session.close()
+
+    assert served_by(router.read_session("writer")) == "primary"
+    assert served_by(router.read_session("someone-else")) == "replica"
+    assert served_by(router.read_session()) == "replica"
+
+
+def test_stickiness_ends_after_the_window(primary, replica, monkeypatch):
+    router = DatabaseRouter(primary, replica, sticky_seconds=5)
+    router.mark_write("writer")
+    assert router.is_sticky("writer")
+
+    clock = time.monotonic() + 6
+    monkeypatch.setattr("app.core.database.time.monotonic", lambda: clock)
+    assert served_by(router.read_session("writer")) == "replica"
+
+
+def test_an_unreachable_replica_falls_back_to_the_primary(primary, tmp_path):
+    # The directory doesn't exist, so SQLite can't open the replica file
+    missing = database_file(tmp_path / "missing" / "replica.db")
+    router = DatabaseRouter(primary, missing)
+
+    assert not router.replica_available()
+    assert served_by(router.read_session()) == "primary"
+
+
+def test_an_unhealthy_replica_is_checked_again_after_the_interval(primary, replica, monkeypatch):
+    router = DatabaseRouter(primary, replica, health_check_interval=10)
+    router.mark_replica_unhealthy()
+    assert served_by(router.read_session()) == "primary"
+
+    clock = time.monotonic() + 11
+    monkeypatch.setattr("app.core.database.time.monotonic", lambda: clock)
+    assert served_by(router.read_session()) == "replica"
+
+
+def test_no_replica_configured_reads_from_the_primary(primary):
+    router = DatabaseRouter(primary)
+
+    assert served_by(router.read_session()) == "primary"
+
+
+def test_a_failing_replica_query_marks_the_replica_unhealthy(primary, replica, monkeypatch):
+    router = DatabaseRouter(primary, replica)
+    monkeypatch.setattr(dependencies, "db_router", router)
+    principal = TokenPrincipal(id="00000000-0000-0000-0000-000000000001", email="a@example.com", role="doctor")
+
+    dependency = dependencies.get_read_db(principal)
+    session = next(dependency)
+    assert served_by(session) == "replica"
+    with pytest.raises(OperationalError):
+        dependency.throw(OperationalError("SELECT 1", {}, Exception("replica went away")))
+
+    assert not router.replica_available()
+    assert served_by(router.read_session()) == "primary"
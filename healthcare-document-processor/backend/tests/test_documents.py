@@ -0,0 +1,85 @@
+import io
+
+from PIL import Image
+
+from app.services.job_queue import job_queue
+
+
+def png(size: int = 300) -> bytes:
+    """A blank PNG; the size varies the bytes, and with them the checksum."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), "white").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload(client, headers, content: bytes, filename: str = "scan.png") -> dict:
+    response = client.post(
+        "/documents/upload?document_type=lab_result",
+        files={"file": (filename, content, "image/png")},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def process(client, headers, document_id: str) -> None:
+    response = client.post(f"/processing/{document_id}/process", headers=headers)
+    assert response.status_code == 202, response.text
+    job_queue.join()
+
+
+def test_image_ocr_confidence_is_stored_and_filterable(client, login, fake_ocr):
+    headers = login("confidence@example.com")
+    fake_ocr.confidence = "75"
+    document = upload(client, headers, png())
+    process(client, headers, document["id"])
+
+    listed = client.get("/documents/?min_ocr_confidence=10", headers=headers).json()
+    assert [item["id"] for item in listed] == [document["id"]]
+    text = client.get(f"/processing/{document['id']}/text", headers=headers).json()
+    assert text["metadata"]["ocr_confidence"] == 75
+
+
+def test_processed_results_are_only_reused_within_one_user(client, login, fake_ocr):
+    owner = login("owner@example.com")
+    other = login("other@example.com")
+    scan = png()
+    first = upload(client, owner, scan)
+    process(client, owner, first["id"])
+
+    # Same bytes from someone else: stored once, but OCR'd again for them
+    fake_ocr.words = ["other", "tenant"] * 50
+    theirs = upload(client, other, scan)
+    assert theirs["status"] == "uploaded"
+    assert not theirs["file_path"].startswith("blobs/")
+    assert theirs["file_path"] != first["file_path"]
+    process(client, other, theirs["id"])
+    assert "glucose" not in client.get(f"/processing/{theirs['id']}/text", headers=other).json()["text"]
+
+    # Same bytes from the same user reuse that user's results
+    again = upload(client, owner, scan)
+    assert again["status"] == "processed"
+    text = client.get(f"/processing/{again['id']}/text", headers=owner).json()
+    assert "glucose" in text["text"]
+    assert "deduplicated_from" not in text["metadata"]
+
+
+def test_documents_are_filtered_by_every_requested_tag(client, login):
+    headers = login("tags@example.com")
+    tagged = {}
+    for size, tags in ((100, ["cardiology", "urgent"]), (110, ["cardiology"]), (120, [])):
+        document = upload(client, headers, png(size))
+        response = client.patch(f"/documents/{document['id']}", json={"tags": tags}, headers=headers)
+        assert response.status_code == 200, response.text
+        tagged[tuple(tags)] = document["id"]
+
+    def listed(query: str) -> set:
+        response = client.get(f"/documents/?{query}", headers=headers)
+        assert response.status_code == 200, response.text
+        return {item["id"] for item in response.json()}
+
+    assert listed("tags=cardiology") == {tagged[("cardiology", "urgent")], tagged[("cardiology",)]}
+    assert listed("tags=cardiology&tags=%20urgent%20") == {tagged[("cardiology", "urgent")]}
+    assert listed("tags=missing") == set()
+    # Only blank tags: no tag filter rather than no results
+    assert listed("tags=%20") == set(tagged.values())
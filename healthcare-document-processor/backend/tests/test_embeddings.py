@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import numpy as np
+import onnxruntime
+import pytest
+from sqlalchemy.orm import Session
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+
+from app.core.database import engine
+from app.models import DocumentChunk, EmbeddingCacheEntry
+from app.services.embedding_service import (
+    ChunkEmbeddingService, EmbeddingBackend, EmbeddingCache, Embeddings, OnnxEmbeddingBackend, content_key, vector_to_bytes
+)
+from tests.test_jobs import make_document, make_user
+
+WORDS = [f"w{i}" for i in range(40)]
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "[CLS]": 2, "[SEP]": 3, **{word: i + 4 for i, word in enumerate(WORDS)}}
+
+
+class OneHotModel:
+    """An InferenceSession whose token embeddings are one-hot in the token id, so a pooled vector shows which words it saw."""
+
+    def __init__(self, path, sess_options=None, providers=None) -> None:
+        self.calls = []
+
+    def get_inputs(self):
+        return [type("Input", (), {"name": name})() for name in ("input_ids", "attention_mask")]
+
+    def run(self, outputs, feeds):
+        self.calls.append(feeds["input_ids"].shape)
+        return [np.eye(len(VOCAB), dtype=np.float32)[feeds["input_ids"]]]
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    tokenizer = Tokenizer(models.WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.BertProcessing(("[SEP]", 3), ("[CLS]", 2))
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    (tmp_path / "model.onnx").touch()
+    monkeypatch.setattr(onnxruntime, "InferenceSession", OneHotModel)
+    return OnnxEmbeddingBackend(model_dir=str(tmp_path), model_name="one-hot", max_tokens=16, batch_size=4, max_batch_tokens=64)
+
+
+def test_text_past_the_model_window_still_shapes_the_vector(backend):
+    long_text = " ".join(WORDS)  # 40 words against a 16 token window
+    result = backend.embed([long_text, "w0 w1"])
+
+    assert result.vectors.shape == (2, len(VOCAB))
+    assert np.allclose(np.linalg.norm(result.vectors, axis=1), 1.0)
+    # Every word of the long text contributes, not just the first window's
+    assert (result.vectors[0][[VOCAB[word] for word in WORDS]] > 0).all()
+    # Short texts are a single window, as before
+    assert np.flatnonzero(result.vectors[1]).tolist() == [VOCAB["[CLS]"], VOCAB["[SEP]"], VOCAB["w0"], VOCAB["w1"]]
+    # Overlapping windows cost more tokens than the text alone
+    assert result.tokens > 40 + 4 + 4
+
+
+def test_windows_are_batched_within_the_token_budget(backend):
+    backend.embed([" ".join(WORDS)] * 3)
+
+    assert all(rows * width <= 64 for rows, width in backend.session.calls)
+
+
+class CountingBackend(EmbeddingBackend):
+    model_name = "counting"
+
+    def __init__(self) -> None:
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        vectors = np.random.default_rng(len(self.embedded)).standard_normal((len(texts), 8)).astype(np.float32)
+        return Embeddings(vectors / np.linalg.norm(vectors, axis=1, keepdims=True), len(texts))
+
+
+def add_chunks(db: Session, texts) -> list:
+    document = make_document(db, make_user(db, f"{uuid4().hex[:8]}@example.com"))
+    chunks = [DocumentChunk(document_id=document.id, chunk_index=i, content=text) for i, text in enumerate(texts)]
+    db.add_all(chunks)
+    db.commit()
+    return chunks
+
+
+def cache_entry(key: str, last_used_at: datetime) -> EmbeddingCacheEntry:
+    return EmbeddingCacheEntry(
+        model="counting", content_hash=key, vector=vector_to_bytes(np.ones(8)), created_at=last_used_at, last_used_at=last_used_at
+    )
+
+
+def test_cached_text_is_counted_as_a_hit_and_not_embedded_again():
+    backend, cache = CountingBackend(), EmbeddingCache(max_entries=1000)
+    with Session(engine) as db:
+        first = ChunkEmbeddingService(db, backend, cache).embed_chunks(add_chunks(db, ["glucose  normal", "page 1", "page 1"]))
+        db.commit()
+        assert (first["cache_hits"], first["cache_misses"], first["embedded"]) == (0, 2, 2)
+
+        # Whitespace differences normalize to the same key; only the new text is embedded
+        cache.clear_memory()
+        chunks = add_chunks(db, ["glucose normal", "new text"])
+        second = ChunkEmbeddingService(db, backend, cache).embed_chunks(chunks)
+        db.commit()
+        assert chunks[0].embedding_id == content_key("glucose  normal")
+
+    assert (second["cache_hits"], second["cache_misses"]) == (1, 1)
+    assert second["cache_hit_rate"] == 0.5
+    assert backend.embedded == ["glucose  normal", "page 1", "new text"]
+
+
+def test_text_another_worker_cached_first_does_not_fail_the_insert():
+    cache = EmbeddingCache(max_entries=1000)
+    with Session(engine) as db:
+        db.add(cache_entry("taken", datetime.utcnow()))
+        db.commit()
+
+        vector = vector_to_bytes(np.zeros(8))
+        cache.put_many(db, "counting", {"taken": vector, "fresh": vector})
+        db.commit()
+
+        stored = dict(db.query(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.vector))
+    # The existing row is kept and the rest of the batch still goes in
+    assert stored["taken"] == vector_to_bytes(np.ones(8))
+    assert stored["fresh"] == vector
+
+
+def test_eviction_drops_the_least_recently_used_down_to_ninety_percent():
+    cache = EmbeddingCache(max_entries=20)
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        db.add_all(cache_entry(f"key-{i:02}", now - timedelta(minutes=30 - i)) for i in range(30))
+        db.commit()
+
+        assert cache.evict(db) == 12
+        db.commit()
+        kept = sorted(key for (key,) in db.query(EmbeddingCacheEntry.content_hash))
+
+    assert kept == [f"key-{i:02}" for i in range(12, 30)]
@@ -0,0 +1,97 @@
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.file_signatures import HEADER_BYTES, content_matches_extension, detect_mimetype
+from app.utils.file_validation import UploadStream, open_upload_stream
+
+
+def ftyp(brand: bytes) -> bytes:
+    return b"\x00\x00\x00\x18ftyp" + brand + b"\x00\x00\x00\x00mif1"
+
+
+@pytest.mark.parametrize("header, mime_type", [
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR", "image/png"),
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", "image/jpeg"),
+    (b"II*\x00\x08\x00\x00\x00", "image/tiff"),
+    (b"MM\x00*\x00\x00\x00\x08", "image/tiff"),
+    (b"II+\x00\x08\x00\x00\x00", "image/tiff"),
+    (ftyp(b"heic"), "image/heic"),
+    (ftyp(b"mif1"), "image/heif"),
+    (b"\x00" * 128 + b"DICM\x02\x00", "application/dicom"),
+])
+def test_known_formats_are_recognised_from_their_header(header, mime_type):
+    assert detect_mimetype(header) == mime_type
+
+
+@pytest.mark.parametrize("header", [
+    b"",
+    b"plain text, not a document",
+    ftyp(b"mp42"),  # An MP4 video shares the box layout but not the brand
+    b"\x00" * 127 + b"DICM",  # One byte short of the preamble
+    b"MZ\x90\x00",
+])
+def test_unknown_content_is_octet_stream(header):
+    assert detect_mimetype(header) == "application/octet-stream"
+
+
+def test_pdf_header_may_follow_leading_junk_within_the_window():
+    assert detect_mimetype(b"\r\n" * 100 + b"%PDF-1.4") == "application/pdf"
+    assert detect_mimetype(b" " * 1025 + b"%PDF-1.4") == "application/octet-stream"
+
+
+def test_content_must_fit_the_declared_extension():
+    png = b"\x89PNG\r\n\x1a\n"
+    assert content_matches_extension(png, "png")
+    assert content_matches_extension(png, ".PNG")
+    assert not content_matches_extension(png, "pdf")
+    assert not content_matches_extension(b"not an image", "jpg")
+    # Extensions without a signature aren't checked
+    assert content_matches_extension(b"anything", "txt")
+
+
+class CountingReader(io.BytesIO):
+    def __init__(self, content: bytes) -> None:
+        super().__init__(content)
+        self.requested = []
+
+    def read(self, size=-1):
+        self.requested.append(size)
+        return super().read(size)
+
+
+def test_upload_stream_sniffs_only_the_header_and_replays_it():
+    content = b"%PDF-1.7\n" + bytes(range(256)) * 100
+    source = CountingReader(content)
+
+    stream = UploadStream(source)
+    assert source.requested == [HEADER_BYTES]
+    assert stream.detected_mimetype == "application/pdf"
+
+    replayed = b"".join(iter(lambda: stream.read(4096), b""))
+    assert replayed == content
+    assert stream.bytes_read == len(content)
+    assert stream.sha256 == hashlib.sha256(content).hexdigest()
+
+
+def test_upload_stream_enforces_the_size_limit_while_reading():
+    stream = UploadStream(io.BytesIO(b"%PDF-" + b"x" * 5000), max_size=4096)
+    with pytest.raises(HTTPException) as error:
+        while stream.read(1024):
+            pass
+    assert error.value.status_code == 413
+
+
+def test_uploads_whose_content_contradicts_the_extension_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        open_upload_stream(io.BytesIO(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64), "report.pdf")
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        open_upload_stream(io.BytesIO(b"MZ\x90\x00"), "setup.exe")
+    assert error.value.status_code == 400
+
+    assert open_upload_stream(io.BytesIO(b"%PDF-1.7\n"), "report.PDF").detected_mimetype == "application/pdf"
@@ -0,0 +1,18 @@
+import pytest
+
+from app.utils.helpers import percentile
+
+
+@pytest.mark.parametrize("fraction, expected", [
+    (0.0, 1), (0.01, 1), (0.07, 7), (0.5, 50), (0.95, 95), (0.99, 99), (0.991, 100), (1.0, 100),
+])
+def test_percentile_is_nearest_rank(fraction, expected):
+    assert percentile(list(range(1, 101)), fraction) == expected
+
+
+def test_percentile_of_short_lists():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0], 0.99) == 3.0
+    # Median of an even count is the lower middle value, p99 of ten samples is the largest
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.0
+    assert percentile([float(i) for i in range(10)], 0.99) == 9.0
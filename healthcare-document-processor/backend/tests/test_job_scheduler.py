@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.models import JobPriority, JobStatus, ProcessingJob, User
+from app.services import job_queue as job_queue_module
+from app.services.job_queue import JobProgress, requeue_stale_jobs
+from app.services.job_scheduler import JobScheduler
+from tests.test_jobs import RecordingQueue, make_document, make_user
+
+
+def queue_job(db: Session, user: User, priority: JobPriority = JobPriority.ROUTINE, pages: int = 1, age: int = 0) -> ProcessingJob:
+    document = make_document(db, user)
+    created_at = datetime.utcnow() - timedelta(seconds=age)
+    job = ProcessingJob(
+        document_id=document.id, user_id=user.id, status=JobStatus.QUEUED, priority=priority, page_count=pages,
+        created_at=created_at, schedule_at=JobScheduler().schedule_at(created_at, pages)
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def claims(scheduler: JobScheduler, count: int) -> list:
+    with Session(engine) as db:
+        return [scheduler.claim_next(db) for _ in range(count)]
+
+
+def test_stat_jobs_are_claimed_before_older_routine_work():
+    with Session(engine) as db:
+        user = make_user(db, "stat@example.com")
+        routine = queue_job(db, user, JobPriority.ROUTINE, age=60).id
+        stat = queue_job(db, user, JobPriority.STAT).id
+
+    assert claims(JobScheduler(), 3) == [stat, routine, None]
+
+
+def test_a_flooded_tenant_does_not_starve_a_second_one():
+    with Session(engine) as db:
+        flooding = make_user(db, "flood@example.com")
+        for _ in range(10):
+            queue_job(db, flooding, age=600)
+        single = queue_job(db, make_user(db, "single@example.com")).id
+
+    # The second tenant is next once the first has a job running, despite queueing last
+    assert single in claims(JobScheduler(), 2)
+
+
+def test_a_job_is_claimed_by_only_one_worker():
+    with Session(engine) as db:
+        job_id = queue_job(db, make_user(db, "claim@example.com")).id
+
+    first, second = JobScheduler(), JobScheduler()
+    # The second worker picked the same job before the first claimed it
+    second._pick = lambda db, now: job_id
+
+    assert claims(first, 1) == [job_id]
+    assert claims(second, 1) == [None]
+    with Session(engine) as db:
+        assert db.get(ProcessingJob, job_id).attempts == 1
+
+
+def test_jobs_without_a_recent_heartbeat_are_requeued_and_woken(monkeypatch):
+    queue = RecordingQueue()
+    monkeypatch.setattr(job_queue_module, "job_queue", queue)
+    with Session(engine) as db:
+        user = make_user(db, "heartbeat@example.com")
+        lost = queue_job(db, user).id
+        busy = queue_job(db, user).id
+    assert set(claims(JobScheduler(), 2)) == {lost, busy}
+
+    long_ago = datetime.utcnow() - timedelta(hours=2)
+    with Session(engine) as db:
+        for job_id in (lost, busy):
+            db.get(ProcessingJob, job_id).started_at = long_ago
+        db.get(ProcessingJob, lost).heartbeat_at = long_ago
+        db.commit()
+
+        # Page-level progress keeps a long job's heartbeat fresh
+        progress = JobProgress(db.get(ProcessingJob, busy), heartbeat_seconds=0)
+        progress("ocr", 0.1)
+        progress("ocr", 0.2)
+
+    assert requeue_stale_jobs() == 1
+    assert queue.enqueued == [lost]
+    with Session(engine) as db:
+        assert db.get(ProcessingJob, lost).status == JobStatus.QUEUED
+        assert db.get(ProcessingJob, busy).status == JobStatus.RUNNING
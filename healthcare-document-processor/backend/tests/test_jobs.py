@@ -0,0 +1,81 @@
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.models import Document, DocumentType, JobPriority, JobStatus, ProcessingJob, User, UserRole
+from app.services.processing_job_service import ProcessingJobService
+
+
+class RecordingQueue:
+    """Collects wake-ups instead of running jobs."""
+
+    def __init__(self) -> None:
+        self.enqueued = []
+
+    def enqueue(self, job_id) -> None:
+        self.enqueued.append(job_id)
+
+
+class OpenAdmission:
+    def __init__(self, before_admit=None) -> None:
+        self.before_admit = before_admit
+
+    def admit_job(self, db, priority, pages) -> None:
+        if self.before_admit:
+            self.before_admit()
+
+
+def make_user(db: Session, email: str, role: UserRole = UserRole.DOCTOR) -> User:
+    user = User(email=email, password_hash="x", full_name=email.split("@")[0], role=role)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_document(db: Session, user: User, size: int = 1000) -> Document:
+    key = f"{user.id}/{uuid4().hex}.png"
+    document = Document(
+        user_id=user.id, filename="scan.png", original_filename="scan.png", file_path=key, object_key=key,
+        file_size=size, mime_type="image/png", document_type=DocumentType.LAB_RESULT
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+
+def test_racing_requests_share_one_active_job():
+    with Session(engine) as db:
+        user = make_user(db, "race@example.com")
+        document = make_document(db, user)
+        user_id, document_id = user.id, document.id
+
+    def competing_request():
+        # Another request gets its job in after this one saw none active
+        with Session(engine) as other:
+            other.add(ProcessingJob(document_id=document_id, user_id=user_id, status=JobStatus.QUEUED))
+            other.commit()
+
+    queue = RecordingQueue()
+    with Session(engine) as db:
+        user = db.get(User, user_id)
+        service = ProcessingJobService(db, job_queue=queue, admission=OpenAdmission(competing_request))
+        job = service.enqueue(document_id, user, JobPriority.ROUTINE)
+
+        active = db.query(ProcessingJob).filter(ProcessingJob.document_id == document_id).all()
+        assert [row.id for row in active] == [job.id]
+    # The winning request sends its own wake-up
+    assert queue.enqueued == []
+
+
+def test_a_finished_job_does_not_block_the_next_one():
+    with Session(engine) as db:
+        user = make_user(db, "again@example.com")
+        document = make_document(db, user)
+        db.add(ProcessingJob(document_id=document.id, user_id=user.id, status=JobStatus.SUCCEEDED))
+        db.commit()
+
+        queue = RecordingQueue()
+        job = ProcessingJobService(db, job_queue=queue, admission=OpenAdmission()).enqueue(document.id, user)
+        assert job.status == JobStatus.QUEUED
+        assert queue.enqueued == [job.id]
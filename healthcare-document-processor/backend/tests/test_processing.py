@@ -0,0 +1,64 @@
+import asyncio
+
+from app.core.database import engine
+from tests.test_documents import png, upload
+
+
+async def open_stream(app, path: str, headers: dict):
+    """Start a GET on the ASGI app and return once its response headers are sent."""
+    started = asyncio.Event()
+    disconnect = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if not sent:
+            sent.append("request")
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent.append(message["status"])
+            started.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "client": ("testclient", 50000), "server": ("testserver", 80),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+    }
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(started.wait(), timeout=10)
+    return sent[-1], disconnect, task
+
+
+def test_open_event_streams_do_not_hold_database_connections(client, login):
+    from main import app
+
+    headers = login("streams@example.com")
+    document = upload(client, headers, png())
+    pool_limit = engine.pool.size() + engine.pool._max_overflow
+
+    async def scenario():
+        streams = []
+        for i in range(pool_limit + 5):
+            path = "/processing/events" if i % 2 else f"/processing/{document['id']}/events"
+            streams.append(await open_stream(app, path, headers))
+        assert [status for status, _, _ in streams] == [200] * len(streams)
+        # Snapshot reads check a connection out briefly; none may stay out for the stream
+        for _ in range(100):
+            if engine.pool.checkedout() == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert engine.pool.checkedout() == 0
+
+        # Other requests still get a connection while every stream is open
+        listed = await asyncio.to_thread(client.get, "/documents/", headers=headers)
+        assert listed.status_code == 200, listed.text
+
+        for _, disconnect, task in streams:
+            disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*(task for _, _, task in streams)), timeout=10)
+
+    asyncio.run(scenario())
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import LoginThrottle, TokenBucketLimiter, take_all
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def throttle(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(settings, "LOGIN_ACCOUNT_BURST", 4)
+    monkeypatch.setattr(settings, "LOGIN_ACCOUNT_PER_MINUTE", 1.0)
+    monkeypatch.setattr(settings, "LOGIN_ACCOUNT_IP_BURST", 2)
+    monkeypatch.setattr(settings, "LOGIN_ACCOUNT_IP_PER_MINUTE", 1.0)
+    monkeypatch.setattr(settings, "LOGIN_IP_BURST", 3)
+    monkeypatch.setattr(settings, "LOGIN_IP_PER_MINUTE", 1.0)
+    return LoginThrottle()
+
+
+def attempt(throttle: LoginThrottle, email: str, ip: str) -> int:
+    try:
+        asyncio.run(throttle.check(email, ip))
+    except HTTPException as e:
+        assert e.status_code == 429
+        return int(e.headers["Retry-After"])
+    return 0
+
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate(clock):
+    limiter = TokenBucketLimiter(capacity=2, refill_per_second=0.5)
+
+    assert limiter.take("key") == (True, 0.0)
+    assert limiter.take("key") == (True, 0.0)
+    allowed, retry_after = limiter.take("key")
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+
+    clock.now += 2
+    assert limiter.take("key")[0]
+    assert not limiter.take("key")[0]
+    assert limiter.take("other")[0]
+
+
+def test_take_all_charges_every_bucket_or_none(clock):
+    wide = TokenBucketLimiter(capacity=5, refill_per_second=1)
+    narrow = TokenBucketLimiter(capacity=1, refill_per_second=1)
+
+    assert take_all([(wide, "a"), (narrow, "b")]) == (None, 0.0)
+    empty, retry_after = take_all([(wide, "a"), (narrow, "b")])
+    assert empty == 1
+    assert retry_after == pytest.approx(1.0)
+
+    # The rejected take left the wide bucket at four tokens
+    assert [wide.take("a")[0] for _ in range(5)] == [True] * 4 + [False]
+
+
+def test_concurrent_takes_never_overspend_a_bucket(clock):
+    wide = TokenBucketLimiter(capacity=1000, refill_per_second=1e-9)
+    narrow = TokenBucketLimiter(capacity=10, refill_per_second=1e-9)
+    barrier = threading.Barrier(20)
+
+    def worker(_):
+        barrier.wait()
+        return sum(take_all([(wide, "a"), (narrow, "b")])[0] is None for _ in range(10))
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        granted = sum(pool.map(worker, range(20)))
+
+    assert granted == 10
+    # Only the granted attempts were charged to the wide bucket
+    assert wide._level("a", clock.now) == pytest.approx(990)
+
+
+def test_guessing_from_one_address_does_not_lock_the_account_elsewhere(clock, throttle):
+    assert attempt(throttle, "victim@example.com", "10.0.0.1") == 0
+    assert attempt(throttle, "Victim@example.com ", "10.0.0.1") == 0
+    assert attempt(throttle, "victim@example.com", "10.0.0.1") > 0
+
+    assert attempt(throttle, "victim@example.com", "10.0.0.2") == 0
+    assert throttle.stats()["rejected_account_ip"] == 1
+
+
+def test_guessing_spread_over_many_addresses_is_capped_per_account(clock, throttle):
+    allowed = [attempt(throttle, "victim@example.com", f"10.0.1.{i}") == 0 for i in range(10)]
+
+    assert allowed == [True] * 4 + [False] * 6
+    assert throttle.stats()["rejected_account"] == 6
+    assert attempt(throttle, "someone@example.com", "10.0.1.9") == 0
+
+
+def test_a_rejected_attempt_charges_no_bucket(clock, throttle):
+    for _ in range(2):
+        assert attempt(throttle, "victim@example.com", "10.0.0.1") == 0
+    # This address is out of attempts on the account; these must not drain the IP bucket
+    for _ in range(5):
+        assert attempt(throttle, "victim@example.com", "10.0.0.1") > 0
+    assert attempt(throttle, "someone@example.com", "10.0.0.1") == 0
+
+    # The IP bucket is now empty; its rejections leave the account buckets alone
+    assert attempt(throttle, "fresh@example.com", "10.0.0.1") > 0
+    assert throttle.stats()["rejected_ip"] == 1
+    assert attempt(throttle, "fresh@example.com", "10.0.0.2") == 0
+    assert attempt(throttle, "fresh@example.com", "10.0.0.3") == 0
+    assert attempt(throttle, "fresh@example.com", "10.0.0.4") == 0
+    assert attempt(throttle, "fresh@example.com", "10.0.0.5") == 0
+    assert attempt(throttle, "fresh@example.com", "10.0.0.6") > 0
@@ -0,0 +1,67 @@
+import time
+from datetime import timezone
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.core.revocation import RevocationStore
+from app.core.security import get_password_hash
+from app.models import TokenRevocation, User, UserRole
+
+
+def make_user(db: Session) -> User:
+    user = User(
+        email=f"{uuid4().hex[:8]}@example.com",
+        password_hash=get_password_hash("password123"),
+        full_name="Revoked",
+        role=UserRole.DOCTOR
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_user_revocation_records_an_aware_utc_instant():
+    store = RevocationStore()
+    with Session(engine) as db:
+        user = make_user(db)
+        before = time.time()
+        store.revoke_user(db, user.id, reason="password_changed")
+        after = time.time()
+
+        row = db.query(TokenRevocation).filter(TokenRevocation.user_id == user.id).one()
+        revoked_before = row.revoked_before if row.revoked_before.tzinfo else row.revoked_before.replace(tzinfo=timezone.utc)
+        assert before <= revoked_before.timestamp() <= after
+        assert row.expires_at > row.revoked_before
+
+
+def test_tokens_issued_before_a_user_revocation_are_rejected_after_a_refresh():
+    writer, reader = RevocationStore(), RevocationStore()
+    with Session(engine) as db:
+        user_id = make_user(db).id
+        issued_before = time.time()
+        time.sleep(0.01)
+        writer.revoke_user(db, user_id, reason="password_changed")
+        time.sleep(0.01)
+        issued_after = time.time()
+
+        # One store learns from its own write, the other only from the table
+        reader.refresh(db)
+
+    for store in (writer, reader):
+        assert store.is_revoked({"sub": str(user_id), "iat": issued_before})
+        assert not store.is_revoked({"sub": str(user_id), "iat": issued_after})
+        assert not store.is_revoked({"sub": str(uuid4()), "iat": issued_before})
+
+
+def test_revoked_token_ids_survive_a_refresh():
+    writer, reader = RevocationStore(), RevocationStore()
+    payload = {"jti": uuid4().hex, "sub": str(uuid4()), "iat": time.time(), "exp": time.time() + 600}
+    with Session(engine) as db:
+        writer.revoke_token(db, payload, reason="logout")
+        reader.refresh(db)
+
+    assert writer.is_revoked(payload)
+    assert reader.is_revoked(payload)
+    assert not reader.is_revoked({**payload, "jti": uuid4().hex})
@@ -0,0 +1,88 @@
+from pathlib import Path
+from uuid import uuid4
+
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from app.core.database import Base, engine
+from app.models import Document, DocumentChunk, DocumentType, User, UserRole
+from app.services.search_service import SearchService
+from tests.test_documents import png, process, upload
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_snippets_escape_the_chunk_text_and_highlight_matches(client, login, fake_ocr):
+    headers = login("escape@example.com")
+    document = upload(client, headers, png())
+    process(client, headers, document["id"])
+    # OCR cleaning drops markup, so write the text straight into the chunk
+    with engine.begin() as connection:
+        connection.execute(
+            DocumentChunk.__table__.update().values(content='<img src=x onerror="alert(1)"> glucose & insulin')
+        )
+
+    response = client.get("/search/chunks?q=glucose", headers=headers)
+    assert response.status_code == 200, response.text
+    snippet = response.json()["hits"][0]["snippet"]
+    assert "<img" not in snippet
+    assert "&lt;img" in snippet
+    assert "<mark>glucose</mark>" in snippet
+    assert "&amp; insulin" in snippet
+
+
+def test_total_hits_counts_every_match_not_just_the_page(client, login, fake_ocr):
+    headers = login("total@example.com")
+    for size in (100, 110, 120):
+        document = upload(client, headers, png(size))
+        process(client, headers, document["id"])
+
+    everything = client.get("/search/chunks?q=glucose&limit=100", headers=headers).json()
+    matches = len(everything["hits"])
+    assert matches >= 3
+    assert everything["total_hits"] == matches
+
+    first_page = client.get("/search/chunks?q=glucose&limit=2", headers=headers).json()
+    assert len(first_page["hits"]) == 2
+    assert first_page["total_hits"] == matches
+
+    past_the_end = client.get(f"/search/chunks?q=glucose&skip={matches}&limit=2", headers=headers).json()
+    assert past_the_end["hits"] == []
+    assert past_the_end["total_hits"] == matches
+
+
+def test_search_migration_indexes_existing_sqlite_chunks(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    migrated = create_engine(url)
+    Base.metadata.create_all(migrated)
+    with Session(migrated) as db:
+        user = User(email="migrated@example.com", password_hash="x", full_name="Migrated", role=UserRole.DOCTOR)
+        document = Document(
+            id=uuid4(), user=user, filename="scan.png", original_filename="scan.png",
+            file_path="user/scan.png", object_key="user/scan.png", file_size=1, mime_type="image/png",
+            document_type=DocumentType.LAB_RESULT,
+        )
+        db.add_all([user, document])
+        db.flush()
+        db.add(DocumentChunk(document_id=document.id, chunk_index=0, content="fasting glucose within range"))
+        db.commit()
+
+    # Drop the search table the models created, then let the migration build it over the existing chunk
+    config = Config()
+    config.set_main_option("script_location", str(BACKEND / "alembic"))
+    migration = ScriptDirectory.from_config(config).get_revision("d41f8a6c2e57").module
+    with migrated.begin() as connection, Operations.context(MigrationContext.configure(connection)):
+        migration.downgrade()
+        assert not inspect(connection).has_table("document_chunks_fts")
+        migration.upgrade()
+
+    with Session(migrated) as db:
+        hits, total = SearchService(db).search_chunks("glucose", db.query(User).one())
+
+    migrated.dispose()
+    assert total == 1
+    assert hits[0]["snippet"] == "fasting <mark>glucose</mark> within range"
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+from app.core import security
+from app.core.database import engine
+from app.core.security import build_password_context, get_password_hash, verify_password_async
+from app.models import User
+
+
+async def worst_stall(work) -> float:
+    """Run ``work`` next to a 1 ms ticker; the longest the ticker waited beyond its interval."""
+    stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal stall
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - started - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    try:
+        await work
+    finally:
+        done.set()
+        await tick
+    return stall
+
+
+def test_concurrent_verifications_run_off_the_event_loop(monkeypatch):
+    hashed = get_password_hash("correct horse")
+    threads = set()
+    verify = security.verify_password
+
+    def recording_verify(plain, hashed_password):
+        threads.add(threading.current_thread().name)
+        return verify(plain, hashed_password)
+
+    monkeypatch.setattr(security, "verify_password", recording_verify)
+    attempts = ["correct horse" if i % 2 else "wrong" for i in range(24)]
+
+    async def scenario():
+        started = time.perf_counter()
+        results = []
+
+        async def verify_all():
+            results.extend(await asyncio.gather(*(verify_password_async(p, hashed) for p in attempts)))
+
+        stall = await worst_stall(verify_all())
+        return results, stall, time.perf_counter() - started
+
+    results, stall, elapsed = asyncio.run(scenario())
+
+    assert results == [attempt == "correct horse" for attempt in attempts]
+    assert threads and all(name.startswith("password-hash") for name in threads)
+    # The loop keeps ticking while two dozen hashes are computed
+    assert stall < elapsed / 2
+
+
+def test_hashes_at_another_cost_are_upgraded_on_verify():
+    old = build_password_context(["pbkdf2_sha256"], rounds=1000)
+    current = build_password_context(["pbkdf2_sha256"], rounds=2000)
+    hashed = old.hash("password123")
+
+    assert current.verify_and_update("wrong", hashed) == (False, None)
+    verified, upgraded = current.verify_and_update("password123", hashed)
+    assert verified and upgraded is not None
+    assert "$2000$" in upgraded
+    assert current.verify_and_update("password123", upgraded) == (True, None)
+
+
+def test_login_stores_the_upgraded_hash(client, login, monkeypatch):
+    login("rehash@example.com")
+    monkeypatch.setattr(security, "pwd_context", build_password_context(["pbkdf2_sha256"], rounds=1234))
+
+    response = client.post("/auth/login", json={"email": "rehash@example.com", "password": "password123"})
+
+    assert response.status_code == 200, response.text
+    with engine.connect() as connection:
+        stored = connection.execute(
+            User.__table__.select().with_only_columns(User.password_hash).where(User.email == "rehash@example.com")
+        ).scalar()
+    assert "$1234$" in stored
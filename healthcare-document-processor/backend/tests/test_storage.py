@@ -0,0 +1,80 @@
+import io
+import os
+
+import boto3
+import pytest
+from fastapi import HTTPException
+from moto import mock_aws
+
+from app.services.storage_service import S3StorageService
+
+BUCKET = "test-documents"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        storage = S3StorageService(
+            bucket_name=BUCKET, region="us-east-1", access_key="testing", secret_key="testing", endpoint_url=None
+        )
+        storage.download_threshold = 256 * 1024
+        storage.download_part_size = 100 * 1024
+        storage.download_concurrency = 4
+        yield storage
+        storage.close()
+
+
+@pytest.fixture
+def requested_ranges(s3):
+    """Range header of every GetObject the storage service sends; None for whole-object GETs."""
+    ranges = []
+    s3.client.meta.events.register(
+        "provide-client-params.s3.GetObject", lambda params, **kwargs: ranges.append(params.get("Range"))
+    )
+    return ranges
+
+
+def put(storage: S3StorageService, size: int) -> tuple:
+    content = os.urandom(size)
+    key = storage.upload_file(io.BytesIO(content), "scan.pdf", "user-1", "application/pdf")
+    return key, content
+
+
+def test_large_objects_are_fetched_as_parallel_ranges(s3, requested_ranges):
+    # Not a multiple of the part size, so the last range is short
+    key, content = put(s3, 1024 * 1024 + 12345)
+
+    with s3.download_file(key) as buffer:
+        assert buffer.read() == content
+
+    expected = [
+        f"bytes={start}-{min(start + s3.download_part_size, len(content)) - 1}"
+        for start in range(0, len(content), s3.download_part_size)
+    ]
+    assert sorted(requested_ranges) == sorted(expected)
+
+
+def test_ranged_download_rolls_over_to_disk_beyond_the_spool_size(s3):
+    s3.spool_max_size = 128 * 1024
+    key, content = put(s3, 600 * 1024)
+
+    with s3.download_file(key) as buffer:
+        assert buffer._rolled
+        assert buffer.read() == content
+
+
+def test_small_objects_use_one_plain_get(s3, requested_ranges):
+    key, content = put(s3, 1000)
+
+    with s3.local_copy(key) as path:
+        assert path.read_bytes() == content
+    assert requested_ranges == [None]
+
+
+def test_missing_objects_are_reported_as_a_storage_error(s3):
+    with pytest.raises(HTTPException) as error:
+        s3.download_file("user/missing.pdf")
+    assert error.value.status_code == 502
@@ -0,0 +1,101 @@
+import json
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.services.embedding_service import normalize_rows
+from app.services.vector_index import MIN_CAPACITY, VectorPartition
+
+DIM = 32
+
+
+def unit_vectors(count: int, seed: int = 0) -> np.ndarray:
+    return normalize_rows(np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32))
+
+
+def add_document(partition: VectorPartition, vectors: np.ndarray):
+    document_id = uuid4()
+    chunk_ids = [uuid4() for _ in vectors]
+    partition.add(chunk_ids, [document_id] * len(vectors), vectors)
+    return document_id, chunk_ids
+
+
+def generation(partition: VectorPartition) -> int:
+    return json.loads((partition.path / "meta.json").read_text())["generation"]
+
+
+def test_added_rows_are_found_nearest_first(tmp_path):
+    partition = VectorPartition(tmp_path / "p")
+    vectors = unit_vectors(50)
+    document_id, chunk_ids = add_document(partition, vectors)
+
+    hits = partition.search(vectors[7], k=3)
+    assert [hit.chunk_id for hit in hits][0] == chunk_ids[7]
+    assert hits[0].document_id == document_id
+    assert hits[0].score == pytest.approx(1.0, abs=1e-5)
+    assert [hit.score for hit in hits] == sorted((hit.score for hit in hits), reverse=True)
+    assert partition.stats()["vectors"] == 50
+
+
+def test_deleted_documents_are_tombstoned_and_no_longer_found(tmp_path):
+    partition = VectorPartition(tmp_path / "p")
+    vectors = unit_vectors(20)
+    removed, _ = add_document(partition, vectors[:10])
+    kept, _ = add_document(partition, vectors[10:])
+
+    partition.delete_documents([removed])
+
+    assert {hit.document_id for hit in partition.search(vectors[0], k=20)} == {kept}
+    assert (partition.stats()["vectors"], partition.stats()["deleted"]) == (10, 10)
+
+
+def test_enough_tombstones_compact_into_a_new_generation(tmp_path):
+    partition = VectorPartition(tmp_path / "p", compact_fraction=0.25)
+    vectors = unit_vectors(MIN_CAPACITY + 200)
+    removed, _ = add_document(partition, vectors[:MIN_CAPACITY + 100])
+    kept, kept_chunks = add_document(partition, vectors[MIN_CAPACITY + 100:])
+    assert generation(partition) == 0
+
+    partition.delete_documents([removed])
+
+    assert generation(partition) == 1
+    assert partition.stats()["deleted"] == 0
+    assert not list(partition.path.glob("*-0.*"))
+    hits = partition.search(vectors[-1], k=1)
+    assert (hits[0].document_id, hits[0].chunk_id) == (kept, kept_chunks[-1])
+
+
+def test_a_document_filter_returns_k_hits_from_a_clustered_partition(tmp_path):
+    partition = VectorPartition(tmp_path / "p", ivf_min_vectors=400, nprobe=1)
+    vectors = unit_vectors(600)
+    for start in range(0, 580, 20):
+        add_document(partition, vectors[start:start + 20])
+    # The filtered document's rows are spread over many clusters
+    target, target_chunks = add_document(partition, vectors[580:])
+    assert partition.stats()["clusters"] > 1
+
+    query = unit_vectors(1, seed=1)[0]
+    hits = partition.search(query, k=10, document_ids=[target])
+    exact = partition.search(query, k=10, document_ids=[target], exact=True)
+
+    assert len(hits) == 10
+    assert {hit.document_id for hit in hits} == {target}
+    assert [hit.chunk_id for hit in hits] == [hit.chunk_id for hit in exact]
+
+
+def test_int8_partitions_score_close_to_float32(tmp_path):
+    vectors = unit_vectors(200)
+    query = unit_vectors(1, seed=2)[0]
+    results = {}
+    for quantization in ("float32", "int8"):
+        partition = VectorPartition(tmp_path / quantization, quantization=quantization)
+        _, chunk_ids = add_document(partition, vectors)
+        rows = {chunk_id: row for row, chunk_id in enumerate(chunk_ids)}
+        results[quantization] = {rows[hit.chunk_id]: hit.score for hit in partition.search(query, k=200)}
+
+    assert (tmp_path / "int8" / "scales-0.bin").exists()
+    for row, score in results["float32"].items():
+        assert results["int8"][row] == pytest.approx(score, abs=0.02)
+    best = max(results["float32"], key=results["float32"].get)
+    assert max(results["int8"], key=results["int8"].get) == best